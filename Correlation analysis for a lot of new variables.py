@@ -1,125 +1,108 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-# ============================================================
-# 1. Load the Base Datasets (Outage, Grouped, Demographics)
-# ============================================================
-outage_df = pd.read_csv('Outage/Aggregated_Outage_Events.csv')
-grouped_df = pd.read_csv('DS/Grouped_By_FIPS_List.csv')
-demographics_df = pd.read_csv('Population/DemographicsData.csv')
-
-print("outage_df:", len(outage_df))
-print("grouped_df:", len(grouped_df))
-print("demographics_df:", len(demographics_df))
-
-# ============================================================
-# 2. Temperature Data Section: Load and Process Temperature Data
-# ============================================================
-temp_df = pd.read_csv('Temperature/Temperature Data with FIPS.csv')
-
-# Rename the FIPS column so that it matches the key in the other datasets
-temp_df.rename(columns={'FIPS': 'fips_code'}, inplace=True)
-
-# Convert temperature-related columns to numeric (adjust column names as needed)
-temp_df['Value'] = pd.to_numeric(temp_df['Value'], errors='coerce')
-temp_df['Anomaly (1901-2000 base period)'] = pd.to_numeric(temp_df['Anomaly (1901-2000 base period)'], errors='coerce')
-temp_df['Rank'] = pd.to_numeric(temp_df['Rank'], errors='coerce')
-temp_df['1901-2000 Mean'] = pd.to_numeric(temp_df['1901-2000 Mean'], errors='coerce')
-
-# ============================================================
-# 3. Data Preprocessing Section: Clean and Prepare Datasets
-# ============================================================
-# Function to convert string representations of lists into lists of floats
-def safe_convert_to_list(x):
-    try:
-        return [float(i) for i in x.strip('[]').split(',')] if isinstance(x, str) else ([x] if isinstance(x, (int, float)) else [])
-    except Exception:
-        return []
-
-# Process outage_df list columns
-outage_df['durations_hrs'] = outage_df['durations_hrs'].apply(safe_convert_to_list)
-outage_df['sums'] = outage_df['sums'].apply(safe_convert_to_list)
-
-# Process grouped_df list columns
-grouped_df['total_power_usage_kwh'] = grouped_df['total_power_usage_kwh'].apply(safe_convert_to_list)
-grouped_df['total_carbon_emission_2023_tons'] = grouped_df['total_carbon_emission_2023_tons'].apply(safe_convert_to_list)
-
-# Calculate the number of data centers from the 'data_centers' column
-grouped_df['number_of_data_centers'] = grouped_df['data_centers'].apply(lambda x: len(eval(x)) if pd.notnull(x) else 0)
-
-# Convert demographic fields to numeric where applicable (excluding the fips_code)
-demographics_cols = demographics_df.columns.difference(['fips_code'])
-demographics_df[demographics_cols] = demographics_df[demographics_cols].apply(pd.to_numeric, errors='coerce')
+import os
 
-# ============================================================
-# 4. Merge Datasets on 'fips_code'
-# ============================================================
-# Merge outage and grouped data
-merged_df = pd.merge(outage_df, grouped_df, on='fips_code', how='outer')
-# Merge demographics data
-merged_df = pd.merge(merged_df, demographics_df, on='fips_code', how='outer')
-# Merge the temperature data
-merged_df = pd.merge(merged_df, temp_df, on='fips_code', how='outer')
-
-# ============================================================
-# 5. Flatten List Columns by Taking the Mean (or Sum)
-# ============================================================
-merged_df['avg_durations_hrs'] = merged_df['durations_hrs'].apply(
-    lambda x: sum(x) / len(x) if isinstance(x, list) and len(x) > 0 else 0)
-merged_df['sum_duration_hrs'] = merged_df['durations_hrs'].apply(
-    lambda x: sum(x) if isinstance(x, list) and len(x) > 0 else 0)
-merged_df['sums_sum'] = merged_df['sums'].apply(
-    lambda x: sum(x) if isinstance(x, list) and len(x) > 0 else 0)
-merged_df['avg_power_usage'] = merged_df['total_power_usage_kwh'].apply(
-    lambda x: sum(x) / len(x) if isinstance(x, list) and len(x) > 0 else 0)
-merged_df['avg_carbon_emission'] = merged_df['total_carbon_emission_2023_tons'].apply(
-    lambda x: sum(x) / len(x) if isinstance(x, list) and len(x) > 0 else 0)
-
-# ============================================================
-# 6. Correlation Analysis Section
-# ============================================================
-# Select only numeric columns for correlation analysis (temperature fields will be included if numeric)
-numeric_columns = merged_df.select_dtypes(include=['number', 'float']).columns
-
-# First correlation: Only counties with data centers
-merged_df_with_centers = merged_df[merged_df['number_of_data_centers'] > 0]
-correlation_matrix_with_centers = merged_df_with_centers[numeric_columns].corr()
-
-# Second correlation: All counties
-correlation_matrix_all_counties = merged_df[numeric_columns].corr()
+import pandas as pd
 
-print(merged_df.info())
-merged_df = merged_df.drop(['fips_code','start_times', 'end_times','durations_hrs','sums','county','Name','State','ID','state','data_centers','total_power_usage_kwh','total_carbon_emission_2023_tons'], axis=1)
-merged_df.to_csv("Merged for ML.csv", index=False, encoding='utf-8')
+from correlation import correlation_table
+from feature_store import load_features
+from instrument import stage
+from Temperature.adjacency import spatial_lag
+
+with stage('correlation_analysis') as run:
+    # ============================================================
+    # 1. Load the Merged County Table (Outage, Grouped, Demographics, Temperature)
+    # ============================================================
+    # feature_store.py loads the outage and data center rollups, demographics and temperature,
+    # merges them on 'fips_code' and caches the result on disk. Only the sources whose input
+    # file changed since the last run are rebuilt.
+    with stage('load_features') as step:
+        merged_df = load_features()
+        step.rows_out = run.rows_in = len(merged_df)
+
+    print("merged_df:", len(merged_df))
+
+    # Spillover features: outage load, data center count and temperature anomaly averaged
+    # over each county's neighbors (one sparse product over the county adjacency graph)
+    spillover_columns = ['sum_duration_hrs', 'number_of_data_centers', 'Anomaly (1901-2000 base period)']
+    with stage('spatial_lag', rows_in=len(merged_df)):
+        lag_input = merged_df.assign(number_of_data_centers=merged_df['number_of_data_centers'].fillna(0))
+        merged_df = merged_df.join(spatial_lag(lag_input, spillover_columns, k=1))
+
+    # ============================================================
+    # 2. Correlation Analysis Section
+    # ============================================================
+    # Select only numeric columns for correlation analysis (temperature fields will be included if numeric)
+    numeric_columns = merged_df.select_dtypes(include=['number', 'float']).columns
+
+    # Both correlations in one pass: only counties with data centers, and all counties.
+    # Each result holds the Pearson matrix 'r', pairwise-complete counts 'n', p-values 'p'
+    # and Benjamini-Hochberg q-values 'q'.
+    with_centers = merged_df['number_of_data_centers'] > 0
+    merged_df_with_centers = merged_df[with_centers]
+    with stage('correlation_table', rows_in=len(merged_df)) as step:
+        correlations = correlation_table(merged_df, numeric_columns, groups={'with_centers': with_centers, 'all': None})
+        step.extra['columns'] = len(numeric_columns)
+    correlation_matrix_with_centers = correlations['with_centers']['r']
+    correlation_matrix_all_counties = correlations['all']['r']
+
+    for group, result in correlations.items():
+        significant = (result['q'] < 0.05).to_numpy().sum() // 2
+        print(f"{group}: {significant} column pairs significant at FDR 5%")
+
+    print(merged_df.info())
+    # fips_code stays as an id column: ml_train.py groups CV folds by state (fips_code // 1000)
+    merged_df = merged_df.drop(['county','Name','State','ID','state'], axis=1)
+    with stage('write_ml_table', rows_in=len(merged_df)):
+        merged_df.to_csv("Merged for ML.csv", index=False, encoding='utf-8')
+    run.rows_out = len(merged_df)
 # ============================================================
-# 7. Visualization Section: Plot Correlation Matrices
+# 3. Visualization Section: Plot Correlation Matrices
 # ============================================================
-def plot_correlation(corr_matrix, title):
-    plt.figure(figsize=(14, 12))  # Increased figure size for clarity
-    sns.heatmap(corr_matrix, cmap="coolwarm", annot=True, fmt=".2f", center=0)
-    plt.title(title)
-    plt.show()
-
-# Plot correlations for counties with data centers
-plot_correlation(
-    correlation_matrix_with_centers,
-    f"Pearson Correlation (Counties With Data Centers) | Size: {len(merged_df_with_centers)}"
-)
-
-# Plot correlations for all counties
-plot_correlation(
-    correlation_matrix_all_counties,
-    f"Pearson Correlation (All Counties) | Size: {len(merged_df)}"
-)
+# With CORRELATION_REPORT_DIR set, write heatmaps, top pairs and the full matrices there
+# without a display (report.py); otherwise show the interactive seaborn plots.
+REPORT_DIR = os.environ.get('CORRELATION_REPORT_DIR')
 
 # Save the correlation matrices to CSV files
-correlation_matrix_with_centers.to_csv('Correlation_Matrix_Only_Counties_With_Data_Centers.csv')
-correlation_matrix_all_counties.to_csv('Correlation_Matrix_All_Counties.csv')
+with stage('correlation_matrices'):
+    correlation_matrix_with_centers.to_csv('Correlation_Matrix_Only_Counties_With_Data_Centers.csv')
+    correlation_matrix_all_counties.to_csv('Correlation_Matrix_All_Counties.csv')
 
-# Plot the difference in correlations (with vs. without data centers)
+# Difference in correlations (with vs. without data centers)
 correlation_difference = correlation_matrix_with_centers - correlation_matrix_all_counties
-plt.figure(figsize=(10, 8))
-sns.heatmap(correlation_difference, cmap="coolwarm", annot=True, fmt=".2f", center=0)
-plt.title("Difference in Pearson Correlation (With vs. Without Data Centers)")
-plt.show()
+
+if REPORT_DIR:
+    from report import render_heatmap, write_report
+
+    with stage('correlation_report'):
+        write_report(correlations, REPORT_DIR, titles={
+            'with_centers': f"Pearson Correlation (Counties With Data Centers) | Size: {len(merged_df_with_centers)}",
+            'all': f"Pearson Correlation (All Counties) | Size: {len(merged_df)}",
+        })
+        render_heatmap(correlation_difference, "Difference in Pearson Correlation (With vs. Without Data Centers)",
+                       os.path.join(REPORT_DIR, 'difference_heatmap.png'))
+    print("Correlation report written to", REPORT_DIR)
+else:
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    def plot_correlation(corr_matrix, title):
+        plt.figure(figsize=(14, 12))  # Increased figure size for clarity
+        sns.heatmap(corr_matrix, cmap="coolwarm", annot=True, fmt=".2f", center=0)
+        plt.title(title)
+        plt.show()
+
+    # Plot correlations for counties with data centers
+    plot_correlation(
+        correlation_matrix_with_centers,
+        f"Pearson Correlation (Counties With Data Centers) | Size: {len(merged_df_with_centers)}"
+    )
+
+    # Plot correlations for all counties
+    plot_correlation(
+        correlation_matrix_all_counties,
+        f"Pearson Correlation (All Counties) | Size: {len(merged_df)}"
+    )
+
+    plt.figure(figsize=(10, 8))
+    sns.heatmap(correlation_difference, cmap="coolwarm", annot=True, fmt=".2f", center=0)
+    plt.title("Difference in Pearson Correlation (With vs. Without Data Centers)")
+    plt.show()
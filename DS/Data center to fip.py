@@ -1,40 +1,48 @@
-import pandas as pd
-import geopandas as gpd
-from shapely.geometry import Point
-
-# Load the data with specified encoding
-merge_ba_carbon = pd.read_csv('Merge_BA_Carbon.csv', encoding='ISO-8859-1')
-
-# Ensure latitude and longitude are converted to floats
-merge_ba_carbon['Longitude_of_data_center'] = pd.to_numeric(merge_ba_carbon['Longitude_of_data_center'], errors='coerce')
-merge_ba_carbon['Latitude_of_data_center'] = pd.to_numeric(merge_ba_carbon['Latitude_of_data_center'], errors='coerce')
-
-# Drop rows with invalid coordinates
-merge_ba_carbon = merge_ba_carbon.dropna(subset=['Longitude_of_data_center', 'Latitude_of_data_center'])
-
-# Convert the data center coordinates into GeoDataFrame
-merge_ba_carbon['geometry'] = merge_ba_carbon.apply(
-    lambda row: Point(row['Longitude_of_data_center'], row['Latitude_of_data_center']), axis=1
-)
-data_centers_gdf = gpd.GeoDataFrame(merge_ba_carbon, geometry='geometry', crs='EPSG:4326')
-
-# Load the shapefile of US counties (replace with the actual path to your shapefile)
-counties_gdf = gpd.read_file('tl_2024_us_county.shp')
+import os
+import sys
 
-# Print columns to find the FIPS code column name
-print(counties_gdf.columns)
-
-# Reproject counties to the same CRS as data centers
-counties_gdf = counties_gdf.to_crs(data_centers_gdf.crs)
-
-# Perform a spatial join to find the county for each data center
-data_centers_with_fips = gpd.sjoin(data_centers_gdf, counties_gdf, how='left', predicate='within')
-
-# Replace 'GEOID' with the actual column name for FIPS codes
-merge_ba_carbon['fips_code'] = data_centers_with_fips['GEOID']  # Update based on the column name in your shapefile
-
-# Save the resulting DataFrame
-merge_ba_carbon.to_csv('Merge_BA_Carbon_with_FIPS.csv', index=False)
+import pandas as pd
+import shapely
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from DS.geocode import assign_fips, load_county_tree  # noqa: E402
+from instrument import stage  # noqa: E402
+
+with stage('data_center_fips') as run:
+    # Load the data with specified encoding
+    with stage('read') as step:
+        merge_ba_carbon = pd.read_csv('Merge_BA_Carbon.csv', encoding='ISO-8859-1')
+        step.rows_out = run.rows_in = len(merge_ba_carbon)
+
+    # Ensure latitude and longitude are converted to floats, and drop rows with invalid coordinates
+    with stage('clean', rows_in=len(merge_ba_carbon)) as step:
+        merge_ba_carbon['Longitude_of_data_center'] = pd.to_numeric(merge_ba_carbon['Longitude_of_data_center'], errors='coerce')
+        merge_ba_carbon['Latitude_of_data_center'] = pd.to_numeric(merge_ba_carbon['Latitude_of_data_center'], errors='coerce')
+        merge_ba_carbon = merge_ba_carbon.dropna(subset=['Longitude_of_data_center', 'Latitude_of_data_center'])
+        step.rows_out = len(merge_ba_carbon)
+
+    # Build the data center points in one vectorized call
+    merge_ba_carbon['geometry'] = shapely.points(merge_ba_carbon['Longitude_of_data_center'].to_numpy(),
+                                                 merge_ba_carbon['Latitude_of_data_center'].to_numpy())
+
+    # Load the county STRtree (tl_2024_us_county.shp is read and reprojected only the first
+    # time, or when it changes; the polygons are cached in county_index.pkl)
+    with stage('load_county_tree'):
+        county_tree = load_county_tree()
+
+    # Find the county (GEOID) of each data center; points on borders or just off the
+    # coastline fall back to the nearest county
+    with stage('assign_fips', rows_in=len(merge_ba_carbon)) as step:
+        fips_codes, method = assign_fips(merge_ba_carbon['Longitude_of_data_center'],
+                                         merge_ba_carbon['Latitude_of_data_center'], county_tree)
+        merge_ba_carbon['fips_code'] = fips_codes.to_numpy()
+        step.rows_out = int(fips_codes.notna().sum())
+    print(method.value_counts(dropna=False).to_string())
+
+    # Save the resulting DataFrame
+    with stage('write', rows_in=len(merge_ba_carbon)):
+        merge_ba_carbon.to_csv('Merge_BA_Carbon_with_FIPS.csv', index=False)
+    run.rows_out = len(merge_ba_carbon)
 
 print(merge_ba_carbon.head())
-print(merge_ba_carbon.info())
\ No newline at end of file
+print(merge_ba_carbon.info())
@@ -1,23 +1,46 @@
+import os
+import sys
+
 import pandas as pd
 
-# Load the merged data
-merge_ba_carbon_with_fips = pd.read_csv('Merge_BA_Carbon_with_FIPS.csv')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from DS.data_center_table import write_data_centers  # noqa: E402
+from DS.rollup_cube import build_cube, write_cube  # noqa: E402
+from instrument import stage  # noqa: E402
+
+with stage('group_data_centers') as run:
+    # Load the merged data
+    with stage('read') as step:
+        merge_ba_carbon_with_fips = pd.read_csv('Merge_BA_Carbon_with_FIPS.csv')
+        step.rows_out = run.rows_in = len(merge_ba_carbon_with_fips)
+
+    # Ensure fips_code is an integer (handle any NaN or float values)
+    merge_ba_carbon_with_fips['fips_code'] = merge_ba_carbon_with_fips['fips_code'].astype('Int64')
+
+    # Group by FIPS code and aggregate into lists
+    with stage('groupby', rows_in=len(merge_ba_carbon_with_fips)) as step:
+        grouped_by_fips = merge_ba_carbon_with_fips.groupby('fips_code').agg(
+            data_centers=('Data_center', list),  # Collect data center names into a list
+            total_power_usage_kwh=('power_usage_2023_kwh', list),  # Collect power usage into a list
+            total_carbon_emission_2023_tons=('carbon_emission_2023_tons', list)  # Collect carbon emission into a list
+        ).reset_index()
+        step.rows_out = run.rows_out = len(grouped_by_fips)
 
-# Ensure fips_code is an integer (handle any NaN or float values)
-merge_ba_carbon_with_fips['fips_code'] = merge_ba_carbon_with_fips['fips_code'].astype('Int64')
+    # Convert fips_code to integer after grouping (handling potential NaN)
+    grouped_by_fips['fips_code'] = grouped_by_fips['fips_code'].astype('Int64')
 
-# Group by FIPS code and aggregate into lists
-grouped_by_fips = merge_ba_carbon_with_fips.groupby('fips_code').agg(
-    data_centers=('Data_center', list),  # Collect data center names into a list
-    total_power_usage_kwh=('power_usage_2023_kwh', list),  # Collect power usage into a list
-    total_carbon_emission_2023_tons=('carbon_emission_2023_tons', list)  # Collect carbon emission into a list
-).reset_index()
+    # Power and carbon per facility, county, state, balancing authority zone and in total
+    with stage('rollup_cube', rows_in=len(merge_ba_carbon_with_fips)) as step:
+        cube = build_cube(merge_ba_carbon_with_fips)
+        step.rows_out = len(cube)
 
-# Convert fips_code to integer after grouping (handling potential NaN)
-grouped_by_fips['fips_code'] = grouped_by_fips['fips_code'].astype('Int64')
+    with stage('write', rows_in=len(merge_ba_carbon_with_fips)):
+        # Save the grouped data to a new CSV file
+        grouped_by_fips.to_csv('Grouped_By_FIPS_List.csv', index=False)
 
-# Save the grouped data to a new CSV file
-grouped_by_fips.to_csv('Grouped_By_FIPS_List.csv', index=False)
+        # Save one row per data center with proper dtypes for the analysis scripts
+        write_data_centers(merge_ba_carbon_with_fips, 'Data_Centers.parquet')
+        write_cube(cube, 'Data_Center_Cube.parquet')
 
 # Print the first few rows of the grouped data
 print(grouped_by_fips.head(10).to_string())
@@ -0,0 +1,79 @@
+"""Columnar, one-row-per-data-center storage keyed by FIPS code.
+
+``Grouped_By_FIPS_List.csv`` stores names, power and carbon as stringified lists per
+county, which consumers re-parsed with ``eval``. The data center table keeps one row
+per facility with real dtypes in Parquet (or Arrow/Feather), and the loader returns
+the per-FIPS rollup directly.
+"""
+import ast
+
+import numpy as np
+import pandas as pd
+
+from rollups import grouped_rollup
+
+DATA_CENTER_DTYPES = {'fips_code': 'Int32', 'Data_center': 'string', 'Zone_id': 'category',
+                      'power_usage_2023_kwh': 'float64', 'power_usage_per_hour_2023_kwh': 'float64',
+                      'carbon_emission_2023_tons': 'float64', 'carbon_emission_per_hour_2023_tons': 'float64'}
+
+
+def write_data_centers(data_centers, path):
+    """Write one row per data center; the format follows the file suffix (.parquet, .arrow/.feather, .csv)."""
+    columns = [c for c in DATA_CENTER_DTYPES if c in data_centers.columns]
+    table = data_centers[columns].astype({c: DATA_CENTER_DTYPES[c] for c in columns})
+    table = table.sort_values('fips_code', kind='stable').reset_index(drop=True)
+    if path.endswith('.parquet'):
+        table.to_parquet(path, index=False)
+    elif path.endswith(('.arrow', '.feather')):
+        table.to_feather(path)
+    else:
+        table.to_csv(path, index=False)
+
+
+def load_data_centers(path, columns=None):
+    """Read the data center table; the legacy grouped list CSV is converted on the fly."""
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path, columns=columns, memory_map=True)
+    if path.endswith(('.arrow', '.feather')):
+        return pd.read_feather(path, columns=columns, memory_map=True)
+    table = pd.read_csv(path)
+    if 'data_centers' in table.columns:
+        table = data_centers_from_legacy_csv(table)
+    table = table.astype({c: DATA_CENTER_DTYPES[c] for c in table.columns if c in DATA_CENTER_DTYPES})
+    return table if columns is None else table[columns]
+
+
+def load_data_center_rollup(path, stats=()):
+    """Per-FIPS data center summary: facility count, mean power usage and mean carbon emission.
+
+    A county with a missing power or carbon value gets NaN for that mean, as the list
+    means in the analysis script did. ``stats`` adds more statistics of both columns,
+    e.g. ``('sum', 'max')`` gives ``power_usage_2023_kwh_sum`` and so on.
+    """
+    table = load_data_centers(path, columns=['fips_code', 'power_usage_2023_kwh', 'carbon_emission_2023_tons'])
+    table = table.dropna(subset=['fips_code'])
+    columns = ['power_usage_2023_kwh', 'carbon_emission_2023_tons']
+    rolled = grouped_rollup(table, 'fips_code', columns, ['size', 'mean', *stats], skipna=False)
+    rollup = pd.DataFrame({
+        'number_of_data_centers': rolled['power_usage_2023_kwh_size'],
+        'avg_power_usage': rolled['power_usage_2023_kwh_mean'],
+        'avg_carbon_emission': rolled['carbon_emission_2023_tons_mean'],
+    })
+    for column in columns:
+        for stat in stats:
+            rollup[f'{column}_{stat}'] = rolled[f'{column}_{stat}']
+    return rollup.reset_index()
+
+
+def data_centers_from_legacy_csv(grouped):
+    """Explode ``Grouped_By_FIPS_List.csv`` into one row per data center (``literal_eval``, never ``eval``)."""
+    names = grouped['data_centers'].map(ast.literal_eval)
+    counts = names.str.len().to_numpy()
+    table = pd.DataFrame({'fips_code': np.repeat(grouped['fips_code'].to_numpy(), counts)})
+    table['Data_center'] = [name for cell in names for name in cell]
+    for legacy, column in [('total_power_usage_kwh', 'power_usage_2023_kwh'),
+                           ('total_carbon_emission_2023_tons', 'carbon_emission_2023_tons')]:
+        text = ','.join(grouped[legacy].str.strip('[]'))
+        table[column] = np.array(text.split(','), dtype='float64')
+    return table
+
@@ -0,0 +1,89 @@
+"""Point-in-county lookup for data center coordinates on a prebuilt STRtree.
+
+Reading ``tl_2024_us_county.shp``, reprojecting it and running ``gpd.sjoin`` costs
+seconds on every run. Here the county polygons are read once, stored as WKB with
+their GEOIDs in ``county_index.pkl``, and later runs only decode the WKB and bulk
+load an STRtree (shapely >= 2). Batch queries then work on vectorized point arrays:
+
+1. points outside the bounding box of all counties are skipped outright;
+2. the tree's bounding-box search is refined with ``intersects``, so points lying
+   exactly on a county line still match (the first county wins);
+3. points still unmatched (offshore coordinates, coastline slivers) take the nearest
+   county within ``max_distance`` degrees.
+"""
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+import shapely
+from shapely import STRtree
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+COUNTY_SHAPEFILE = os.path.join(HERE, 'tl_2024_us_county.shp')
+INDEX_PATH = os.path.join(HERE, 'county_index.pkl')
+
+CRS = 'EPSG:4326'
+NEAREST_MAX_DISTANCE = 0.1  # degrees, about 10 km
+
+
+def build_county_index(shapefile=COUNTY_SHAPEFILE, path=INDEX_PATH, id_column='GEOID'):
+    """Read the county shapefile once and persist GEOIDs and WKB geometries in the same CRS as the points."""
+    # geopandas is only needed for this one-off read, not for queries
+    import geopandas as gpd
+
+    counties = gpd.read_file(shapefile, columns=[id_column]).to_crs(CRS)
+    stat = os.stat(shapefile)
+    index = {'source': (os.path.abspath(shapefile), stat.st_size, stat.st_mtime_ns),
+             'ids': counties[id_column].to_numpy(dtype=object),
+             'wkb': shapely.to_wkb(counties.geometry.to_numpy())}
+    with open(path, 'wb') as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return index
+
+
+def load_county_tree(path=INDEX_PATH, shapefile=COUNTY_SHAPEFILE):
+    """Return ``(tree, ids, bounds)``; the index is rebuilt only if the shapefile changed."""
+    index = None
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            index = pickle.load(f)
+        if os.path.exists(shapefile):
+            stat = os.stat(shapefile)
+            if index['source'][1:] != (stat.st_size, stat.st_mtime_ns):
+                index = None
+    if index is None:
+        index = build_county_index(shapefile, path)
+    geometries = shapely.from_wkb(index['wkb'])
+    return STRtree(geometries), index['ids'], shapely.total_bounds(geometries)
+
+
+def assign_fips(longitudes, latitudes, county_tree=None, max_distance=NEAREST_MAX_DISTANCE):
+    """County GEOID for each point; returns ``(geoids, method)`` as Series ('within', 'nearest' or None)."""
+    tree, ids, (xmin, ymin, xmax, ymax) = load_county_tree() if county_tree is None else county_tree
+    x = pd.to_numeric(pd.Series(longitudes), errors='coerce').to_numpy(dtype='float64')
+    y = pd.to_numeric(pd.Series(latitudes), errors='coerce').to_numpy(dtype='float64')
+    geoids = np.full(len(x), None, dtype=object)
+    method = np.full(len(x), None, dtype=object)
+
+    # Bounding-box prefilter over the whole county layer (also drops NaN coordinates)
+    margin = max_distance or 0
+    inside = (x >= xmin - margin) & (x <= xmax + margin) & (y >= ymin - margin) & (y <= ymax + margin)
+    candidates = np.flatnonzero(inside)
+    points = shapely.points(x[candidates], y[candidates])
+
+    point_idx, county_idx = tree.query(points, predicate='intersects')
+    # A point on a shared border hits several counties; keep the first one
+    first = np.unique(point_idx, return_index=True)[1]
+    hit = candidates[point_idx[first]]
+    geoids[hit] = ids[county_idx[first]]
+    method[hit] = 'within'
+
+    if max_distance:
+        missing = np.setdiff1d(np.arange(len(candidates)), point_idx[first], assume_unique=True)
+        if len(missing):
+            near_point, near_county = tree.query_nearest(points[missing], max_distance=max_distance, all_matches=False)
+            rows = candidates[missing[near_point]]
+            geoids[rows] = ids[near_county]
+            method[rows] = 'nearest'
+    return pd.Series(geoids, name='fips_code'), pd.Series(method, name='method')
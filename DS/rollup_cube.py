@@ -0,0 +1,127 @@
+"""Grouping-sets rollup of data center power and carbon: facility, county, state, BA zone, total.
+
+Every level holds, for each of the four power and carbon columns, the count of
+non-missing values, their sum, mean and max, plus the number of facilities. The raw
+rows are grouped once, into (county, zone) cells. Counts, sums and maxima roll up
+from those cells to the county, state, zone and total levels, and means are sum /
+count at the end, so no level goes back to the raw rows. Counties can lie in more
+than one balancing authority, so zone is a separate branch rather than a parent of
+state.
+
+The cube is one table keyed by (level, key), with keys as text:
+
+    level      key
+    facility   row of Merge_BA_Carbon_with_FIPS.csv ('0', '1', ...)
+    county     five-digit FIPS code ('06037')
+    state      two-digit state FIPS code ('06')
+    zone       Zone_id ('US-CAL-CISO')
+    total      'all'
+
+Facilities without a FIPS code are in the zone and total levels only.
+
+    cube = load_cube('Data_Center_Cube.parquet')
+    lookup(cube, 'state', 6)['power_usage_2023_kwh_sum']
+"""
+import numpy as np
+import pandas as pd
+
+CUBE_COLUMNS = ['power_usage_2023_kwh', 'power_usage_per_hour_2023_kwh',
+                'carbon_emission_2023_tons', 'carbon_emission_per_hour_2023_tons']
+LEVELS = ['facility', 'county', 'state', 'zone', 'total']
+KEY_WIDTH = {'county': 5, 'state': 2}
+
+
+def _partials(frame, by, columns):
+    """facilities, and count / sum / max of each column, per group of ``by``."""
+    grouped = frame.groupby(by, sort=True, observed=True, dropna=False)
+    parts = {'facilities': grouped.size()}
+    for column in columns:
+        parts[f'{column}_count'] = grouped[column].count()
+        parts[f'{column}_sum'] = grouped[column].sum()
+        parts[f'{column}_max'] = grouped[column].max()
+    return pd.DataFrame(parts)
+
+
+def _roll_up(cells, by, columns):
+    """Combine (county, zone) partials into a coarser level: counts and sums add, maxima take the max."""
+    grouped = cells.groupby(by, sort=True, observed=True)
+    agg = {'facilities': 'sum'}
+    for column in columns:
+        agg.update({f'{column}_count': 'sum', f'{column}_sum': 'sum', f'{column}_max': 'max'})
+    return grouped.agg(agg)
+
+
+def build_cube(data_centers, columns=CUBE_COLUMNS):
+    """The rollup cube of a data center table (fips_code, Zone_id and ``columns``), keyed by (level, key)."""
+    table = data_centers[['fips_code', 'Zone_id'] + list(columns)].reset_index(drop=True)
+    table['fips_code'] = pd.to_numeric(table['fips_code'], errors='coerce').astype('Int32')
+
+    # The one grouping of the raw rows; every coarser level is built from these cells
+    cells = _partials(table, ['fips_code', 'Zone_id'], columns).reset_index()
+    cells['state'] = cells['fips_code'] // 1000
+    has_county = cells['fips_code'].notna()
+
+    facility = table.assign(facilities=1)
+    for column in columns:
+        present = facility[column].notna()
+        facility[f'{column}_count'] = present.astype('int64')
+        facility[f'{column}_sum'] = facility[column].where(present, 0.0)
+        facility[f'{column}_max'] = facility[column]
+
+    levels = {
+        'facility': facility,
+        'county': _roll_up(cells[has_county], 'fips_code', columns),
+        'state': _roll_up(cells[has_county], 'state', columns),
+        'zone': _roll_up(cells, 'Zone_id', columns),
+        'total': _roll_up(cells.assign(total='all'), 'total', columns),
+    }
+    frames = []
+    for level, frame in levels.items():
+        key = pd.Series(frame.index)
+        key = key.astype('int64').astype(str).str.zfill(KEY_WIDTH[level]) if level in KEY_WIDTH else key.astype(str)
+        out = pd.DataFrame({'level': level, 'key': key.to_numpy()})
+        out['facilities'] = frame['facilities'].to_numpy(dtype='int64')
+        for column in columns:
+            count = frame[f'{column}_count'].to_numpy(dtype='float64')
+            total = frame[f'{column}_sum'].to_numpy(dtype='float64')
+            out[f'{column}_count'] = count.astype('int64')
+            out[f'{column}_sum'] = total
+            with np.errstate(invalid='ignore', divide='ignore'):
+                out[f'{column}_mean'] = np.where(count > 0, total / count, np.nan)
+            out[f'{column}_max'] = frame[f'{column}_max'].to_numpy(dtype='float64')
+        frames.append(out)
+    cube = pd.concat(frames, ignore_index=True)
+    cube['level'] = pd.Categorical(cube['level'], categories=LEVELS)
+    return cube.set_index(['level', 'key'])
+
+
+def write_cube(cube, path):
+    """Write the cube; the format follows the file suffix (.parquet, .arrow/.feather, .csv)."""
+    table = cube.reset_index()
+    if path.endswith('.parquet'):
+        table.to_parquet(path, index=False)
+    elif path.endswith(('.arrow', '.feather')):
+        table.to_feather(path)
+    else:
+        table.to_csv(path, index=False)
+
+
+def load_cube(path):
+    """Read a cube written by ``write_cube``, indexed by (level, key) for hashed lookups."""
+    if path.endswith('.parquet'):
+        table = pd.read_parquet(path, memory_map=True)
+    elif path.endswith(('.arrow', '.feather')):
+        table = pd.read_feather(path, memory_map=True)
+    else:
+        table = pd.read_csv(path, dtype={'key': str})
+    table['level'] = pd.Categorical(table['level'].astype(str), categories=LEVELS)
+    return table.set_index(['level', 'key'])
+
+
+def lookup(cube, level, key):
+    """The cube row of one (level, key); integer county and state codes are zero-padded."""
+    if level not in LEVELS:
+        raise KeyError(f'unknown level {level!r}; levels: {", ".join(LEVELS)}')
+    if not isinstance(key, str):
+        key = str(int(key)).zfill(KEY_WIDTH.get(level, 0))
+    return cube.loc[(level, key)]
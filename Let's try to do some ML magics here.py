@@ -2,70 +2,70 @@ import pandas as pd
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 from sklearn.impute import SimpleImputer
-from sklearn.compose import ColumnTransformer
 
-# ==================== Data Processing ================
-# Load your dataset
-data = pd.read_csv('Merged for ML.csv')
+from instrument import stage
+from ml_data import load_ml_matrix
 
-# Define numerical columns
-num_cols = data.columns.drop('sum_duration_hrs')  # Exclude target column
+with stage('ml_baseline') as run:
+    # ==================== Data Processing ================
+    # Load the dataset as one float32 matrix. The loader drops all-null and near-constant
+    # columns and keeps fips_code out of the features; sum_duration_hrs is the outcome variable.
+    with stage('load') as step:
+        X, y, ids, num_cols, schema = load_ml_matrix('Merged for ML.csv')
+        step.rows_out = run.rows_in = len(y)
+    print(f"{len(num_cols)} of {len(schema)} columns used as features")
 
-# Define preprocessing for numerical features: impute missing values (if any) and scale
-num_pipeline = Pipeline([
-    ('imputer', SimpleImputer(strategy='constant', fill_value=0)),  # Fill missing values with mean
-    ('scaler', StandardScaler())  # Standardize numerical values
-])
+    # Define preprocessing for numerical features: impute missing values (if any) and scale
+    num_pipeline = Pipeline([
+        ('imputer', SimpleImputer(strategy='constant', fill_value=0)),  # Fill missing values with 0
+        ('scaler', StandardScaler(copy=False))  # Standardize the imputer's output in place
+    ])
 
-# Since we have only numerical columns, we only use num_pipeline
-preprocessor = ColumnTransformer([
-    ('num', num_pipeline, num_cols)
-])
+    # Create processed feature matrix
+    with stage('preprocess', rows_in=len(X)):
+        X_processed = num_pipeline.fit_transform(X)
 
-# Apply the transformation
-X = data.drop('sum_duration_hrs', axis=1)  # sum_duration_hrs is the outcome variable
-y = data['sum_duration_hrs']  # Define target variable
+    # Optional: Convert back to DataFrame for better readability
+    X_processed_df = pd.DataFrame(X_processed, columns=num_cols)
 
-# Create processed feature matrix
-X_processed = preprocessor.fit_transform(X)
+    # Display processed data
+    print(X_processed_df.head())
 
-# Optional: Convert back to DataFrame for better readability
-X_processed_df = pd.DataFrame(X_processed, columns=num_cols)
+    # ============================= Baseline Model Development ====================
+    # Single-split baseline; ml_train.py runs the state-grouped, cross-validated model search
+    from sklearn.linear_model import Lasso
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+    import numpy as np
+    from sklearn.model_selection import train_test_split
 
-# Display processed data
-print(X_processed_df.head())
+    # Split the processed data into training and testing sets (adjust test size as needed)
+    X_train, X_test, y_train, y_test = train_test_split(X_processed, y, test_size=0.3, random_state=42)
 
-# ============================= Baseline Model Development ====================
-from sklearn.linear_model import Lasso
-from sklearn.metrics import mean_absolute_error, mean_squared_error
-import numpy as np
-from sklearn.model_selection import train_test_split
-
-# Split the processed data into training and testing sets (adjust test size as needed)
-X_train, X_test, y_train, y_test = train_test_split(X_processed, y, test_size=0.3, random_state=42)
-
-# Initialize the LASSO regression model
-# You may need to tune the alpha parameter (regularization strength) using cross-validation
-baseline_model = Lasso(alpha=0.1, random_state=1)
-baseline_model.fit(X_train, y_train)
+    # Initialize the LASSO regression model
+    # You may need to tune the alpha parameter (regularization strength) using cross-validation
+    baseline_model = Lasso(alpha=0.1, random_state=1)
+    with stage('fit', rows_in=len(X_train)):
+        baseline_model.fit(X_train, y_train)
 
-# Predict on the test set
-y_pred = baseline_model.predict(X_test)
+    # Predict on the test set
+    with stage('predict', rows_in=len(X_test)) as step:
+        y_pred = baseline_model.predict(X_test)
+        step.rows_out = run.rows_out = len(y_pred)
 
-# Evaluate performance using metrics such as Mean Absolute Error and Root Mean Squared Error
-mae = mean_absolute_error(y_test, y_pred)
-rmse = np.sqrt(mean_squared_error(y_test, y_pred))
+    # Evaluate performance using metrics such as Mean Absolute Error and Root Mean Squared Error
+    mae = mean_absolute_error(y_test, y_pred)
+    rmse = np.sqrt(mean_squared_error(y_test, y_pred))
 
-print("LASSO Regression Baseline Model")
-print("Mean Absolute Error (MAE):", mae)
-print("Root Mean Squared Error (RMSE):", rmse)
+    print("LASSO Regression Baseline Model")
+    print("Mean Absolute Error (MAE):", mae)
+    print("Root Mean Squared Error (RMSE):", rmse)
 
 
 # ========================== Feature Importance and Interpretation ============
 import numpy as np
 
-# Assuming the model is linear (like LogisticRegression)
-coefficients = baseline_model.coef_[0]
+# Lasso has a 1-D coef_ with one coefficient per feature (coef_[0] would be a single scalar)
+coefficients = baseline_model.coef_
 # If you want to map the coefficients back to feature names:
 # First, get feature names from the preprocessor:
 feature_names_num = num_cols
@@ -1,67 +1,80 @@
-import pandas as pd
-from datetime import timedelta
+import argparse
+import os
+import sys
 
-# Load the outages data
-outages = pd.read_csv('eaglei_outages_2023.csv')
+import pandas as pd
 
-# Ensure 'run_start_time' is datetime
-outages['run_start_time'] = pd.to_datetime(outages['run_start_time'])
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Outage.event_table import write_events  # noqa: E402
+from Outage.events import MIN_CUSTOMERS, detect_events, rollup_events  # noqa: E402
+from Outage.panel import build_panel  # noqa: E402
+from Outage.stream import events_from_chunks, read_outages_chunked  # noqa: E402
+from instrument import stage  # noqa: E402
 
-# Filter for outages with 'sum' >= 10
-outages = outages[outages['sum'] >= 10]
+parser = argparse.ArgumentParser(description='Aggregate EAGLE-I outage runs into events per county.')
+parser.add_argument('input', nargs='?', default='eaglei_outages_2023.csv')
+parser.add_argument('--output', default='Aggregated_Outage_Events.csv')
+parser.add_argument('--events-output', default='Outage_Events.parquet',
+                    help='one-row-per-event table (.parquet, .arrow/.feather or .csv)')
+parser.add_argument('--panel-output', default='Outage_Panel',
+                    help="county x hour panel directory (Outage/panel.py); '' to skip it")
+parser.add_argument('--chunksize', type=int, default=None,
+                    help='stream the feed in chunks of this many rows to keep memory flat')
+args = parser.parse_args()
 
-# Sort by fips_code and run_start_time
-outages = outages.sort_values(by=['fips_code', 'run_start_time']).reset_index(drop=True)
 
-def aggregate_outages(group):
-    """Aggregate outages into events for a single fips_code."""
-    start_times, end_times, durations, sums = [], [], [], []
-    current_start, current_end, current_sums = None, None, []
+def counted(chunks, counter):
+    # Pass chunks through, adding their rows to counter['rows']
+    for chunk in chunks:
+        counter['rows'] += len(chunk)
+        yield chunk
 
-    for _, row in group.iterrows():
-        start_time = row['run_start_time']
-        end_time = start_time + timedelta(minutes=15)  # Fixed duration of 15 minutes
-        outage_sum = row['sum']
 
-        if current_start is None:
-            # Start a new event
-            current_start, current_end = start_time, end_time
-            current_sums = [outage_sum]
-        elif start_time - current_end <= timedelta(hours=2):
-            # Extend the current event
-            current_end = max(current_end, end_time)
-            current_sums.append(outage_sum)
-        else:
-            # Save the current event and start a new one
-            start_times.append(current_start)
-            end_times.append(current_end)
-            durations.append((current_end - current_start).total_seconds() / 3600)
-            sums.append(sum(current_sums))
-            current_start, current_end = start_time, end_time
-            current_sums = [outage_sum]
+with stage('aggregate_outages') as run:
+    if args.chunksize:
+        # Streaming mode: typed chunks, filter per chunk, open events carried between chunks
+        with stage('stream_events') as step:
+            # Rows are counted after the customer filter, which is pushed down into the reader
+            counter = {'rows': 0}
+            chunks = counted(read_outages_chunked(args.input, args.chunksize), counter)
+            events = pd.concat(events_from_chunks(chunks), ignore_index=True)
+            step.rows_in = run.rows_in = counter['rows']
+            step.rows_out = len(events)
+    else:
+        # Load the outages data
+        with stage('read') as step:
+            outages = pd.read_csv(args.input)
+            step.rows_out = run.rows_in = len(outages)
 
-    # Add the last event
-    if current_start is not None:
-        start_times.append(current_start)
-        end_times.append(current_end)
-        durations.append((current_end - current_start).total_seconds() / 3600)
-        sums.append(sum(current_sums))
+        # Ensure 'run_start_time' is datetime
+        with stage('parse_dates', rows_in=len(outages)):
+            outages['run_start_time'] = pd.to_datetime(outages['run_start_time'])
 
-    # Aggregate information
-    return pd.Series({
-        'start_times': start_times,
-        'end_times': end_times,
-        'durations_hrs': durations,
-        'sums': sums,
-        'counts_of_outage': len(start_times),
-        'average_sums': sum(sums) / len(sums) if sums else 0
-    })
+        # Filter for outages with 'sum' >= 10
+        with stage('filter', rows_in=len(outages)) as step:
+            outages = outages[outages['sum'] >= MIN_CUSTOMERS]
+            step.rows_out = len(outages)
 
-# Apply the aggregation function to each group
-aggregated_outages = outages.groupby(['fips_code', 'county', 'state']).apply(aggregate_outages).reset_index()
+        # Aggregate the 15-minute runs into events for every fips_code at once
+        # (sorting by fips_code and run_start_time happens inside the engine)
+        with stage('detect_events', rows_in=len(outages)) as step:
+            events = detect_events(outages)
+            step.rows_out = len(events)
 
-# Save the aggregated data to a new CSV
-aggregated_outages.to_csv('Aggregated_Outage_Events.csv', index=False)
+    # Save one row per event for the analysis scripts, and the per-county lists as before
+    with stage('write_events', rows_in=len(events)):
+        write_events(events, args.events_output)
+    if args.panel_output:
+        # County x hour panel of customers out and active events; streaming mode reads the feed again
+        runs = read_outages_chunked(args.input, args.chunksize) if args.chunksize else outages
+        with stage('write_panel', rows_in=len(events)) as step:
+            step.rows_out = build_panel(runs, events, args.panel_output)
+    with stage('rollup', rows_in=len(events)) as step:
+        aggregated_outages = rollup_events(events)
+        step.rows_out = len(aggregated_outages)
+    with stage('write_rollup', rows_in=len(aggregated_outages)):
+        aggregated_outages.to_csv(args.output, index=False)
+    run.rows_out = len(events)
 
 # Print the first few rows
 print(aggregated_outages.head())
@@ -0,0 +1,88 @@
+"""Columnar, one-row-per-event storage for aggregated outages.
+
+``Aggregated_Outage_Events.csv`` keeps the events of a county as stringified lists
+that every consumer has to parse again. The event table stores one row per event
+with real dtypes in Parquet (or Arrow/Feather), and the loaders read it memory-mapped
+and return the per-FIPS rollups the analysis scripts use.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from rollups import grouped_rollup
+
+from .events import EVENT_COLUMNS, KEYS
+
+EVENT_DTYPES = {'fips_code': 'int32', 'county': 'category', 'state': 'category',
+                'start_time': 'datetime64[ns]', 'end_time': 'datetime64[ns]',
+                'duration_hrs': 'float64', 'sum': 'int64'}
+
+
+def write_events(events, path):
+    """Write one row per event; the format follows the file suffix (.parquet, .arrow/.feather, .csv)."""
+    events = events[EVENT_COLUMNS].astype(EVENT_DTYPES)
+    events = events.sort_values(['fips_code', 'start_time'], kind='stable').reset_index(drop=True)
+    if path.endswith('.parquet'):
+        events.to_parquet(path, index=False)
+    elif path.endswith(('.arrow', '.feather')):
+        events.to_feather(path)
+    else:
+        events.to_csv(path, index=False)
+
+
+def load_events(path, columns=None):
+    """Read the event table written by ``write_events``; legacy list CSVs are converted on the fly."""
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path, columns=columns, memory_map=True)
+    if path.endswith(('.arrow', '.feather')):
+        return pd.read_feather(path, columns=columns, memory_map=True)
+    header = pd.read_csv(path, nrows=0).columns
+    if 'start_times' in header:
+        events = events_from_legacy_csv(path)
+    else:
+        events = pd.read_csv(path, parse_dates=['start_time', 'end_time']).astype(EVENT_DTYPES)
+    return events if columns is None else events[columns]
+
+
+def load_outage_rollup(path, stats=()):
+    """Per-FIPS outage summary: counts, average event size, mean and total duration.
+
+    ``stats`` adds more statistics of both event columns, e.g. ``('max', 'p95')``
+    gives ``duration_hrs_max``, ``duration_hrs_p95``, ``sum_max`` and ``sum_p95``.
+    """
+    events = load_events(path)
+    rolled = grouped_rollup(events, KEYS, ['sum', 'duration_hrs'], ['size', 'sum', 'mean', *stats])
+    rollup = pd.DataFrame({
+        'counts_of_outage': rolled['sum_size'],
+        'average_sums': rolled['sum_mean'],
+        'avg_durations_hrs': rolled['duration_hrs_mean'],
+        'sum_duration_hrs': rolled['duration_hrs_sum'],
+        'sums_sum': rolled['sum_sum'],
+    })
+    for stat in stats:
+        rollup[f'duration_hrs_{stat}'] = rolled[f'duration_hrs_{stat}']
+        rollup[f'sum_{stat}'] = rolled[f'sum_{stat}']
+    rollup = rollup.reset_index()
+    return rollup.astype({'county': object, 'state': object})
+
+
+def events_from_legacy_csv(path):
+    """Explode ``Aggregated_Outage_Events.csv`` (lists stored as strings) into the event table."""
+    aggregated = pd.read_csv(path)
+    counts = aggregated['counts_of_outage'].to_numpy(dtype='int64')
+
+    def flat_numbers(column):
+        # One split over the whole column instead of one per cell
+        text = ','.join(aggregated[column].str.strip('[]'))
+        return np.array([v for v in text.split(',') if v.strip()], dtype='float64')
+
+    def flat_times(column):
+        return pd.to_datetime(re.findall(r"'([^']+)'", ''.join(aggregated[column])))
+
+    events = aggregated[KEYS].loc[aggregated.index.repeat(counts)].reset_index(drop=True)
+    events['start_time'] = flat_times('start_times')
+    events['end_time'] = flat_times('end_times')
+    events['duration_hrs'] = flat_numbers('durations_hrs')
+    events['sum'] = flat_numbers('sums')
+    return events.astype(EVENT_DTYPES)
@@ -0,0 +1,181 @@
+"""Incremental outage aggregation: fold new EAGLE-I months into the existing events.
+
+Run from the repository root, once per delivery:
+
+    python -m Outage.incremental data/eaglei_outages_2023_07.csv
+    python -m Outage.incremental data/eaglei_outages_2023_08.csv --events-output ''
+
+The state directory keeps, per county, the last (still open) event and the running
+totals of its closed events. The open event's end marks the county's watermark:
+rows of that county at or before it were already processed and are skipped, so a
+file delivered twice or overlapping the previous one is harmless. Only the new rows
+are read. They are turned into events and stitched onto the open events with the
+same 2-hour rule as the full run (``stitch_events``). Events that can no longer grow
+are appended to the state as a new part file, and the totals are updated. The
+per-county rollup (counts and averages) is rewritten from the totals, which costs
+one row per county.
+
+Rebuilding the event table (``--events-output``) concatenates the stored parts and
+does no event detection. The rows of each county must arrive in time order, as the
+monthly files do.
+
+State layout: ``state.json`` (parts, updates), ``open_events.parquet``,
+``totals.parquet`` and ``events-NNNNN.parquet``.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from instrument import stage
+
+from .event_table import write_events
+from .events import EVENT_COLUMNS, KEYS, MAX_GAP, MIN_CUSTOMERS, RUN_LENGTH, detect_events
+from .parallel import find_input_files
+from .stream import CHUNKSIZE, _plain_keys, read_outages_chunked, stitch_events
+
+STATE_DIR = '.outage_state'
+TOTAL_COLUMNS = ['closed_events', 'closed_sum', 'closed_duration_hrs']
+
+
+def load_state(directory=STATE_DIR):
+    """``(manifest, open_events, totals)``; an empty state when the directory has none yet."""
+    manifest_path = os.path.join(directory, 'state.json')
+    if not os.path.exists(manifest_path):
+        open_events = pd.DataFrame({c: pd.Series(dtype=t) for c, t in
+                                    zip(EVENT_COLUMNS, ['int64', object, object, 'datetime64[ns]',
+                                                        'datetime64[ns]', 'float64', 'int64'])})
+        totals = pd.DataFrame(columns=KEYS + TOTAL_COLUMNS).astype(
+            {'fips_code': 'int64', 'closed_events': 'int64', 'closed_sum': 'int64', 'closed_duration_hrs': 'float64'})
+        return {'parts': 0, 'updates': []}, open_events, totals
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    open_events = pd.read_parquet(os.path.join(directory, 'open_events.parquet'))
+    totals = pd.read_parquet(os.path.join(directory, 'totals.parquet'))
+    return manifest, open_events, totals
+
+
+def _new_rows(chunk, watermarks):
+    """Rows after their county's watermark; returns (rows, number skipped)."""
+    if watermarks.empty:
+        return chunk, 0
+    fips = chunk['fips_code'].to_numpy(dtype='int64')
+    position = np.minimum(np.searchsorted(watermarks.index.to_numpy(), fips), len(watermarks) - 1)
+    known = watermarks.index.to_numpy()[position] == fips
+    limit = np.where(known, watermarks.to_numpy()[position], np.datetime64('NaT'))
+    fresh = ~known | (chunk['run_start_time'].to_numpy('datetime64[ns]') > limit)
+    return chunk[fresh], int((~fresh).sum())
+
+
+def _add_totals(totals, closed):
+    """Add the closed events' counts, customer sums and durations to the per-county totals."""
+    if closed.empty:
+        return totals
+    delta = closed.groupby(KEYS, sort=False).agg(closed_events=('sum', 'size'), closed_sum=('sum', 'sum'),
+                                                 closed_duration_hrs=('duration_hrs', 'sum'))
+    merged = totals.set_index(KEYS)[TOTAL_COLUMNS].add(delta, fill_value=0)
+    return merged.reset_index().astype({'closed_events': 'int64', 'closed_sum': 'int64'})
+
+
+def update(paths, directory=STATE_DIR, chunksize=CHUNKSIZE, min_customers=MIN_CUSTOMERS, run_length=RUN_LENGTH,
+           max_gap=MAX_GAP):
+    """Fold the rows of ``paths`` into the state; returns a summary dict of the update."""
+    manifest, open_events, totals = load_state(directory)
+    os.makedirs(directory, exist_ok=True)
+    # A county's watermark is the start of its last processed run
+    watermarks = pd.Series(open_events['end_time'].to_numpy('datetime64[ns]') - run_length.to_timedelta64(),
+                           index=open_events['fips_code'].to_numpy(dtype='int64')).sort_index()
+
+    rows = skipped = 0
+    closed_parts = []
+    for chunk in read_outages_chunked(paths, chunksize, min_customers):
+        chunk, stale = _new_rows(chunk, watermarks)
+        skipped += stale
+        if chunk.empty:
+            continue
+        rows += len(chunk)
+        events = _plain_keys(detect_events(chunk, run_length, max_gap))
+        closed, open_events = stitch_events(open_events, events, run_length, max_gap)
+        if not closed.empty:
+            closed_parts.append(closed[EVENT_COLUMNS])
+
+    closed = pd.concat(closed_parts, ignore_index=True) if closed_parts else open_events.iloc[:0]
+    if not closed.empty:
+        closed.to_parquet(os.path.join(directory, f'events-{manifest["parts"]:05d}.parquet'), index=False)
+        manifest['parts'] += 1
+    totals = _add_totals(totals, closed)
+    summary = {'files': [os.path.basename(p) for p in paths], 'rows': rows, 'skipped_rows': skipped,
+               'closed_events': len(closed), 'open_events': len(open_events),
+               'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    manifest['updates'].append(summary)
+
+    # The manifest is replaced last: a failed update leaves the previous state readable
+    for name, frame in (('open_events', open_events[EVENT_COLUMNS]), ('totals', totals)):
+        frame.to_parquet(os.path.join(directory, f'{name}.parquet.tmp'), index=False)
+        os.replace(os.path.join(directory, f'{name}.parquet.tmp'), os.path.join(directory, f'{name}.parquet'))
+    with open(os.path.join(directory, 'state.json.tmp'), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(os.path.join(directory, 'state.json.tmp'), os.path.join(directory, 'state.json'))
+    return summary
+
+
+def county_rollup(directory=STATE_DIR):
+    """Per-county counts and averages of all events so far, from the totals and the open events.
+
+    Same columns as ``load_outage_rollup``: counts_of_outage, average_sums,
+    avg_durations_hrs, sum_duration_hrs and sums_sum.
+    """
+    _, open_events, totals = load_state(directory)
+    totals = _add_totals(totals, open_events).sort_values('fips_code', kind='stable').reset_index(drop=True)
+    count = totals['closed_events'].astype('float64')
+    return pd.DataFrame({
+        'fips_code': totals['fips_code'], 'county': totals['county'], 'state': totals['state'],
+        'counts_of_outage': count,
+        'average_sums': totals['closed_sum'] / count,
+        'avg_durations_hrs': totals['closed_duration_hrs'] / count,
+        'sum_duration_hrs': totals['closed_duration_hrs'],
+        'sums_sum': totals['closed_sum'].astype('float64'),
+    })
+
+
+def load_all_events(directory=STATE_DIR):
+    """Every event in the state: the closed parts followed by the open events."""
+    manifest, open_events, _ = load_state(directory)
+    parts = [pd.read_parquet(os.path.join(directory, f'events-{i:05d}.parquet')) for i in range(manifest['parts'])]
+    return pd.concat(parts + [open_events[EVENT_COLUMNS]], ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fold new EAGLE-I files into the stored outage events.')
+    parser.add_argument('inputs', nargs='+', help='new files, directories or glob patterns of EAGLE-I CSVs')
+    parser.add_argument('--state', default=STATE_DIR, help='state directory (default: %(default)s)')
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE)
+    parser.add_argument('--rollup-output', default='Outage_Rollup.csv', help='per-county counts and averages')
+    parser.add_argument('--events-output', default='Outage_Events.parquet',
+                        help="rebuilt one-row-per-event table; '' to skip it")
+    args = parser.parse_args(argv)
+
+    paths = find_input_files(args.inputs)
+    with stage('incremental_outages') as run:
+        with stage('update') as step:
+            summary = update(paths, args.state, args.chunksize)
+            step.rows_in = run.rows_in = summary['rows']
+            step.rows_out = summary['closed_events']
+        print(f"{summary['rows']} new rows ({summary['skipped_rows']} already processed), "
+              f"{summary['closed_events']} events closed, {summary['open_events']} open")
+        with stage('write_rollup') as step:
+            rollup = county_rollup(args.state)
+            rollup.to_csv(args.rollup_output, index=False)
+            step.rows_out = run.rows_out = len(rollup)
+        if args.events_output:
+            with stage('write_events') as step:
+                events = load_all_events(args.state)
+                write_events(events, args.events_output)
+                step.rows_out = len(events)
+
+
+if __name__ == '__main__':
+    main()
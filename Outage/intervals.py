@@ -0,0 +1,166 @@
+"""Interval index over outage events for overlap, point-in-time and k-longest queries.
+
+Events are partitioned by FIPS code. Within each county the start times and, in a
+separate array, the end times are sorted. Every county is laid out one after the
+other, and a time is stored as ``segment * 2**34 + seconds``, so one
+``np.searchsorted`` answers a whole batch of queries across counties at once:
+
+    events active during [a, b)  =  #(start < b) - #(end <= a)
+    events active at t           =  #(start <= t) - #(end <= t)
+
+Listing the overlapping events needs only the starts in ``[a - longest, b)``, where
+``longest`` is the county's longest event, because an event that started earlier has
+ended before ``a``. Events are ranked by duration within each county once, so the
+k longest events of a county are a slice.
+
+    index = load_event_index('Outage_Events.parquet')
+    index.count([6037, 6059], '2023-07-10', '2023-07-20')
+    query, rows = index.overlaps(fips, window_starts, window_ends)   # rows of the event table
+
+Times are stored to the second, which the 15-minute feed never goes below. The index
+is cached next to the event table and rebuilt when the table changes.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from .event_table import load_events
+
+SHIFT = 2 ** 34  # seconds of a segment: 1970 to about 2514
+CACHE_SUFFIX = '.intervals.npz'
+ARRAYS = ('fips', 'offsets', 'starts', 'ends', 'longest', 'rows', 'end_rank', 'by_duration')
+
+
+def _seconds(values, ceil=False):
+    """int64 seconds since 1970 of datetimes (scalars, lists or arrays), rounded down or up."""
+    ns = pd.to_datetime(np.atleast_1d(np.asarray(values, dtype=object))).to_numpy('datetime64[ns]').astype('int64')
+    seconds = -(-ns // 10 ** 9) if ceil else ns // 10 ** 9
+    return np.clip(seconds, 0, SHIFT - 1)
+
+
+class EventIndex:
+    """Sorted per-county start and end arrays of one event table.
+
+    ``rows`` maps an index position to the row of the event table it was built from;
+    query results are event table rows.
+    """
+
+    def __init__(self, fips, offsets, starts, ends, longest, rows, end_rank, by_duration):
+        self.fips = fips
+        self.offsets = offsets
+        self.starts = starts
+        self.ends = ends
+        self.longest = longest
+        self.rows = rows
+        self.end_rank = end_rank
+        self.by_duration = by_duration
+        segment = np.repeat(np.arange(len(fips), dtype='int64'), np.diff(offsets))
+        self._start_keys = segment * SHIFT + starts
+        self._end_keys = segment[end_rank] * SHIFT + ends[end_rank]
+
+    @classmethod
+    def from_events(cls, events):
+        """Build the index from an event table (fips_code, start_time, end_time)."""
+        fips_codes = events['fips_code'].to_numpy(dtype='int64')
+        starts = _seconds(events['start_time'].to_numpy())
+        ends = _seconds(events['end_time'].to_numpy(), ceil=True)
+        rows = np.lexsort((starts, fips_codes))
+        fips_codes, starts, ends = fips_codes[rows], starts[rows], ends[rows]
+
+        fips, first = np.unique(fips_codes, return_index=True)
+        offsets = np.append(first, len(rows)).astype('int64')
+        segment = np.repeat(np.arange(len(fips)), np.diff(offsets))
+        durations = ends - starts
+        longest = np.maximum.reduceat(durations, first) if len(rows) else np.empty(0, dtype='int64')
+        # Positions sorted by end time, and by descending duration, within each county
+        end_rank = np.lexsort((ends, segment))
+        by_duration = np.lexsort((-durations, segment))
+        return cls(fips, offsets, starts, ends, longest, rows, end_rank, by_duration)
+
+    def save(self, path):
+        np.savez(path, **{name: getattr(self, name) for name in ARRAYS})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            return cls(*(arrays[name] for name in ARRAYS))
+
+    def _segments(self, fips):
+        """Segment of each queried FIPS code and whether the index has it."""
+        fips = np.asarray(fips, dtype='int64')
+        segment = np.minimum(np.searchsorted(self.fips, fips), max(len(self.fips) - 1, 0))
+        found = (self.fips[segment] == fips) if len(self.fips) else np.zeros(fips.shape, dtype=bool)
+        return segment, found
+
+    def _window(self, fips, start, end):
+        fips, start, end = np.broadcast_arrays(np.atleast_1d(fips), _seconds(start), _seconds(end, ceil=True))
+        segment, found = self._segments(fips)
+        return segment, found, start, end
+
+    def count(self, fips, start, end):
+        """Number of events of each county that overlap [start, end); arguments broadcast."""
+        segment, found, start, end = self._window(fips, start, end)
+        started = np.searchsorted(self._start_keys, segment * SHIFT + end, side='left')
+        ended = np.searchsorted(self._end_keys, segment * SHIFT + start, side='right')
+        return np.where(found, started - ended, 0)
+
+    def count_at(self, fips, time):
+        """Number of events of each county in progress at ``time``."""
+        fips, time = np.broadcast_arrays(np.atleast_1d(fips), _seconds(time))
+        segment, found = self._segments(fips)
+        started = np.searchsorted(self._start_keys, segment * SHIFT + time, side='right')
+        ended = np.searchsorted(self._end_keys, segment * SHIFT + time, side='right')
+        return np.where(found, started - ended, 0)
+
+    def overlaps(self, fips, start, end):
+        """``(query, rows)``: every (query, event) pair where the event overlaps the window.
+
+        ``query`` indexes the broadcast queries and ``rows`` the event table; pairs are
+        ordered by query, then by event start.
+        """
+        return self._overlaps(*self._window(fips, start, end))
+
+    def active_at(self, fips, time):
+        """``(query, rows)`` of the events in progress at ``time``."""
+        fips, time = np.broadcast_arrays(np.atleast_1d(fips), _seconds(time))
+        segment, found = self._segments(fips)
+        return self._overlaps(segment, found, time, time + 1)
+
+    def _overlaps(self, segment, found, start, end):
+        if not len(self.fips):
+            return np.empty(0, dtype='int64'), np.empty(0, dtype='int64')
+        base = segment * SHIFT
+        # Candidates start in [start - longest, end); anything earlier has already ended
+        first = np.searchsorted(self._start_keys, base + np.maximum(start - self.longest[segment], 0), side='left')
+        last = np.searchsorted(self._start_keys, base + end, side='left')
+        n = np.where(found, np.maximum(last - first, 0), 0)
+        query = np.repeat(np.arange(len(n)), n)
+        position = np.repeat(first, n) + np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+        hit = self.ends[position] > start[query]
+        return query[hit], self.rows[position[hit]]
+
+    def longest_events(self, fips, k=1):
+        """``(query, rows)``: the k longest events of each county, longest first."""
+        segment, found = self._segments(np.atleast_1d(fips))
+        if not len(self.fips):
+            return np.empty(0, dtype='int64'), np.empty(0, dtype='int64')
+        lo = self.offsets[segment]
+        n = np.where(found, np.minimum(k, self.offsets[segment + 1] - lo), 0)
+        query = np.repeat(np.arange(len(n)), n)
+        position = np.repeat(lo, n) + np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+        return query, self.rows[self.by_duration[position]]
+
+
+def load_event_index(events_path, cache_path=None):
+    """The index of an event table file, cached in ``<events_path>.intervals.npz``."""
+    cache_path = cache_path or events_path + CACHE_SUFFIX
+    stat = os.stat(events_path)
+    source = np.array([stat.st_size, stat.st_mtime_ns], dtype='int64')
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            if 'source' in cached and tuple(cached['source']) == tuple(source):
+                return EventIndex(*(cached[name] for name in ARRAYS))
+    index = EventIndex.from_events(load_events(events_path, columns=['fips_code', 'start_time', 'end_time']))
+    np.savez(cache_path, source=source, **{name: getattr(index, name) for name in ARRAYS})
+    return index
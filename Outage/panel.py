@@ -0,0 +1,249 @@
+"""County x time-bucket outage panel stored as monthly sparse CSR blocks.
+
+The event table answers "which events did a county have", but not "what was out in
+this county at 14:00 on 3 July", which is what hourly temperature or load lines up
+with. The panel has one row per county (sorted FIPS) and one column per time bucket
+(an hour by default), with three layers:
+
+    customers       most customers out during any run in the bucket (int32)
+    customer_hours  customers out x hours, summed over the runs in the bucket (float32)
+    event_id        1 + the event's row in Outage_Events.parquet, 0 when no event is active
+
+Most cells are empty, so each month is one CSR block. The layers share the block's
+indptr/indices, and the arrays are plain .npy files that are opened memory-mapped.
+A slice by FIPS range reads only that row range of each month, and a slice by date
+window opens only the months it overlaps:
+
+    panel = OutagePanel('Outage_Panel')
+    matrix, fips, times = panel.select('customers', fips=(6000, 6999), start='2023-07-01', end='2023-08-01')
+    daily = panel.resample('D', fips=(6000, 6999))
+
+Layout: ``panel.json`` (bucket, months, layers), ``fips.npy``, and per month
+``<YYYY-MM>/indptr.npy``, ``indices.npy`` and ``<layer>.npy``.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from .events import RUN_LENGTH
+
+BUCKET = pd.Timedelta(hours=1)
+LAYERS = {'customers': 'int32', 'customer_hours': 'float32', 'event_id': 'int32'}
+META_FILE = 'panel.json'
+
+
+def _month_and_column(times, bucket):
+    """Month (months since 1970) and bucket column within the month of datetime64[ns] values."""
+    months = times.astype('datetime64[M]')
+    columns = (times - months.astype('datetime64[ns]')) // bucket.to_timedelta64()
+    return months.astype('int64'), columns.astype('int64')
+
+
+def _buckets_in_month(month, bucket):
+    start = np.datetime64(month, 'M')
+    return int((start + 1).astype('datetime64[ns]') - start.astype('datetime64[ns]')) // bucket.value
+
+
+def _run_cells(runs, fips, bucket, run_length):
+    """Per-month (row, column, customers max, customer-hours sum) of runs, one chunk at a time."""
+    if isinstance(runs, pd.DataFrame):
+        runs = [runs]
+    cells = {}
+    for chunk in runs:
+        row = np.searchsorted(fips, chunk['fips_code'].to_numpy(dtype='int64'))
+        months, column = _month_and_column(chunk['run_start_time'].to_numpy('datetime64[ns]'), bucket)
+        customers = chunk['sum'].to_numpy(dtype='int64')
+        frame = pd.DataFrame({'month': months, 'row': row, 'column': column, 'customers': customers,
+                              'customer_hours': customers * (run_length / pd.Timedelta(hours=1))})
+        reduced = frame.groupby(['month', 'row', 'column'], sort=False).agg(
+            customers=('customers', 'max'), customer_hours=('customer_hours', 'sum'))
+        for month, block in reduced.groupby(level='month', sort=False):
+            cells.setdefault(month, []).append(block.reset_index(level=['row', 'column']))
+    # A bucket split across two chunks is reduced once more
+    return {month: pd.concat(blocks).groupby(['row', 'column']).agg(customers=('customers', 'max'),
+                                                                 customer_hours=('customer_hours', 'sum'))
+            for month, blocks in cells.items()}
+
+
+def _event_cells(events, fips, bucket):
+    """(month, row, column, event id) for every bucket an event is active in."""
+    start = events['start_time'].to_numpy('datetime64[ns]')
+    end = events['end_time'].to_numpy('datetime64[ns]')
+    step = bucket.to_timedelta64()
+    first = start - (start - np.datetime64(0, 'ns')) % step
+    n_buckets = np.maximum(1, (end - first + step - np.timedelta64(1, 'ns')) // step).astype('int64')
+    event = np.repeat(np.arange(len(events)), n_buckets)
+    offset = np.arange(len(event)) - np.repeat(np.cumsum(n_buckets) - n_buckets, n_buckets)
+    months, column = _month_and_column(first[event] + offset * step, bucket)
+    row = np.searchsorted(fips, events['fips_code'].to_numpy(dtype='int64'))[event]
+    return months, row, column, event + 1
+
+
+def build_panel(runs, events, directory, bucket=BUCKET, run_length=RUN_LENGTH):
+    """Write the panel of ``runs`` (the filtered feed, a frame or an iterable of chunks) and ``events``.
+
+    ``events`` must be the event table in the order ``write_events`` stores it (by
+    FIPS code and start time), so that ``event_id - 1`` is a row of that table.
+    ``bucket`` must divide a day. Returns the number of stored cells.
+    """
+    if pd.Timedelta(days=1) % bucket:
+        raise ValueError(f'bucket {bucket} does not divide a day')
+    events = events.sort_values(['fips_code', 'start_time'], kind='stable').reset_index(drop=True)
+    fips = np.unique(events['fips_code'].to_numpy(dtype='int64'))
+    run_cells = _run_cells(runs, fips, bucket, run_length)
+    event_months, event_rows, event_columns, event_ids = _event_cells(events, fips, bucket)
+
+    os.makedirs(directory, exist_ok=True)
+    months = sorted(set(run_cells) | set(np.unique(event_months).tolist()))
+    stored = 0
+    for month in months:
+        label = str(np.datetime64(month, 'M'))
+        n_columns = _buckets_in_month(label, bucket)
+        in_month = event_months == month
+        event_keys = event_rows[in_month] * n_columns + event_columns[in_month]
+        runs_in_month = run_cells.get(month)
+        if runs_in_month is None:
+            run_keys = np.empty(0, dtype='int64')
+        else:
+            run_keys = (runs_in_month.index.get_level_values('row').to_numpy(dtype='int64') * n_columns
+                        + runs_in_month.index.get_level_values('column').to_numpy(dtype='int64'))
+
+        # One sparsity pattern for all layers: the union of run and event cells, in CSR order
+        keys = np.union1d(run_keys, event_keys)
+        layers = {name: np.zeros(len(keys), dtype=dtype) for name, dtype in LAYERS.items()}
+        if len(run_keys):
+            at = np.searchsorted(keys, run_keys)
+            layers['customers'][at] = runs_in_month['customers'].to_numpy()
+            layers['customer_hours'][at] = runs_in_month['customer_hours'].to_numpy()
+        # Events of one county are more than max_gap apart, so at most one is active per hour;
+        # with coarser buckets the later event wins
+        np.maximum.at(layers['event_id'], np.searchsorted(keys, event_keys), event_ids[in_month])
+
+        rows = keys // n_columns
+        indptr = np.zeros(len(fips) + 1, dtype='int64')
+        np.cumsum(np.bincount(rows, minlength=len(fips)), out=indptr[1:])
+        folder = os.path.join(directory, label)
+        os.makedirs(folder, exist_ok=True)
+        np.save(os.path.join(folder, 'indptr.npy'), indptr)
+        np.save(os.path.join(folder, 'indices.npy'), (keys % n_columns).astype('int32'))
+        for name, values in layers.items():
+            np.save(os.path.join(folder, f'{name}.npy'), values)
+        stored += len(keys)
+
+    np.save(os.path.join(directory, 'fips.npy'), fips.astype('int32'))
+    meta = {'bucket': bucket.isoformat(), 'months': [str(np.datetime64(m, 'M')) for m in months],
+            'layers': list(LAYERS), 'counties': len(fips), 'cells': stored}
+    with open(os.path.join(directory, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=1)
+    return stored
+
+
+class OutagePanel:
+    """Read access to a panel written by ``build_panel``; month blocks are memory-mapped on demand."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE)) as f:
+            meta = json.load(f)
+        self.bucket = pd.Timedelta(meta['bucket'])
+        self.months = meta['months']
+        self.layers = meta['layers']
+        self.fips = np.load(os.path.join(directory, 'fips.npy'))
+
+    def _array(self, month, name):
+        return np.load(os.path.join(self.directory, month, f'{name}.npy'), mmap_mode='r')
+
+    def _rows(self, fips):
+        if fips is None:
+            return 0, len(self.fips)
+        low, high = fips
+        return int(np.searchsorted(self.fips, low)), int(np.searchsorted(self.fips, high, side='right'))
+
+    def select(self, layer='customers', fips=None, start=None, end=None):
+        """``(matrix, fips, times)``: a CSR block of one layer for a FIPS range and a [start, end) window.
+
+        ``fips`` is an inclusive ``(low, high)`` pair of codes. Only the selected rows of
+        the overlapping months are read from disk.
+        """
+        if layer not in self.layers:
+            raise KeyError(f'unknown layer {layer!r}; layers: {", ".join(self.layers)}')
+        first, last = self._rows(fips)
+        start = None if start is None else pd.Timestamp(start).to_datetime64()
+        end = None if end is None else pd.Timestamp(end).to_datetime64()
+        blocks, times = [], []
+        for month in self.months:
+            month_start = np.datetime64(month, 'M').astype('datetime64[ns]')
+            n_columns = _buckets_in_month(month, self.bucket)
+            month_times = month_start + np.arange(n_columns) * self.bucket.to_timedelta64()
+            keep = np.ones(n_columns, dtype=bool)
+            if start is not None:
+                keep &= month_times >= start
+            if end is not None:
+                keep &= month_times < end
+            if not keep.any():
+                continue
+            indptr = np.asarray(self._array(month, 'indptr')[first:last + 1])
+            lo, hi = indptr[0], indptr[-1]
+            block = sp.csr_matrix((np.asarray(self._array(month, layer)[lo:hi]),
+                                   np.asarray(self._array(month, 'indices')[lo:hi]), indptr - lo),
+                                  shape=(last - first, n_columns))
+            columns = np.flatnonzero(keep)
+            blocks.append(block[:, columns[0]:columns[-1] + 1])
+            times.append(month_times[keep])
+        if not blocks:
+            dtype = LAYERS.get(layer, 'float64')
+            return sp.csr_matrix((last - first, 0), dtype=dtype), self.fips[first:last], pd.DatetimeIndex([])
+        return sp.hstack(blocks, format='csr'), self.fips[first:last], pd.DatetimeIndex(np.concatenate(times))
+
+    def resample(self, freq='D', fips=None, start=None, end=None):
+        """Long frame of the non-empty (county, period) cells for a pandas period ``freq`` ('D', 'W', 'M').
+
+        Columns: customers_max, customer_hours, active_hours (hours with an event) and
+        events (distinct events active in the period).
+        """
+        customers, codes, times = self.select('customers', fips, start, end)
+        customer_hours = self.select('customer_hours', fips, start, end)[0]
+        event_id = self.select('event_id', fips, start, end)[0]
+        period, periods = pd.factorize(pd.PeriodIndex(times, freq=freq), sort=True)
+        # (buckets x periods) 0/1 matrix; sums over buckets become one sparse product
+        to_period = sp.csr_matrix((np.ones(len(period)), (np.arange(len(period)), period)),
+                                  shape=(len(period), len(periods)))
+        bucket_hours = self.bucket / pd.Timedelta(hours=1)
+        totals = (customer_hours.astype('float64') @ to_period).tocoo()
+        active = ((event_id > 0).astype('float64') @ to_period * bucket_hours).tocoo()
+
+        cells = pd.DataFrame({'row': np.concatenate([totals.row, active.row]),
+                              'period': np.concatenate([totals.col, active.col])}).drop_duplicates()
+        result = cells.set_index(['row', 'period']).sort_index()
+        result['customers_max'] = _segment_stat(customers, period, len(periods), 'max').reindex(result.index)
+        result['customer_hours'] = pd.Series(totals.data, index=pd.MultiIndex.from_arrays(
+            [totals.row, totals.col], names=['row', 'period'])).reindex(result.index)
+        result['active_hours'] = pd.Series(active.data, index=pd.MultiIndex.from_arrays(
+            [active.row, active.col], names=['row', 'period'])).reindex(result.index)
+        result['events'] = _segment_stat(event_id, period, len(periods), 'distinct').reindex(result.index)
+        result = result.fillna(0).reset_index()
+        result.insert(0, 'fips_code', codes[result.pop('row').to_numpy()])
+        result.insert(1, 'period', periods[result.pop('period').to_numpy()])
+        return result.astype({'customers_max': 'int64', 'events': 'int64'})
+
+
+def _segment_stat(matrix, period, n_periods, stat):
+    """Max, or count of distinct non-zero values, of a CSR layer per (row, period)."""
+    coo = matrix.tocoo()
+    keep = coo.data > 0
+    rows, cols, values = coo.row[keep], period[coo.col[keep]], coo.data[keep]
+    keys = rows.astype('int64') * n_periods + cols
+    if stat == 'distinct':
+        cells = np.unique(np.stack([keys, values.astype('int64')]), axis=1)
+        keys, counts = np.unique(cells[0], return_counts=True)
+        reduced = counts
+    else:
+        order = np.lexsort((values, keys))
+        keys, values = keys[order], values[order]
+        last = np.append(np.flatnonzero(keys[1:] != keys[:-1]), len(keys) - 1) if len(keys) else np.array([], 'int64')
+        keys, reduced = keys[last], values[last]
+    index = pd.MultiIndex.from_arrays([keys // n_periods, keys % n_periods], names=['row', 'period'])
+    return pd.Series(reduced, index=index)
@@ -0,0 +1,149 @@
+"""Parallel outage aggregation over many yearly or monthly EAGLE-I files.
+
+Run from the repository root:
+
+    python -m Outage.parallel path/to/eaglei_dir --workers 8
+    python -m Outage.parallel "data/eaglei_outages_20*.csv" --events-output events.arrow
+    python -m Outage.parallel data/ --benchmark 8
+
+The work is split in two phases on a process pool. Each file is streamed once and
+its filtered rows are written to shards partitioned by a hash of the FIPS code. Each
+partition then reads its shards in file order and detects events with the streaming
+stitcher, so an event running from Dec 31 in one file into Jan 1 of the next is
+joined like any other. Partition results are sorted by county and start time, so the
+output does not depend on the number of workers.
+"""
+import argparse
+import glob
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from instrument import stage
+
+from .event_table import write_events
+from .events import MAX_GAP, MIN_CUSTOMERS, RUN_LENGTH, rollup_events
+from .stream import CHUNKSIZE, events_from_chunks, read_outages_chunked
+
+FILE_PATTERN = 'eaglei_outages*.csv'
+
+
+def find_input_files(inputs):
+    """Expand files, directories and glob patterns into a sorted, de-duplicated file list."""
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.update(glob.glob(os.path.join(item, FILE_PATTERN)))
+        elif any(ch in item for ch in '*?['):
+            paths.update(glob.glob(item))
+        elif os.path.exists(item):
+            paths.add(item)
+        else:
+            raise FileNotFoundError(item)
+    # Natural sort keeps eaglei_outages_2023_2.csv before eaglei_outages_2023_10.csv
+    return sorted(paths, key=lambda p: [int(t) if t.isdigit() else t for t in re.split(r'(\d+)', p)])
+
+
+def partition_of(fips, n_partitions):
+    """Stable hash partition of FIPS codes (Knuth multiplicative hash)."""
+    return (np.asarray(fips, dtype=np.uint64) * np.uint64(2654435761) % np.uint64(2 ** 32)) % n_partitions
+
+
+def _shard_file(file_index, path, shard_dir, n_partitions, chunksize, min_customers):
+    # Map phase: one pass over a file, rows routed to their partition's shards
+    written = []
+    for chunk_index, chunk in enumerate(read_outages_chunked(path, chunksize, min_customers)):
+        parts = partition_of(chunk['fips_code'].to_numpy(dtype='int64'), n_partitions)
+        for part in np.unique(parts):
+            shard = os.path.join(shard_dir, f'{part:04d}-{file_index:05d}-{chunk_index:05d}.pkl')
+            chunk[parts == part].to_pickle(shard)
+            written.append(shard)
+    return written
+
+
+def _aggregate_partition(shards, run_length, max_gap):
+    # Reduce phase: shard names sort in file order, then chunk order
+    chunks = (pd.read_pickle(shard) for shard in sorted(shards))
+    frames = list(events_from_chunks(chunks, run_length, max_gap))
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+
+def aggregate_files(paths, workers=None, n_partitions=None, chunksize=CHUNKSIZE, min_customers=MIN_CUSTOMERS,
+                    run_length=RUN_LENGTH, max_gap=MAX_GAP):
+    """Aggregate events over all files on a process pool; returns one row per event."""
+    workers = workers or os.cpu_count()
+    n_partitions = n_partitions or workers
+    with tempfile.TemporaryDirectory(prefix='outage-shards-') as shard_dir, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        mapped = pool.map(_shard_file, range(len(paths)), paths, [shard_dir] * len(paths),
+                          [n_partitions] * len(paths), [chunksize] * len(paths), [min_customers] * len(paths))
+        by_partition = {}
+        for shards in mapped:
+            for shard in shards:
+                by_partition.setdefault(os.path.basename(shard)[:4], []).append(shard)
+
+        futures = [pool.submit(_aggregate_partition, by_partition[part], run_length, max_gap)
+                   for part in sorted(by_partition)]
+        frames = [frame for frame in (future.result() for future in futures) if frame is not None]
+
+    if not frames:
+        raise ValueError('No outage rows left after filtering')
+    events = pd.concat(frames, ignore_index=True)
+    return events.sort_values(['fips_code', 'county', 'state', 'start_time'], kind='stable').reset_index(drop=True)
+
+
+def scaling_benchmark(paths, max_workers, **kwargs):
+    """Time the full aggregation with 1, 2, 4, ... up to max_workers processes."""
+    counts = sorted({min(2 ** i, max_workers) for i in range(max_workers.bit_length() + 1)})
+    rows = []
+    for workers in counts:
+        start = time.perf_counter()
+        events = aggregate_files(paths, workers=workers, **kwargs)
+        rows.append({'workers': workers, 'seconds': time.perf_counter() - start, 'events': len(events)})
+    result = pd.DataFrame(rows)
+    result['speedup'] = result['seconds'].iloc[0] / result['seconds']
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Aggregate outage events over many EAGLE-I files in parallel.')
+    parser.add_argument('inputs', nargs='+', help='files, directories or glob patterns of EAGLE-I CSVs')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of worker processes')
+    parser.add_argument('--partitions', type=int, default=None, help='FIPS hash partitions (default: workers)')
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE)
+    parser.add_argument('--output', default='Aggregated_Outage_Events.csv', help='per-county list output')
+    parser.add_argument('--events-output', default='Outage_Events.parquet',
+                        help='one-row-per-event table (.parquet, .arrow/.feather or .csv)')
+    parser.add_argument('--benchmark', type=int, metavar='N', default=None,
+                        help='time the run with 1 to N workers instead of writing outputs')
+    args = parser.parse_args(argv)
+
+    paths = find_input_files(args.inputs)
+    print(f'{len(paths)} input files')
+    if args.benchmark:
+        print(scaling_benchmark(paths, args.benchmark, chunksize=args.chunksize).to_string(index=False))
+        return
+
+    with stage('parallel_outages') as run:
+        with stage('aggregate_files') as step:
+            events = aggregate_files(paths, workers=args.workers, n_partitions=args.partitions,
+                                     chunksize=args.chunksize)
+            step.rows_out = run.rows_out = len(events)
+            step.extra['files'], step.extra['workers'] = len(paths), args.workers
+        with stage('write_events', rows_in=len(events)):
+            write_events(events, args.events_output)
+        with stage('rollup', rows_in=len(events)) as step:
+            aggregated_outages = rollup_events(events)
+            step.rows_out = len(aggregated_outages)
+        with stage('write_rollup', rows_in=len(aggregated_outages)):
+            aggregated_outages.to_csv(args.output, index=False)
+    print(aggregated_outages.head())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Chunked, bounded-memory ingest of the EAGLE-I outage feed.
+
+The feed is read in chunks with compact column types and the customer filter is
+applied to each chunk as it arrives. Events are detected per chunk and the last,
+still open event of every county is carried over to the next chunk, where it is
+either extended or closed. Memory is bounded by one chunk plus one open event per
+county, however many rows or files are streamed.
+
+The rows of each county must be in time order across chunks and files, which is how
+EAGLE-I publishes them (files may be ordered by time or by county).
+"""
+import numpy as np
+import pandas as pd
+
+from .events import EVENT_COLUMNS, KEYS, MAX_GAP, MIN_CUSTOMERS, RUN_LENGTH, detect_events
+
+CHUNKSIZE = 2_000_000
+
+# Typed columns for the feed; 'sum' is read as float32 so empty cells survive the
+# parser and becomes int32 once the filter has removed them
+USECOLS = KEYS + ['sum', 'run_start_time']
+DTYPES = {'fips_code': 'category', 'county': 'category', 'state': 'category', 'sum': 'float32'}
+
+
+def read_outages_chunked(paths, chunksize=CHUNKSIZE, min_customers=MIN_CUSTOMERS):
+    """Yield filtered, typed chunks of one or more feed files, in the given file order."""
+    if isinstance(paths, (str, bytes)) or not hasattr(paths, '__iter__'):
+        paths = [paths]
+    for path in paths:
+        reader = pd.read_csv(path, usecols=USECOLS, dtype=DTYPES, parse_dates=['run_start_time'],
+                             chunksize=chunksize)
+        for chunk in reader:
+            # Push the customer filter down before anything else touches the chunk
+            chunk = chunk[chunk['sum'].to_numpy() >= min_customers]
+            if chunk.empty:
+                continue
+            chunk = chunk.assign(sum=chunk['sum'].astype('int32'))
+            chunk['fips_code'] = chunk['fips_code'].cat.rename_categories(
+                pd.to_numeric(chunk['fips_code'].cat.categories))
+            yield chunk
+
+
+def stitch_events(open_events, events, run_length=RUN_LENGTH, max_gap=MAX_GAP):
+    """Continue carried open events with the events of the next block of rows.
+
+    ``events`` must be sorted by county and start time, as returned by
+    ``detect_events``. Returns ``(closed, still_open)``: events that can no longer
+    grow, and the last event of every county seen so far.
+    """
+    events = events.reset_index(drop=True)
+    is_last = ~events.duplicated(KEYS, keep='last').to_numpy()
+    if open_events is None or open_events.empty:
+        return events[~is_last].reset_index(drop=True), events[is_last].reset_index(drop=True)
+
+    # Line every carried event up with the first event of its county in this block
+    is_first = ~events.duplicated(KEYS).to_numpy()
+    firsts = events.loc[is_first, KEYS + ['start_time']].rename(columns={'start_time': 'next_start'})
+    firsts['next_row'] = np.flatnonzero(is_first)
+    carried = open_events.reset_index(drop=True).merge(firsts, on=KEYS, how='left')
+
+    has_next = carried['next_row'].notna().to_numpy()
+    next_start = carried['next_start'].to_numpy('datetime64[ns]')
+    end = carried['end_time'].to_numpy('datetime64[ns]')
+    if (next_start[has_next] < end[has_next] - run_length.to_timedelta64()).any():
+        raise ValueError('Outage rows are not in time order within each county across chunks or files')
+
+    joins = has_next & (next_start - end <= max_gap.to_timedelta64())
+    if joins.any():
+        rows = carried.loc[joins, 'next_row'].astype(int).to_numpy()
+        col = events.columns.get_loc
+        events.iloc[rows, col('start_time')] = carried.loc[joins, 'start_time'].to_numpy()
+        events.iloc[rows, col('sum')] = events['sum'].to_numpy()[rows] + carried.loc[joins, 'sum'].to_numpy()
+        events.iloc[rows, col('duration_hrs')] = (
+            (events['end_time'].to_numpy()[rows] - events['start_time'].to_numpy()[rows]) / np.timedelta64(1, 'h'))
+
+    closed = pd.concat([carried.loc[has_next & ~joins, EVENT_COLUMNS], events[~is_last]], ignore_index=True)
+    still_open = pd.concat([carried.loc[~has_next, EVENT_COLUMNS], events[is_last]], ignore_index=True)
+    return closed, still_open
+
+
+def stream_events(paths, chunksize=CHUNKSIZE, min_customers=MIN_CUSTOMERS, run_length=RUN_LENGTH,
+                  max_gap=MAX_GAP):
+    """Yield frames of finished events while streaming the feed; open events come last."""
+    return events_from_chunks(read_outages_chunked(paths, chunksize, min_customers), run_length, max_gap)
+
+
+def events_from_chunks(chunks, run_length=RUN_LENGTH, max_gap=MAX_GAP):
+    """Detect and stitch events over an iterable of filtered chunks in time order."""
+    open_events = None
+    for chunk in chunks:
+        events = _plain_keys(detect_events(chunk, run_length, max_gap))
+        closed, open_events = stitch_events(open_events, events, run_length, max_gap)
+        if not closed.empty:
+            yield closed
+    if open_events is not None and not open_events.empty:
+        yield open_events
+
+
+def _plain_keys(events):
+    # Categories differ from chunk to chunk, so events leave the chunk with plain keys
+    return events.astype({'fips_code': 'int64', 'county': object, 'state': object})
@@ -0,0 +1,177 @@
+"""Sensitivity of the outage rollup to the event definition, in one pass over the feed.
+
+Run from the repository root:
+
+    python -m Outage.sweep eaglei_outages_2023.csv --thresholds 1 10 50 100 --gaps 0.5 1 2 4
+    python -m Outage.sweep data/ --thresholds 10 25 --gaps 2 6 --output sweep.parquet --workers 8
+
+The feed is read once, with the lowest threshold as the customer filter. Counties are
+encoded as integers and the rows are sorted by county and time once. The three
+arrays (county, start time, customers) are saved to a temporary directory, and every
+worker memory-maps them instead of receiving a copy. Each task takes one threshold
+and keeps the rows at or above it, which are still sorted. It then evaluates every
+gap on those rows with the boundary rule of ``detect_events``, so no combination
+sorts or parses anything again.
+
+The output is tidy: one row per county and (min_customers, max_gap_hrs), with the
+columns of ``load_outage_rollup``. Every county seen at the lowest threshold appears
+for every combination. Counties without events have zero counts and sums, and
+missing averages.
+"""
+import argparse
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from instrument import stage
+
+from .events import KEYS, MIN_CUSTOMERS, RUN_LENGTH
+from .parallel import find_input_files
+from .stream import CHUNKSIZE, read_outages_chunked
+
+THRESHOLDS = [1, 10, 50, 100, 500]
+GAPS_HRS = [0.5, 1, 2, 4, 8]
+SWEEP_COLUMNS = KEYS + ['min_customers', 'max_gap_hrs', 'counts_of_outage', 'average_sums', 'avg_durations_hrs',
+                        'sum_duration_hrs', 'sums_sum']
+ARRAYS = ['county', 'start', 'sum']
+
+# Set in each worker by _attach: name -> memory-mapped array
+_SHARED = {}
+
+
+def encode_feed(paths, chunksize=CHUNKSIZE, min_customers=MIN_CUSTOMERS):
+    """Read the feed once; returns ``(counties, arrays)``.
+
+    ``counties`` is the KEYS frame, one row per county code. ``arrays`` holds the
+    int32 county codes, int64 start times (ns) and int32 customers, sorted by county
+    and then time (stable, like ``detect_events``).
+    """
+    codes, columns = {}, {name: [] for name in ARRAYS}
+    for chunk in read_outages_chunked(paths, chunksize, min_customers):
+        groups = chunk.groupby(KEYS, sort=True, observed=True)
+        group_ids = groups.ngroup().to_numpy()
+        keep = group_ids >= 0
+        # Chunk group numbers -> county codes shared by all chunks
+        mapping = np.array([codes.setdefault(key, len(codes)) for key in groups.size().index], dtype='int32')
+        columns['county'].append(mapping[group_ids[keep]])
+        columns['start'].append(chunk['run_start_time'].to_numpy('datetime64[ns]')[keep].view('int64'))
+        columns['sum'].append(chunk['sum'].to_numpy()[keep])
+    if not codes:
+        raise ValueError('No outage rows left after filtering')
+
+    arrays = {name: np.concatenate(parts) for name, parts in columns.items()}
+    order = np.lexsort((arrays['start'], arrays['county']))
+    arrays = {name: values[order] for name, values in arrays.items()}
+    return pd.DataFrame(list(codes), columns=KEYS), arrays
+
+
+def _attach(directory):
+    # Worker initializer: map the shared arrays read-only, no copy per worker or per task
+    for name in ARRAYS:
+        _SHARED[name] = np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+
+
+def _evaluate_threshold(threshold, gaps_ns, run_length_ns, n_counties):
+    """Per-county events, customer sum and duration for one threshold and every gap.
+
+    Returns an array of shape (len(gaps_ns), 3, n_counties).
+    """
+    keep = np.flatnonzero(_SHARED['sum'] >= threshold)
+    county, start, sums = _SHARED['county'][keep], _SHARED['start'][keep], _SHARED['sum'][keep]
+    end = start + run_length_ns
+    # Shared by every gap: where the county changes, and the idle time before each run
+    new_county = np.ones(len(keep), dtype=bool)
+    new_county[1:] = county[1:] != county[:-1]
+    idle = np.zeros(len(keep), dtype='int64')
+    idle[1:] = start[1:] - end[:-1]
+
+    out = np.zeros((len(gaps_ns), 3, n_counties))
+    for i, gap in enumerate(gaps_ns):
+        first = np.flatnonzero(new_county | (idle > gap))
+        if len(first) == 0:
+            continue
+        last = np.append(first[1:] - 1, len(keep) - 1)
+        owner = county[first]
+        out[i, 0] = np.bincount(owner, minlength=n_counties)
+        out[i, 1] = np.bincount(owner, weights=np.add.reduceat(sums, first, dtype='int64'), minlength=n_counties)
+        out[i, 2] = np.bincount(owner, weights=(end[last] - start[first]) / 3.6e12, minlength=n_counties)
+    return out
+
+
+def sweep(counties, arrays, thresholds=THRESHOLDS, gaps_hrs=GAPS_HRS, run_length=RUN_LENGTH, workers=None):
+    """Rollup of every (threshold, gap) combination over encoded arrays from ``encode_feed``."""
+    thresholds, gaps_hrs = sorted(set(thresholds)), sorted(set(gaps_hrs))
+    gaps_ns = [int(pd.Timedelta(hours=gap).value) for gap in gaps_hrs]
+    run_length_ns = int(run_length.value)
+    n = len(counties)
+    workers = max(1, min(workers or os.cpu_count(), len(thresholds)))
+
+    with tempfile.TemporaryDirectory(prefix='outage-sweep-') as directory:
+        for name in ARRAYS:
+            np.save(os.path.join(directory, f'{name}.npy'), arrays[name])
+        if workers == 1:
+            _attach(directory)
+            results = [_evaluate_threshold(t, gaps_ns, run_length_ns, n) for t in thresholds]
+            _SHARED.clear()
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(directory,)) as pool:
+                results = list(pool.map(_evaluate_threshold, thresholds, [gaps_ns] * len(thresholds),
+                                        [run_length_ns] * len(thresholds), [n] * len(thresholds)))
+
+    # (threshold, gap, statistic, county) -> one row per county and combination
+    totals = np.stack(results)
+    events, sums, hours = (totals[:, :, k].reshape(-1) for k in range(3))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        table = pd.DataFrame({
+            'min_customers': np.repeat(thresholds, len(gaps_hrs) * n),
+            'max_gap_hrs': np.tile(np.repeat(np.asarray(gaps_hrs, dtype='float64'), n), len(thresholds)),
+            'counts_of_outage': events.astype('int64'),
+            'average_sums': np.where(events > 0, sums / events, np.nan),
+            'avg_durations_hrs': np.where(events > 0, hours / events, np.nan),
+            'sum_duration_hrs': hours,
+            'sums_sum': sums,
+        })
+    keys = counties.iloc[np.tile(np.arange(n), len(thresholds) * len(gaps_hrs))].reset_index(drop=True)
+    table = pd.concat([keys, table], axis=1)[SWEEP_COLUMNS]
+    return table.sort_values(['min_customers', 'max_gap_hrs', 'fips_code', 'county', 'state'],
+                             kind='stable').reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Per-county outage rollups over a grid of event definitions.')
+    parser.add_argument('inputs', nargs='+', help='files, directories or glob patterns of EAGLE-I CSVs')
+    parser.add_argument('--thresholds', type=int, nargs='+', default=THRESHOLDS,
+                        help='minimum customers out (default: %(default)s)')
+    parser.add_argument('--gaps', type=float, nargs='+', default=GAPS_HRS,
+                        help='longest gap in hours joined into one event (default: %(default)s)')
+    parser.add_argument('--run-length', type=float, default=RUN_LENGTH / pd.Timedelta(minutes=1),
+                        help='minutes covered by one feed row (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of worker processes')
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE)
+    parser.add_argument('--output', default='Outage_Sweep.csv', help='summary table (.csv or .parquet)')
+    args = parser.parse_args(argv)
+
+    paths = find_input_files(args.inputs)
+    with stage('outage_sweep') as run:
+        with stage('encode_feed') as step:
+            counties, arrays = encode_feed(paths, args.chunksize, min(args.thresholds))
+            step.rows_out = run.rows_in = len(arrays['county'])
+            step.extra['counties'] = len(counties)
+        with stage('sweep', rows_in=len(arrays['county'])) as step:
+            table = sweep(counties, arrays, args.thresholds, args.gaps, pd.Timedelta(minutes=args.run_length),
+                          args.workers)
+            step.rows_out = run.rows_out = len(table)
+            step.extra['combinations'] = len(set(args.thresholds)) * len(set(args.gaps))
+        with stage('write_sweep', rows_in=len(table)):
+            if args.output.endswith('.parquet'):
+                table.to_parquet(args.output, index=False)
+            else:
+                table.to_csv(args.output, index=False)
+    print(table.groupby(['min_customers', 'max_gap_hrs'])[['counts_of_outage', 'sum_duration_hrs']].sum())
+
+
+if __name__ == '__main__':
+    main()
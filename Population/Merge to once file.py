@@ -1,16 +1,27 @@
+import os
+import sys
+
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fips_join import align_on_fips  # noqa: E402
+from instrument import stage  # noqa: E402
+
 # List your CSV files here
 csv_files = ['Processed_Education2023.csv', 'Processed_Poverty2023.csv', 'Processed_Unemployment2023.csv', 'Processed_PopulationEstimates.csv']
 
-# Initialize the merged DataFrame with the first CSV file
-merged_df = pd.read_csv(csv_files[0])
+with stage('merge_demographics') as run:
+    with stage('read') as step:
+        frames = {file: pd.read_csv(file, dtype={'fips_code': str}) for file in csv_files}
+        step.rows_out = run.rows_in = sum(len(frame) for frame in frames.values())
 
-# Loop through the remaining CSV files and merge them on 'fips_code'
-for file in csv_files[1:]:
-    df = pd.read_csv(file)
-    merged_df = pd.merge(merged_df, df, on='fips_code', how='outer')
+    # Align all files on one canonical integer fips_code in a single pass (outer join)
+    with stage('merge', rows_in=run.rows_in) as step:
+        merged_df, report = align_on_fips(frames)
+        step.rows_out = run.rows_out = len(merged_df)
+    print(report.drop(columns='unmatched_keys').to_string())
 
-# Save the merged DataFrame to a new CSV file
-merged_df.to_csv('DemographicsData.csv', index=False)
-print("Merged CSV file saved as 'merged_data.csv'")
+    # Save the merged DataFrame to a new CSV file
+    with stage('write', rows_in=len(merged_df)):
+        merged_df.to_csv('DemographicsData.csv', index=False)
+print("Merged CSV file saved as 'DemographicsData.csv'")
@@ -1,34 +1,48 @@
+import os
+import sys
+
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrument import stage  # noqa: E402
+
 # Define file paths
 input_file = 'PopulationEstimates.csv'
 output_file = 'Processed_PopulationEstimates.csv'
 
 try:
-    # Read the CSV file with encoding handling
-    df = pd.read_csv(input_file, encoding='ISO-8859-1', dtype=str)
-
-    # Ensure necessary columns exist
-    required_columns = {'FIPStxt', 'Attribute'}
-    if not required_columns.issubset(df.columns):
-        raise ValueError(f"One or more required columns {required_columns} are missing in the CSV file.")
-
-    # Filter rows where 'Attribute' contains '2023'
-    df_filtered = df[df['Attribute'].str.contains('2023', na=False)]
-
-    # Reshape the dataframe to have 'FIPStxt' as key and 'Attribute' values as columns
-    df_pivoted = df_filtered.pivot(index='FIPStxt', columns='Attribute', values='Value')
-
-    # Reset index to flatten the dataframe
-    df_pivoted.reset_index(inplace=True)
-
-    # Rename the key column for clarity
-    df_pivoted.rename(columns={'FIPStxt': 'fips_code'}, inplace=True)
-
-    # Save the processed data to a new CSV file
-    df_pivoted.to_csv(output_file, index=False, encoding='utf-8')
-
-    print(f"Processed data saved to {output_file}")
+    with stage('population_concat') as run:
+        # Read the CSV file with encoding handling
+        with stage('read') as step:
+            df = pd.read_csv(input_file, encoding='ISO-8859-1', dtype=str)
+            step.rows_out = run.rows_in = len(df)
+
+        # Ensure necessary columns exist
+        required_columns = {'FIPStxt', 'Attribute'}
+        if not required_columns.issubset(df.columns):
+            raise ValueError(f"One or more required columns {required_columns} are missing in the CSV file.")
+
+        # Filter rows where 'Attribute' contains '2023'
+        with stage('filter', rows_in=len(df)) as step:
+            df_filtered = df[df['Attribute'].str.contains('2023', na=False)]
+            step.rows_out = len(df_filtered)
+
+        # Reshape the dataframe to have 'FIPStxt' as key and 'Attribute' values as columns
+        with stage('pivot', rows_in=len(df_filtered)) as step:
+            df_pivoted = df_filtered.pivot(index='FIPStxt', columns='Attribute', values='Value')
+            step.rows_out = run.rows_out = len(df_pivoted)
+
+        # Reset index to flatten the dataframe
+        df_pivoted.reset_index(inplace=True)
+
+        # Rename the key column for clarity
+        df_pivoted.rename(columns={'FIPStxt': 'fips_code'}, inplace=True)
+
+        # Save the processed data to a new CSV file
+        with stage('write', rows_in=len(df_pivoted)):
+            df_pivoted.to_csv(output_file, index=False, encoding='utf-8')
+
+        print(f"Processed data saved to {output_file}")
 
 except UnicodeDecodeError:
     print("Error: Unable to decode the file. Try using a different encoding such as 'latin1' or 'ISO-8859-1'.")
@@ -0,0 +1,95 @@
+"""One-pass ingest of the USDA ERS county files into the demographics table.
+
+The ERS files (education, poverty, unemployment, population estimates) share a long
+format: one row per FIPS code and attribute. Each file is read once with only the
+key, Attribute and Value columns, filtered by year on the distinct attribute names
+rather than on every row, and scattered straight into a float32 matrix of counties
+by attributes. The four wide blocks are joined on the FIPS key in one pass and
+written as a single table, replacing the four ``* data concate.py`` scripts and
+``Merge to once file.py`` with their five CSV round trips.
+
+Run from the Population directory (or pass paths):
+
+    python ers_ingest.py --output DemographicsData.csv
+
+float32 keeps about seven significant digits, so national and state population
+totals are rounded in the last digits; county values are exact.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fips_join import align_on_fips, normalize_fips  # noqa: E402
+from instrument import stage  # noqa: E402
+
+# (file, FIPS column, substring an Attribute must contain, or None to keep every attribute)
+ERS_SOURCES = [
+    ('Education2023.csv', 'FIPS_Code', None),
+    ('Poverty2023.csv', 'FIPS_Code', '2023'),
+    ('Unemployment2023.csv', 'FIPS_Code', '2023'),
+    ('PopulationEstimates.csv', 'FIPStxt', '2023'),
+]
+
+
+def read_ers_wide(path, fips_column, year=None, dtype='float32'):
+    """Read one ERS long-format file and pivot it to one numeric column per attribute."""
+    long_df = pd.read_csv(path, encoding='ISO-8859-1', usecols=[fips_column, 'Attribute', 'Value'],
+                          dtype={fips_column: str, 'Attribute': 'category', 'Value': str})
+
+    if year is not None:
+        # Match the year against the few hundred distinct attribute names, not every row
+        keep = long_df['Attribute'].cat.categories.str.contains(year, regex=False)
+        codes = long_df['Attribute'].cat.codes.to_numpy()
+        long_df = long_df[(codes >= 0) & keep[np.maximum(codes, 0)]]
+
+    fips = normalize_fips(long_df[fips_column])
+    valid = fips.notna().to_numpy() & long_df['Attribute'].notna().to_numpy()
+    long_df, fips = long_df[valid], fips[valid]
+
+    # Scatter the values into a counties x attributes matrix (sorted like DataFrame.pivot)
+    row, counties = pd.factorize(fips.to_numpy(dtype='int32'), sort=True)
+    col, attributes = pd.factorize(long_df['Attribute'].astype(str).to_numpy(), sort=True)
+    cell = row.astype('int64') * len(attributes) + col
+    if pd.Index(cell).has_duplicates:
+        raise ValueError(f'{path}: more than one value for the same FIPS code and attribute')
+    matrix = np.full((len(counties), len(attributes)), np.nan, dtype=dtype)
+    matrix[row, col] = pd.to_numeric(long_df['Value'], errors='coerce').to_numpy(dtype=dtype)
+
+    wide = pd.DataFrame(matrix, columns=attributes, copy=False)
+    wide.insert(0, 'fips_code', counties)
+    return wide
+
+
+def ingest_ers(sources=ERS_SOURCES, directory='.', dtype='float32'):
+    """Read every ERS file and join them into one demographics table keyed by fips_code."""
+    blocks = {file: read_ers_wide(os.path.join(directory, file), fips_column, year, dtype)
+              for file, fips_column, year in sources}
+    demographics, report = align_on_fips(blocks)
+    return demographics, report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the demographics table from the ERS county files.')
+    parser.add_argument('--directory', default='.', help='folder with the ERS CSV files')
+    parser.add_argument('--output', default='DemographicsData.csv', help='combined table (.csv or .parquet)')
+    args = parser.parse_args(argv)
+
+    with stage('ers_ingest') as run:
+        with stage('read_and_merge') as step:
+            demographics, report = ingest_ers(directory=args.directory)
+            step.rows_out = run.rows_out = len(demographics)
+        print(report.drop(columns='unmatched_keys').to_string())
+        with stage('write', rows_in=len(demographics)):
+            if args.output.endswith('.parquet'):
+                demographics.to_parquet(args.output, index=False)
+            else:
+                demographics.to_csv(args.output, index=False)
+    print(f'Demographics table with {demographics.shape[1] - 1} attributes saved to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
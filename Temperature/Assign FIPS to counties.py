@@ -1,50 +1,42 @@
-import pandas as pd
-
-# 1. Define a mapping from full state names to postal abbreviations.
-state_abbrev = {
-    'Alabama': 'AL', 'Alaska': 'AK', 'Arizona': 'AZ', 'Arkansas': 'AR',
-    'California': 'CA', 'Colorado': 'CO', 'Connecticut': 'CT', 'Delaware': 'DE',
-    'Florida': 'FL', 'Georgia': 'GA', 'Hawaii': 'HI', 'Idaho': 'ID',
-    'Illinois': 'IL', 'Indiana': 'IN', 'Iowa': 'IA', 'Kansas': 'KS',
-    'Kentucky': 'KY', 'Louisiana': 'LA', 'Maine': 'ME', 'Maryland': 'MD',
-    'Massachusetts': 'MA', 'Michigan': 'MI', 'Minnesota': 'MN', 'Mississippi': 'MS',
-    'Missouri': 'MO', 'Montana': 'MT', 'Nebraska': 'NE', 'Nevada': 'NV',
-    'New Hampshire': 'NH', 'New Jersey': 'NJ', 'New Mexico': 'NM', 'New York': 'NY',
-    'North Carolina': 'NC', 'North Dakota': 'ND', 'Ohio': 'OH', 'Oklahoma': 'OK',
-    'Oregon': 'OR', 'Pennsylvania': 'PA', 'Rhode Island': 'RI', 'South Carolina': 'SC',
-    'South Dakota': 'SD', 'Tennessee': 'TN', 'Texas': 'TX', 'Utah': 'UT',
-    'Vermont': 'VT', 'Virginia': 'VA', 'Washington': 'WA', 'West Virginia': 'WV',
-    'Wisconsin': 'WI', 'Wyoming': 'WY'
-}
-
-# 2. Read the temperature data
-temp_df = pd.read_csv("Temperature Data.csv")
-# The temperature data includes columns such as: ID, Name, State, Value, etc.
-
-# 3. Read the county adjacency file (pipe-delimited)
-adjacency_df = pd.read_csv("county_adjacency2024.txt", delimiter="|")
-# The columns in this file are: "County Name", "County GEOID", "Neighbor Name", "Neighbor GEOID"
+import os
+import sys
 
-# 4. Build a mapping from the county name (as in the adjacency file) to its FIPS code.
-# Because counties appear repeatedly (one row per neighbor), we drop duplicates.
-county_fips_map = (adjacency_df[['County Name', 'County GEOID']]
-                   .drop_duplicates()
-                   .set_index('County Name')['County GEOID']
-                   .to_dict())
-
-# 5. Create a key in temp_df that matches the county naming in the adjacency file.
-# In the temperature file, we have "Name" (e.g., "Autauga County") and "State" (e.g., "Alabama").
-# We convert the state name to its postal abbreviation and then form "Autauga County, AL".
-temp_df['County Key'] = temp_df['Name'] + ", " + temp_df['State'].map(state_abbrev)
-
-# 6. Map the "County Key" to the FIPS code using our dictionary.
-temp_df['FIPS'] = temp_df['County Key'].map(county_fips_map)
-temp_df = temp_df.dropna(subset=['FIPS'])
-temp_df['FIPS'] = temp_df['FIPS'].astype(int)
-
-# (Optional) If you no longer need the helper column, you can drop it.
-temp_df.drop(columns='County Key', inplace=True)
+import pandas as pd
 
-# 7. Save the modified DataFrame to a new CSV file or inspect the results.
-print(temp_df.head())
-temp_df.to_csv("Temperature Data with FIPS.csv", index=False)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Temperature.gazetteer import load_gazetteer, resolve_fips  # noqa: E402
+from instrument import stage  # noqa: E402
+
+with stage('temperature_fips') as run:
+    # 1. Read the temperature data
+    with stage('read') as step:
+        temp_df = pd.read_csv("Temperature Data.csv")
+        step.rows_out = run.rows_in = len(temp_df)
+    # The temperature data includes columns such as: ID, Name, State, Value, etc.
+
+    # 2. Load the county gazetteer, built once from county_adjacency2024.txt and cached
+    # as county_gazetteer.pkl next to it (rebuilt only when the adjacency file changes)
+    with stage('load_gazetteer'):
+        gazetteer = load_gazetteer()
+
+    # 3. Resolve "Name" (e.g., "Autauga County") and "State" (e.g., "Alabama") to FIPS codes.
+    # Exact "Autauga County, AL" keys first, then normalized names ("St." vs "Saint",
+    # "&#039;", accents, "City" vs "city"), suffix-less names and a fuzzy fallback.
+    with stage('resolve_fips', rows_in=len(temp_df)) as step:
+        temp_df['FIPS'], method = resolve_fips(temp_df['Name'], temp_df['State'], gazetteer)
+        step.rows_out = int(temp_df['FIPS'].notna().sum())
+    print(method.value_counts(dropna=False).to_string())
+
+    # 4. Report the rows that could not be matched instead of dropping them silently
+    unmatched = temp_df['FIPS'].isna()
+    if unmatched.any():
+        print(f"{unmatched.sum()} rows without a FIPS code:")
+        print(temp_df.loc[unmatched, ['ID', 'Name', 'State']].to_string(index=False))
+    temp_df = temp_df.dropna(subset=['FIPS'])
+    temp_df['FIPS'] = temp_df['FIPS'].astype(int)
+
+    # 5. Save the modified DataFrame to a new CSV file or inspect the results.
+    print(temp_df.head())
+    with stage('write', rows_in=len(temp_df)):
+        temp_df.to_csv("Temperature Data with FIPS.csv", index=False)
+    run.rows_out = len(temp_df)
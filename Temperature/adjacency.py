@@ -0,0 +1,95 @@
+"""County adjacency graph and spatial-lag (spillover) features.
+
+``county_adjacency2024.txt`` lists every county with each of its neighbors. Here it
+becomes a sparse CSR matrix over the sorted FIPS codes, cached in
+``county_adjacency.npz`` (rebuilt only when the text file changes). The lag of a
+column at hop ``h`` is its mean over the counties exactly ``h`` steps away, ignoring
+missing values. The ring matrices for hops 1..k are stacked and multiplied with the
+values and their missing-value mask in a single sparse product, for any number of
+columns.
+
+    merged_df = merged_df.join(spatial_lag(merged_df, ['sum_duration_hrs'], k=2))
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ADJACENCY_PATH = os.path.join(HERE, 'county_adjacency2024.txt')
+CACHE_PATH = os.path.join(HERE, 'county_adjacency.npz')
+
+
+def build_adjacency(path=ADJACENCY_PATH, cache_path=CACHE_PATH):
+    """Read the neighbor list into a symmetric 0/1 CSR matrix without self loops."""
+    pairs = pd.read_csv(path, delimiter='|', usecols=['County GEOID', 'Neighbor GEOID'], dtype='int32')
+    fips = np.unique(pairs.to_numpy())
+    rows = np.searchsorted(fips, pairs['County GEOID'].to_numpy())
+    cols = np.searchsorted(fips, pairs['Neighbor GEOID'].to_numpy())
+    keep = rows != cols
+    matrix = sp.coo_matrix((np.ones(keep.sum(), dtype='float64'), (rows[keep], cols[keep])),
+                           shape=(len(fips), len(fips))).tocsr()
+    matrix = ((matrix + matrix.T) > 0).astype('float64')
+
+    stat = os.stat(path)
+    np.savez(cache_path, fips=fips, indptr=matrix.indptr, indices=matrix.indices,
+             source=np.array([stat.st_size, stat.st_mtime_ns], dtype='int64'))
+    return matrix, fips
+
+
+def load_adjacency(cache_path=CACHE_PATH, path=ADJACENCY_PATH):
+    """Return ``(matrix, fips)`` from the cache, rebuilding it if the adjacency file changed."""
+    if os.path.exists(cache_path):
+        cached = np.load(cache_path)
+        stat = os.stat(path)
+        if tuple(cached['source']) == (stat.st_size, stat.st_mtime_ns):
+            fips = cached['fips']
+            data = np.ones(len(cached['indices']), dtype='float64')
+            return sp.csr_matrix((data, cached['indices'], cached['indptr']), shape=(len(fips), len(fips))), fips
+    return build_adjacency(path, cache_path)
+
+
+def hop_rings(matrix, k):
+    """Boolean CSR matrices of the counties exactly 1..k steps away from each county."""
+    identity = sp.identity(matrix.shape[0], format='csr', dtype='float64')
+    step = (matrix + identity).tocsr()
+    reached = identity
+    rings = []
+    for _ in range(k):
+        grown = ((reached @ step) > 0).astype('float64')
+        rings.append((grown - reached).tocsr())
+        reached = grown
+    return rings
+
+
+def spatial_lag(frame, columns, k=1, key='fips_code', adjacency=None):
+    """Neighbor means of ``columns`` for hops 1..k, aligned to the rows of ``frame``.
+
+    Returns a frame with the index of ``frame`` and columns ``<column>_lag<h>``.
+    Rows whose county is not in the adjacency graph, or whose ring has no value,
+    get NaN.
+    """
+    matrix, fips = load_adjacency() if adjacency is None else adjacency
+    n, m = len(fips), len(columns)
+
+    # Scatter the frame's values onto the graph's county order
+    keys = pd.to_numeric(frame[key], errors='coerce').to_numpy(dtype='float64')
+    positions = np.searchsorted(fips, keys)
+    positions = np.minimum(positions, n - 1)
+    found = ~np.isnan(keys) & (fips[positions] == keys)
+    values = np.full((n, m), np.nan)
+    values[positions[found]] = frame.loc[found, columns].to_numpy(dtype='float64')
+
+    # One product for all hops and columns: [R1; ...; Rk] @ [values with 0 for NaN | mask]
+    present = ~np.isnan(values)
+    stacked = sp.vstack(hop_rings(matrix, k), format='csr')
+    product = stacked @ np.hstack([np.where(present, values, 0.0), present.astype('float64')])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = product[:, :m] / product[:, m:]
+
+    result = np.full((len(frame), k * m), np.nan)
+    by_hop = means.reshape(k, n, m)[:, positions[found], :]
+    result[found] = by_hop.transpose(1, 0, 2).reshape(found.sum(), k * m)
+    names = [f'{column}_lag{hop}' for hop in range(1, k + 1) for column in columns]
+    return pd.DataFrame(result, index=frame.index, columns=names)
@@ -0,0 +1,155 @@
+"""Cached county gazetteer: (county name, state) -> FIPS code.
+
+The index is built once from ``county_adjacency2024.txt`` and pickled next to it, so
+later runs load a few dictionaries instead of re-reading the 22k neighbor rows.
+Names are resolved in stages, each one only for the names the previous stage missed:
+
+1. exact ``"Autauga County, AL"`` keys, as the temperature script used to do;
+2. a normalized key: HTML entities decoded, accents and punctuation dropped,
+   case folded and "St."/"Ste." spelled out, so "St. Mary&#039;s County" and
+   "Saint Marys County", or "La Salle Parish" and "LaSalle Parish", meet;
+3. the normalized name without its suffix ("County", "Parish", "City and Borough",
+   "Census Area", ...), only where that name is unique in the state, so a bare
+   "Baltimore" never picks between Baltimore city and Baltimore County;
+4. a single-county state (e.g. District of Columbia) by state alone, then a close
+   ``difflib`` match among the county names of the same state. Ambiguous
+   suffix-less names stay unresolved here too.
+"""
+import difflib
+import html
+import os
+import pickle
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ADJACENCY_PATH = os.path.join(HERE, 'county_adjacency2024.txt')
+GAZETTEER_PATH = os.path.join(HERE, 'county_gazetteer.pkl')
+# Bumped when the pickled layout or its contents change, so old pickles are rebuilt
+GAZETTEER_VERSION = 2
+
+# Mapping from full state names to postal abbreviations
+STATE_ABBREV = {
+    'Alabama': 'AL', 'Alaska': 'AK', 'Arizona': 'AZ', 'Arkansas': 'AR',
+    'California': 'CA', 'Colorado': 'CO', 'Connecticut': 'CT', 'Delaware': 'DE',
+    'Florida': 'FL', 'Georgia': 'GA', 'Hawaii': 'HI', 'Idaho': 'ID',
+    'Illinois': 'IL', 'Indiana': 'IN', 'Iowa': 'IA', 'Kansas': 'KS',
+    'Kentucky': 'KY', 'Louisiana': 'LA', 'Maine': 'ME', 'Maryland': 'MD',
+    'Massachusetts': 'MA', 'Michigan': 'MI', 'Minnesota': 'MN', 'Mississippi': 'MS',
+    'Missouri': 'MO', 'Montana': 'MT', 'Nebraska': 'NE', 'Nevada': 'NV',
+    'New Hampshire': 'NH', 'New Jersey': 'NJ', 'New Mexico': 'NM', 'New York': 'NY',
+    'North Carolina': 'NC', 'North Dakota': 'ND', 'Ohio': 'OH', 'Oklahoma': 'OK',
+    'Oregon': 'OR', 'Pennsylvania': 'PA', 'Rhode Island': 'RI', 'South Carolina': 'SC',
+    'South Dakota': 'SD', 'Tennessee': 'TN', 'Texas': 'TX', 'Utah': 'UT',
+    'Vermont': 'VT', 'Virginia': 'VA', 'Washington': 'WA', 'West Virginia': 'WV',
+    'Wisconsin': 'WI', 'Wyoming': 'WY', 'District of Columbia': 'DC', 'Puerto Rico': 'PR',
+}
+
+# County-equivalent suffixes, longest first so "City and Borough" wins over "Borough"
+SUFFIXES = ['city and borough', 'planning region', 'census area', 'municipality', 'municipio',
+            'borough', 'county', 'parish', 'city']
+_SUFFIX_RE = re.compile(r'\s+(' + '|'.join(SUFFIXES) + r')$')
+
+FUZZY_CUTOFF = 0.88
+
+
+def normalize_name(name, strip_suffix=False):
+    """Comparable form of a county name: 'St. Mary&#039;s County' -> 'saintmaryscounty'."""
+    name = unicodedata.normalize('NFKD', html.unescape(str(name)))
+    name = ''.join(ch for ch in name if not unicodedata.combining(ch)).lower().strip()
+    name = re.sub(r'\bste?\.?\s', lambda m: 'sainte ' if m.group(0).startswith('ste') else 'saint ', name)
+    if strip_suffix:
+        name = _SUFFIX_RE.sub('', name)
+    return re.sub(r'[^a-z0-9]', '', name)
+
+
+def to_state_abbrev(states):
+    """Postal abbreviations for a Series of full state names or abbreviations."""
+    states = pd.Series(states, dtype=object).str.strip()
+    return states.map(STATE_ABBREV).fillna(states.str.upper())
+
+
+def build_gazetteer(adjacency_path=ADJACENCY_PATH):
+    """Build the lookup dictionaries from the county adjacency file."""
+    counties = (pd.read_csv(adjacency_path, delimiter='|', dtype=str, usecols=['County Name', 'County GEOID'])
+                .drop_duplicates())
+    name_state = counties['County Name'].str.rsplit(', ', n=1)
+    names, states = name_state.str[0], name_state.str[1]
+    fips = counties['County GEOID'].astype(int).to_numpy()
+
+    normalized = [normalize_name(n) for n in names]
+    stripped = [normalize_name(n, strip_suffix=True) for n in names]
+
+    exact = dict(zip(counties['County Name'], fips))
+    by_normalized = dict(zip(zip(normalized, states), fips))
+    # A suffix-less name that two counties of one state share (Baltimore city/County) is ambiguous
+    by_stripped = {}
+    for key, code in zip(zip(stripped, states), fips):
+        by_stripped[key] = None if key in by_stripped and by_stripped[key] != code else code
+    # The fuzzy stage matches the same names, so ambiguous ones map to None there as well
+    by_state = {}
+    for name, state in by_stripped:
+        by_state.setdefault(state, {})[name] = by_stripped[name, state]
+
+    stat = os.stat(adjacency_path)
+    return {'version': GAZETTEER_VERSION,
+            'source': (os.path.abspath(adjacency_path), stat.st_size, stat.st_mtime_ns),
+            'exact': exact, 'normalized': by_normalized, 'stripped': by_stripped, 'by_state': by_state}
+
+
+def load_gazetteer(path=GAZETTEER_PATH, adjacency_path=ADJACENCY_PATH):
+    """Load the pickled gazetteer, rebuilding it when missing or older than the adjacency file."""
+    stat = os.stat(adjacency_path)
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            gazetteer = pickle.load(f)
+        if gazetteer.get('version') == GAZETTEER_VERSION and \
+                gazetteer['source'][1:] == (stat.st_size, stat.st_mtime_ns):
+            return gazetteer
+    gazetteer = build_gazetteer(adjacency_path)
+    with open(path, 'wb') as f:
+        pickle.dump(gazetteer, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return gazetteer
+
+
+def resolve_fips(names, states, gazetteer=None, fuzzy=True):
+    """FIPS codes for county names and states (full names or abbreviations).
+
+    Returns ``(fips, method)``: a nullable Int32 Series and a Series naming the stage
+    that matched each row (``exact``, ``normalized``, ``suffix``, ``state``,
+    ``fuzzy``), with <NA>/None where nothing matched.
+    """
+    gazetteer = load_gazetteer() if gazetteer is None else gazetteer
+    names = pd.Series(names, dtype=object).reset_index(drop=True)
+    states = to_state_abbrev(states).reset_index(drop=True)
+
+    fips = (names + ', ' + states).map(gazetteer['exact'])
+    method = pd.Series(np.where(fips.notna(), 'exact', None), dtype=object)
+
+    missing = fips.isna() & names.notna() & states.notna()
+    for row in np.flatnonzero(missing.to_numpy()):
+        code, how = _resolve_one(names[row], states[row], gazetteer, fuzzy)
+        fips[row], method[row] = code, how
+    return fips.astype('Int32'), method
+
+
+def _resolve_one(name, state, gazetteer, fuzzy):
+    code = gazetteer['normalized'].get((normalize_name(name), state))
+    if code is not None:
+        return code, 'normalized'
+    stripped = normalize_name(name, strip_suffix=True)
+    code = gazetteer['stripped'].get((stripped, state))
+    if code is not None:
+        return code, 'suffix'
+    in_state = gazetteer['by_state'].get(state, {})
+    if len(in_state) == 1:
+        return next(iter(in_state.values())), 'state'
+    if fuzzy:
+        close = difflib.get_close_matches(stripped, list(in_state), n=2, cutoff=FUZZY_CUTOFF)
+        if close and in_state[close[0]] is not None and \
+                (len(close) == 1 or in_state[close[0]] == in_state[close[1]]):
+            return in_state[close[0]], 'fuzzy'
+    return None, None
@@ -0,0 +1,238 @@
+"""Seeded synthetic inputs with the schemas of the real source files.
+
+    python -m benchmarks.generators eaglei eaglei_outages_2023.csv --rows 100000000
+    python -m benchmarks.generators ers Population/ --counties 3000
+    python -m benchmarks.generators data_centers Merge_BA_Carbon.csv --rows 3000
+    python -m benchmarks.generators temperature "Temperature Data.csv"
+
+Counties come from county_adjacency2024.txt, so names and FIPS codes match the real
+gazetteer. Rosters larger than the real ~3,200 counties get synthetic codes inside
+the same states. The EAGLE-I feed is written in time order, in chunks of at most
+CHUNK_ROWS rows, so 100M-row files use no more memory than 10k-row ones. Every
+file is fully determined by its arguments and the seed.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from Temperature.gazetteer import ADJACENCY_PATH, STATE_ABBREV
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHUNK_ROWS = 1_000_000
+SLOT = pd.Timedelta(minutes=15)
+MEAN_RUN_SLOTS = 12  # 3 hours
+MAX_FILL = 0.25  # at most a quarter of all county x 15-minute cells carry a row
+STATE_NAMES = {abbrev: name for name, abbrev in STATE_ABBREV.items()}
+
+# ERS long-format files: name -> (FIPS column, processed file with the real attribute names)
+ERS_FILES = {
+    'Education2023.csv': ('FIPS_Code', 'Processed_Education2023.csv'),
+    'Poverty2023.csv': ('FIPS_Code', 'Processed_Poverty2023.csv'),
+    'Unemployment2023.csv': ('FIPS_Code', 'Processed_Unemployment2023.csv'),
+    'PopulationEstimates.csv': ('FIPStxt', 'Processed_PopulationEstimates.csv'),
+}
+ERS_EARLIER_YEARS = ('2021', '2022')  # extra attribute years that the 2023 filters drop
+
+
+def county_roster(n_counties=None, seed=0):
+    """fips_code, county (without suffix), county_name, state (full) and state_abbrev per county."""
+    pairs = pd.read_csv(ADJACENCY_PATH, delimiter='|', usecols=['County Name', 'County GEOID'], dtype=str)
+    roster = pairs.drop_duplicates('County GEOID')
+    name_state = roster['County Name'].str.rsplit(', ', n=1, expand=True)
+    roster = pd.DataFrame({'fips_code': roster['County GEOID'].astype('int64').to_numpy(),
+                           'county_name': name_state[0].to_numpy(), 'state_abbrev': name_state[1].to_numpy()})
+    roster = roster[roster['state_abbrev'].isin(STATE_NAMES)].reset_index(drop=True)
+    if n_counties is not None and n_counties > len(roster):
+        # Synthetic counties inside real states, on the county codes those states leave unused
+        rng = np.random.default_rng(seed)
+        states = np.sort(rng.choice(roster['fips_code'].to_numpy() // 1000, n_counties - len(roster)))
+        used = roster.groupby(roster['fips_code'] // 1000)['fips_code'].agg(lambda f: set(f % 1000))
+        codes = []
+        for state, count in zip(*np.unique(states, return_counts=True)):
+            free = [c for c in range(1, 1000) if c not in used[state]]
+            if count > len(free):
+                raise ValueError(f'state {state} has no room for {count} more county codes')
+            codes.extend(state * 1000 + c for c in free[:count])
+        abbrev = dict(zip(roster['fips_code'] // 1000, roster['state_abbrev']))
+        roster = pd.concat([roster, pd.DataFrame({
+            'fips_code': np.asarray(codes, dtype='int64'),
+            'county_name': [f'Synthetic {i} County' for i in range(len(codes))],
+            'state_abbrev': [abbrev[s] for s in states]})], ignore_index=True)
+    elif n_counties is not None:
+        roster = roster.iloc[np.sort(np.random.default_rng(seed).choice(len(roster), n_counties, replace=False))]
+    roster = roster.reset_index(drop=True)
+    roster['county'] = roster['county_name'].str.replace(r'\s+(County|Parish|Borough|Census Area)$', '', regex=True)
+    roster['state'] = roster['state_abbrev'].map(STATE_NAMES)
+    return roster
+
+
+def eaglei_chunks(rows, counties=None, seed=0, start='2023-01-01', days=None, chunk_rows=CHUNK_ROWS):
+    """Yield EAGLE-I frames (fips_code, county, state, sum, run_start_time) in time order.
+
+    Outages are runs of consecutive 15-minute rows with a geometric length. Each
+    chunk covers its own time window, and runs are cut at the window's end. About
+    10% of the rows are below the 10-customer filter. ``days`` defaults to a year,
+    or to however many years keep the feed at most MAX_FILL full.
+    """
+    rng = np.random.default_rng(seed)
+    roster = counties if isinstance(counties, pd.DataFrame) else county_roster(counties, seed)
+    slots_per_day = int(pd.Timedelta(days=1) / SLOT)
+    if days is None:
+        days = 365 * max(1, -(-rows // int(MAX_FILL * len(roster) * slots_per_day * 365)))
+    n_slots = days * slots_per_day
+    n_chunks = max(1, -(-rows // chunk_rows))
+    bounds = np.linspace(0, n_slots, n_chunks + 1).astype('int64')
+    origin = pd.Timestamp(start).to_datetime64()
+    written = 0
+    for i in range(n_chunks):
+        target = rows // n_chunks + (i < rows % n_chunks)
+        lo, hi = bounds[i], max(bounds[i + 1], bounds[i] + 1)
+        county_idx, slot = _outage_rows(rng, target, len(roster), lo, hi)
+        chunk = pd.DataFrame({
+            'fips_code': roster['fips_code'].to_numpy()[county_idx],
+            'county': roster['county'].to_numpy()[county_idx],
+            'state': roster['state'].to_numpy()[county_idx],
+            'sum': np.maximum(1, rng.lognormal(4.0, 1.6, len(slot))).astype('int64'),
+            'run_start_time': _slot_strings(origin, slot),
+        })
+        written += len(chunk)
+        yield chunk
+    assert written == rows
+
+
+def _outage_rows(rng, target, n_counties, lo, hi):
+    # Draw runs until the window holds at least `target` distinct (county, slot) rows,
+    # then keep a random subset of exactly `target`, sorted by time
+    cells = np.empty(0, dtype='int64')
+    capacity = n_counties * (hi - lo)
+    if target > capacity:
+        raise ValueError(f'{target} rows do not fit {n_counties} counties x {hi - lo} time slots')
+    while len(cells) < target:
+        n_runs = max(1, (target - len(cells)) // MEAN_RUN_SLOTS + 1)
+        county = rng.integers(0, n_counties, n_runs)
+        first = rng.integers(lo, hi, n_runs)
+        length = np.minimum(rng.geometric(1 / MEAN_RUN_SLOTS, n_runs), hi - first)
+        run = np.repeat(np.arange(n_runs), length)
+        slot = first[run] + np.arange(len(run)) - np.repeat(np.cumsum(length) - length, length)
+        cells = np.sort(np.concatenate([cells, slot * n_counties + county[run]]))
+        cells = cells[np.r_[True, cells[1:] != cells[:-1]]]  # sorted unique, cheaper than np.unique
+    if len(cells) > target:
+        cells = np.delete(cells, rng.choice(len(cells), len(cells) - target, replace=False))
+    return cells % n_counties, cells // n_counties
+
+
+def _slot_strings(origin, slot):
+    # Format each distinct time slot once; writing datetimes through to_csv is far slower
+    unique, inverse = np.unique(slot, return_inverse=True)
+    text = np.char.replace(np.datetime_as_string(origin + unique * SLOT.to_timedelta64(), unit='s'), 'T', ' ')
+    return text.astype(object)[inverse]
+
+
+def write_eaglei(path, rows, counties=None, seed=0, start='2023-01-01', days=None, chunk_rows=CHUNK_ROWS):
+    """Write a synthetic EAGLE-I CSV of exactly ``rows`` rows, one chunk at a time."""
+    for i, chunk in enumerate(eaglei_chunks(rows, counties, seed, start, days, chunk_rows)):
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    return path
+
+
+def _ers_attributes(processed_file):
+    path = os.path.join(ROOT, 'Population', processed_file)
+    if os.path.exists(path):
+        return [c for c in pd.read_csv(path, nrows=0).columns if c != 'fips_code']
+    return [f'ATTRIBUTE_{i}_2023' for i in range(20)]
+
+
+def write_ers(directory, counties=None, seed=0):
+    """Write the four ERS long-format files (FIPS, state, area name, Attribute, Value) into ``directory``."""
+    rng = np.random.default_rng(seed)
+    roster = counties if isinstance(counties, pd.DataFrame) else county_roster(counties, seed)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for file, (fips_column, processed_file) in ERS_FILES.items():
+        attributes = _ers_attributes(processed_file)
+        if file != 'Education2023.csv':
+            attributes = attributes + [a.replace('2023', year) for a in attributes if '2023' in a
+                                       for year in ERS_EARLIER_YEARS]
+        n, m = len(roster), len(attributes)
+        values = rng.lognormal(6, 2, n * m).round(1)
+        values[rng.random(n * m) < 0.05] = np.nan  # suppressed cells
+        frame = pd.DataFrame({
+            fips_column: np.repeat(roster['fips_code'].to_numpy(), m),
+            'State': np.repeat(roster['state_abbrev'].to_numpy(), m),
+            'Area_Name': np.repeat((roster['county_name'] + ', ' + roster['state_abbrev']).to_numpy(), m),
+            'Attribute': np.tile(np.asarray(attributes, dtype=object), n),
+            'Value': values,
+        }).dropna(subset=['Value'])
+        path = os.path.join(directory, file)
+        frame.to_csv(path, index=False, encoding='ISO-8859-1')
+        paths.append(path)
+    return paths
+
+
+def write_data_centers(path, rows, seed=0):
+    """Write a Merge_BA_Carbon.csv-shaped table of ``rows`` data centers inside the contiguous US."""
+    rng = np.random.default_rng(seed)
+    states = np.array(sorted(set(STATE_NAMES) - {'AK', 'HI', 'PR'}))
+    power = rng.lognormal(13, 2, rows)
+    carbon = power * rng.uniform(0.0, 0.0008, rows)
+    carbon[rng.random(rows) < 0.1] = np.nan
+    frame = pd.DataFrame({
+        'Data_center': [f'Synthetic DC {i}' for i in range(rows)],
+        'Data_center_address': [f'{100 + i % 9900} Synthetic Rd' for i in range(rows)],
+        'Longitude_of_data_center': rng.uniform(-124.0, -70.0, rows).round(7),
+        'Latitude_of_data_center': rng.uniform(25.5, 48.5, rows).round(7),
+        'Is_it_accurate': rng.choice(['ROOFTOP', 'RANGE_INTERPOLATED', 'APPROXIMATE'], rows),
+        'Zone_id': 'US-' + rng.choice(states, rows).astype(object),
+        'power_usage_2023_kwh': power,
+        'power_usage_per_hour_2023_kwh': power / 8760,
+        'carbon_emission_2023_tons': carbon,
+        'carbon_emission_per_hour_2023_tons': carbon / 8760,
+    })
+    frame.to_csv(path, index=False, encoding='ISO-8859-1')
+    return path
+
+
+def write_temperature(path, counties=None, seed=0):
+    """Write a 'Temperature Data.csv'-shaped table: ID, Name, State, Value, anomaly, rank and mean."""
+    rng = np.random.default_rng(seed)
+    roster = counties if isinstance(counties, pd.DataFrame) else county_roster(counties, seed)
+    mean = rng.uniform(20, 75, len(roster)).round(1)
+    anomaly = rng.normal(0, 3, len(roster)).round(1)
+    frame = pd.DataFrame({
+        'ID': roster['state_abbrev'] + '-' + (roster['fips_code'] % 1000).astype(str).str.zfill(3),
+        'Name': roster['county_name'],
+        'State': roster['state'],
+        'Value': (mean + anomaly).round(1),
+        'Anomaly (1901-2000 base period)': anomaly,
+        'Rank': rng.integers(1, 130, len(roster)),
+        '1901-2000 Mean': mean,
+    })
+    frame.to_csv(path, index=False)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write seeded synthetic input files.')
+    parser.add_argument('kind', choices=['eaglei', 'ers', 'data_centers', 'temperature'])
+    parser.add_argument('output', help='output file (a directory for ers)')
+    parser.add_argument('--rows', type=int, default=100_000, help='rows for eaglei and data_centers')
+    parser.add_argument('--counties', type=int, default=None, help='county roster size (default: all real counties)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--days', type=int, default=None, help='time span of the eaglei feed (default: one year or more)')
+    args = parser.parse_args(argv)
+
+    if args.kind == 'eaglei':
+        write_eaglei(args.output, args.rows, args.counties, args.seed, days=args.days)
+    elif args.kind == 'ers':
+        write_ers(args.output, args.counties, args.seed)
+    elif args.kind == 'data_centers':
+        write_data_centers(args.output, args.rows, args.seed)
+    else:
+        write_temperature(args.output, args.counties, args.seed)
+    print(f'Wrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Startup time of the command line, against a budget.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --budget-ms 1000 --command ml train --help
+
+Runs ``python cli.py --help`` (or the given command) in fresh interpreters and
+reports the best and median wall time. When the best run is over budget it prints
+the slowest imports from ``python -X importtime`` and exits with status 1.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI_PATH = os.path.join(ROOT, 'cli.py')
+BUDGET_MS = 200
+
+
+def time_command(args, repeat=10):
+    """Wall milliseconds of ``repeat`` fresh runs of ``python cli.py <args>``."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, CLI_PATH] + list(args), stdout=subprocess.DEVNULL, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def slowest_imports(args, n=15):
+    """(cumulative microseconds, module) of the n slowest imports of one run."""
+    completed = subprocess.run([sys.executable, '-X', 'importtime', CLI_PATH] + list(args),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    rows = []
+    for line in completed.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line and 'cumulative' not in line:
+            _, cumulative, module = line.split('|')
+            rows.append((int(cumulative), module.strip()))
+    return sorted(rows, reverse=True)[:n]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the startup of cli.py against a budget.')
+    parser.add_argument('--command', nargs=argparse.REMAINDER, default=['--help'],
+                        help='cli.py arguments to time (default: --help); must come last')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=BUDGET_MS)
+    args = parser.parse_args(argv)
+
+    times = time_command(args.command, args.repeat)
+    best = min(times)
+    print(f'cli.py {" ".join(args.command)}: best {best:.0f} ms, median {statistics.median(times):.0f} ms '
+          f'over {args.repeat} runs (budget {args.budget_ms:.0f} ms)')
+    if best > args.budget_ms:
+        print('Slowest imports (cumulative):')
+        for microseconds, module in slowest_imports(args.command):
+            print(f'  {microseconds / 1000:8.1f} ms  {module}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
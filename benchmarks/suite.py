@@ -0,0 +1,218 @@
+"""Timed, memory-tracked benchmarks of the pipeline steps on synthetic inputs.
+
+    python -m benchmarks.suite --rows 1000000 --save baseline.json
+    python -m benchmarks.suite --rows 1000000 --compare baseline.json
+    python -m benchmarks.suite outage_aggregation --rows 100000000 --repeat 1
+
+Inputs are written to a temporary directory by benchmarks.generators before any
+timing starts. Each benchmark is run ``--repeat`` times and the best wall time is
+kept. A separate run under tracemalloc records its peak Python and NumPy
+allocations; that run is not timed, because tracing slows allocation-heavy code.
+
+``--compare`` prints the ratio of each best time to the baseline's. It exits with
+status 1 when a benchmark is slower than ``--threshold`` times the baseline, so the
+suite can gate a change. Compare runs of the same size on the same machine. The
+saved file records the versions and platform next to the results.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from correlation import correlation_table
+from fips_join import align_on_fips
+from Outage.events import rollup_events
+from Outage.stream import events_from_chunks, read_outages_chunked
+from Population.ers_ingest import ERS_SOURCES, ingest_ers, read_ers_wide
+
+from .generators import county_roster, write_ers, write_eaglei, write_temperature
+
+THRESHOLD = 1.25
+
+
+# ==================== Benchmarks ====================
+# Each benchmark is a setup(workdir, args) that writes or loads its inputs, and a
+# run(inputs) that does the timed work and returns the number of rows it processed.
+
+def _setup_outages(workdir, args):
+    path = os.path.join(workdir, 'eaglei_outages.csv')
+    if not os.path.exists(path):
+        write_eaglei(path, args.rows, _roster(workdir, args), args.seed)
+    return path, args.rows  # the generator writes exactly args.rows rows
+
+
+def _run_outage_aggregation(inputs):
+    path, rows = inputs
+    events = pd.concat(events_from_chunks(read_outages_chunked(path)), ignore_index=True)
+    rollup_events(events)
+    return rows
+
+
+def _setup_ers(workdir, args):
+    directory = os.path.join(workdir, 'ers')
+    if not os.path.isdir(directory):
+        write_ers(directory, _roster(workdir, args), args.seed)
+    return directory
+
+
+def _run_ers_pivots(directory):
+    demographics, _ = ingest_ers(directory=directory)
+    return len(demographics)
+
+
+def _setup_fips_merge(workdir, args):
+    directory = _setup_ers(workdir, args)
+    sources = {file: read_ers_wide(os.path.join(directory, file), fips_column, year)
+               for file, fips_column, year in ERS_SOURCES}
+    roster = _roster(workdir, args)
+    path = write_temperature(os.path.join(workdir, 'temperature.csv'), roster, args.seed)
+    # The temperature table as the assign-FIPS step leaves it, keys as text to exercise normalization
+    temperature = pd.read_csv(path).assign(fips_code=roster['fips_code'].astype(str).str.zfill(5))
+    sources['temperature'] = temperature.drop(columns=['ID', 'Name', 'State'])
+    return sources
+
+
+def _run_fips_merge(sources):
+    table, _ = align_on_fips(sources)
+    return len(table)
+
+
+def _setup_correlation(workdir, args):
+    table, _ = align_on_fips(_setup_fips_merge(workdir, args))
+    with_centers = np.random.default_rng(args.seed).random(len(table)) < 0.3
+    return table, with_centers
+
+
+def _run_correlation(inputs):
+    table, with_centers = inputs
+    correlation_table(table.drop(columns='fips_code'), groups={'with_centers': with_centers, 'all': None})
+    return len(table)
+
+
+# name -> (setup, run)
+BENCHMARKS = {
+    'outage_aggregation': (_setup_outages, _run_outage_aggregation),
+    'ers_pivots': (_setup_ers, _run_ers_pivots),
+    'fips_merge': (_setup_fips_merge, _run_fips_merge),
+    'correlation': (_setup_correlation, _run_correlation),
+}
+
+
+def _roster(workdir, args):
+    path = os.path.join(workdir, 'roster.pkl')
+    if not os.path.exists(path):
+        county_roster(args.counties, args.seed).to_pickle(path)
+    return pd.read_pickle(path)
+
+
+# ==================== Running and comparing ====================
+
+def run_benchmark(run, inputs, repeat):
+    """(best seconds, all seconds, rows, peak traced MB) of one benchmark."""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        rows = run(inputs)
+        times.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run(inputs)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(times), times, rows, peak / 2 ** 20
+
+
+def run_suite(names=None, rows=1_000_000, counties=None, seed=0, repeat=3, workdir=None):
+    """Run the named benchmarks (default: all); returns one result row per benchmark."""
+    args = argparse.Namespace(rows=rows, counties=counties, seed=seed)
+    names = list(BENCHMARKS) if not names else names
+    unknown = sorted(set(names) - set(BENCHMARKS))
+    if unknown:
+        raise KeyError(f'unknown benchmarks {unknown}; benchmarks: {", ".join(BENCHMARKS)}')
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        results = []
+        for name in names:
+            setup, run = BENCHMARKS[name]
+            start = time.perf_counter()
+            inputs = setup(tmp, args)
+            print(f'[{name}] setup {time.perf_counter() - start:.1f}s', flush=True)
+            best, times, n_rows, peak_mb = run_benchmark(run, inputs, repeat)
+            results.append({'benchmark': name, 'rows': n_rows, 'best_s': round(best, 4),
+                            'mean_s': round(sum(times) / len(times), 4),
+                            'rows_per_s': round(n_rows / best, 1) if best > 0 else None,
+                            'peak_mb': round(peak_mb, 1)})
+            print(f'[{name}] best {best:.3f}s over {repeat} runs, peak {peak_mb:.1f} MB', flush=True)
+            del inputs
+    return results
+
+
+def environment():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'platform': platform.platform(), 'machine': platform.machine(), 'cpus': os.cpu_count(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def save_results(results, path, settings):
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'settings': settings, 'results': results}, f, indent=1)
+
+
+def compare_results(results, baseline, threshold=THRESHOLD):
+    """Results joined with the baseline's best times; ``ratio`` > threshold marks a regression."""
+    current = pd.DataFrame(results).set_index('benchmark')
+    before = pd.DataFrame(baseline['results']).set_index('benchmark')
+    table = current[['rows', 'best_s', 'peak_mb']].join(
+        before[['rows', 'best_s', 'peak_mb']], rsuffix='_baseline', how='left')
+    table['ratio'] = table['best_s'] / table['best_s_baseline']
+    table['memory_ratio'] = table['peak_mb'] / table['peak_mb_baseline']
+    table['regression'] = table['ratio'] > threshold
+    return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline steps on synthetic inputs.')
+    parser.add_argument('benchmarks', nargs='*', help=f'benchmarks to run (default: all); {", ".join(BENCHMARKS)}')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='EAGLE-I feed rows (10k to 100M)')
+    parser.add_argument('--counties', type=int, default=None,
+                        help='counties in the county-level tables (default: all real counties)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per benchmark; the best is kept')
+    parser.add_argument('--workdir', default=None, help='where to write the temporary inputs')
+    parser.add_argument('--save', metavar='JSON', help='write the results as a baseline file')
+    parser.add_argument('--compare', metavar='JSON', help='compare against a saved baseline')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='slowdown ratio that counts as a regression (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    settings = {'rows': args.rows, 'counties': args.counties, 'seed': args.seed, 'repeat': args.repeat}
+    results = run_suite(args.benchmarks, args.rows, args.counties, args.seed, args.repeat, args.workdir)
+    print(pd.DataFrame(results).to_string(index=False))
+    if args.save:
+        save_results(results, args.save, settings)
+        print(f'Saved {args.save}')
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if {k: baseline['settings'].get(k) for k in ('rows', 'counties', 'seed')} != \
+                {k: settings[k] for k in ('rows', 'counties', 'seed')}:
+            print(f'Warning: baseline settings {baseline["settings"]} differ from {settings}')
+        table = compare_results(results, baseline, args.threshold)
+        print(table.to_string(float_format=lambda v: f'{v:.3f}'))
+        if table['regression'].any():
+            print(f'Slower than {args.threshold}x the baseline: {", ".join(table.index[table["regression"]])}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""One command-line entry point for every stage of the project.
+
+    python cli.py --help
+    python cli.py outages aggregate Outage/eaglei_outages_2023.csv --chunksize 2000000
+    python cli.py population ingest --directory Population
+    python cli.py ml train --folds 5 --jobs 8
+    python cli.py analyze query "SELECT count(*) FROM outage_events"
+
+Nothing beyond argparse is imported until a command is chosen, and then only that
+command's module, so ``--help`` and job startup stay fast. Package modules run
+their ``main`` in the current directory. Scripts (files with spaces in their names)
+run with runpy in their own directory, as the pipeline runs them, so their default
+inputs and outputs are the files beside them. Path arguments given to a script are
+made absolute first, so every command resolves relative paths against the current
+directory. Scripts without options refuse extra arguments instead of ignoring them.
+
+``python -m benchmarks.startup`` times ``--help`` against a 200 ms budget.
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# (group, command) -> (module or script path relative to the repository, accepts arguments, help)
+COMMANDS = {
+    ('outages', 'aggregate'): ('Outage/aggregate outages.py', True, 'detect outage events in one EAGLE-I file'),
+    ('outages', 'parallel'): ('Outage.parallel', True, 'aggregate many EAGLE-I files on a process pool'),
+    ('outages', 'update'): ('Outage.incremental', True, 'fold newly delivered EAGLE-I files into the events'),
+    ('outages', 'sweep'): ('Outage.sweep', True, 'per-county rollups over a grid of event definitions'),
+    ('ds', 'fips'): ('DS/Data center to fip.py', False, 'assign FIPS codes to data centers'),
+    ('ds', 'group'): ('DS/Group data centers by fip codes.py', False, 'group data centers by county, build the cube'),
+    ('population', 'ingest'): ('Population.ers_ingest', True, 'build the demographics table from the ERS files'),
+    ('population', 'merge'): ('Population/Merge to once file.py', False, 'merge the processed ERS tables'),
+    ('temperature', 'fips'): ('Temperature/Assign FIPS to counties.py', False, 'assign FIPS codes to temperatures'),
+    ('analyze', 'corr'): ('Correlation analysis for a lot of new variables.py', False,
+                          'merge the county features and correlate them'),
+    ('analyze', 'inspect'): ('Inspect.py', False, 'inspect the merged county table'),
+    ('analyze', 'query'): ('query', True, 'run SQL over the pipeline outputs'),
+    ('ml', 'train'): ('ml_train', True, 'cross-validated model search'),
+    ('ml', 'baseline'): ("Let's try to do some ML magics here.py", False, 'single-split Lasso baseline'),
+    ('pipeline', 'run'): ('pipeline', True, 'bring the outputs up to date as a dependency graph'),
+    ('bench', 'run'): ('benchmarks.suite', True, 'benchmark the pipeline steps on synthetic inputs'),
+    ('bench', 'generate'): ('benchmarks.generators', True, 'write synthetic input files'),
+    ('bench', 'startup'): ('benchmarks.startup', True, 'time the startup of this command line'),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='cli.py', description='Run a stage of the outage and data center analysis.')
+    groups = parser.add_subparsers(dest='group', metavar='GROUP', required=True)
+    for group in dict.fromkeys(g for g, _ in COMMANDS):
+        names = [c for g, c in COMMANDS if g == group]
+        group_parser = groups.add_parser(group, help=', '.join(names))
+        commands = group_parser.add_subparsers(dest='command', metavar='COMMAND', required=True)
+        for name in names:
+            target, _, help_text = COMMANDS[group, name]
+            commands.add_parser(name, help=help_text, description=f'{help_text} ({target})', add_help=False)
+    return parser
+
+
+def _absolute_paths(args):
+    # Script arguments that are neither options nor numbers are paths ('' stays empty)
+    def resolve(value):
+        if not value or value.startswith('-'):
+            return value
+        try:
+            float(value)
+            return value
+        except ValueError:
+            return os.path.abspath(value)
+
+    resolved = []
+    for arg in args:
+        if arg.startswith('--') and '=' in arg:
+            option, value = arg.split('=', 1)
+            resolved.append(f'{option}={resolve(value)}')
+        else:
+            resolved.append(resolve(arg))
+    return resolved
+
+
+def run_command(group, command, args):
+    """Import and run one command with its own arguments."""
+    target, accepts_args, help_text = COMMANDS[group, command]
+    if not target.endswith('.py'):
+        import importlib
+        return importlib.import_module(target).main(args)
+
+    path = os.path.join(ROOT, target)
+    if not accepts_args and args:
+        if args[0] in ('-h', '--help'):
+            print(f'usage: cli.py {group} {command}\n\n{help_text}; runs {target} in its own directory')
+            return None
+        raise SystemExit(f'cli.py {group} {command}: {target} takes no arguments, got {" ".join(args)}')
+    import runpy
+    cwd = os.getcwd()
+    argv = sys.argv
+    sys.argv = [path] + _absolute_paths(args)
+    try:
+        os.chdir(os.path.dirname(path))
+        runpy.run_path(path, run_name='__main__')
+    finally:
+        os.chdir(cwd)
+        sys.argv = argv
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if len(argv) >= 2 and (argv[0], argv[1]) in COMMANDS:
+        # Dispatch straight away: the command's own parser handles the rest, including --help
+        return run_command(argv[0], argv[1], argv[2:])
+    build_parser().parse_args(argv)  # prints help or the usage error and exits
+
+
+if __name__ == '__main__':
+    main()
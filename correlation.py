@@ -0,0 +1,166 @@
+"""Pairwise-complete correlation matrices as masked matrix products.
+
+``DataFrame.corr()`` loops over column pairs to handle missing values and gives no
+significance. Here the data is standardized once and, with ``Z`` the standardized
+values (0 where missing) and ``M`` the 0/1 presence mask, every pairwise-complete
+sum is a BLAS product: ``n = M'M``, ``Sx = Z'M``, ``Sxx = (Z*Z)'M`` and ``Sxy = Z'Z``.
+Subgroups (e.g. counties with data centers) are extra masks over the same rows and
+go through the same batched products.
+
+Spearman correlations are Pearson correlations of the column ranks (average ranks
+for ties). Ranks are taken within each row group, over all non-missing values of a
+column, so with missing data they differ slightly from pandas, which re-ranks every
+pair.
+
+p-values use the t distribution with ``n - 2`` degrees of freedom, q-values are
+Benjamini-Hochberg adjusted over the distinct pairs of each matrix, and bootstrap
+confidence intervals are computed on a process pool.
+"""
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.special import stdtr
+
+
+def correlation_table(frame, columns=None, groups=None, method='pearson'):
+    """Correlation, pair counts, p-values and FDR q-values for each row group.
+
+    ``groups`` maps a name to a boolean row mask (``None`` means all rows); by default
+    there is one group, ``'all'``. Returns ``{group: {'r': ..., 'n': ..., 'p': ...,
+    'q': ...}}`` with square DataFrames over ``columns`` (default: numeric columns).
+    """
+    columns = list(frame.select_dtypes(include='number').columns if columns is None else columns)
+    groups = {'all': None} if groups is None else groups
+    values = frame[columns].to_numpy(dtype='float64', na_value=np.nan)
+    row_masks = np.stack([np.ones(len(frame), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+                          for mask in groups.values()])
+
+    r, n = pairwise_correlation(values, row_masks, method)
+    p = correlation_pvalues(r, n)
+    q = np.stack([fdr_bh(p_group) for p_group in p])
+
+    def square(matrix):
+        return pd.DataFrame(matrix, index=columns, columns=columns)
+
+    return {name: {'r': square(r[g]), 'n': square(n[g]), 'p': square(p[g]), 'q': square(q[g])}
+            for g, name in enumerate(groups)}
+
+
+def pairwise_correlation(values, row_masks=None, method='pearson'):
+    """Correlation and pair-count matrices, shape (groups, columns, columns), for each row mask."""
+    if method not in ('pearson', 'spearman'):
+        raise ValueError(f'Unknown method {method!r}')
+    if row_masks is None:
+        row_masks = np.ones((1, len(values)), dtype=bool)
+
+    # (groups, rows, columns) stacks; matmul runs one batched product per sum
+    mask = ~np.isnan(values)[None, :, :] & row_masks[:, :, None]
+    if method == 'spearman':
+        # Ranks of each group's own rows, so a subgroup is Spearman within the subgroup
+        stack = np.stack([rank_columns(np.where(group_mask, values, np.nan)) for group_mask in mask])
+    else:
+        stack = np.broadcast_to(values, mask.shape)
+    # Standardize with each group's column statistics; correlations do not depend on
+    # it, but the sums of squares below stay well conditioned. nanmean/nanstd warn
+    # about all-missing columns through warnings, not errstate
+    masked = np.where(mask, stack, np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        center = np.nanmean(masked, axis=1, keepdims=True)
+        scale = np.nanstd(masked, axis=1, keepdims=True)
+    scale = np.where((scale > 0) & np.isfinite(scale), scale, 1.0)
+    zg = np.where(mask, (masked - np.nan_to_num(center)) / scale, 0.0)
+    m = mask.astype('float64')
+    mt = m.transpose(0, 2, 1)
+    zt = zg.transpose(0, 2, 1)
+    n = mt @ m
+    sx = zt @ m
+    sxx = (zt * zt) @ m
+    sxy = zt @ zg
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sx.transpose(0, 2, 1) / n
+        var_x = sxx - sx * sx / n
+        var_y = var_x.transpose(0, 2, 1)
+        r = cov / np.sqrt(var_x * var_y)
+    tiny = 1e-12 * np.maximum(n, 1)
+    r[(n < 2) | (var_x <= tiny) | (var_y <= tiny)] = np.nan
+    r = np.clip(r, -1.0, 1.0)
+    return r, n
+
+
+def rank_columns(values):
+    """Average ranks of every column, ignoring (and keeping) missing values."""
+    return pd.DataFrame(values).rank(method='average').to_numpy(dtype='float64')
+
+
+def correlation_pvalues(r, n):
+    """Two-sided p-values of correlations from the t distribution with n - 2 degrees of freedom."""
+    dof = n - 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = r * np.sqrt(dof / np.maximum(1.0 - r * r, 0.0))
+        p = 2.0 * stdtr(dof, -np.abs(t))
+    p[np.abs(r) >= 1.0] = 0.0
+    p[(dof < 1) | np.isnan(r)] = np.nan
+    return p
+
+
+def fdr_bh(p):
+    """Benjamini-Hochberg q-values of a symmetric p-value matrix, over its distinct pairs."""
+    upper = np.triu_indices(p.shape[0], k=1)
+    values = p[upper]
+    valid = np.flatnonzero(~np.isnan(values))
+    order = valid[np.argsort(values[valid])]
+    ranked = values[order] * len(order) / np.arange(1, len(order) + 1)
+    adjusted = np.minimum(np.minimum.accumulate(ranked[::-1])[::-1], 1.0)
+
+    q = np.full(p.shape, np.nan)
+    tri = np.full(len(values), np.nan)
+    tri[order] = adjusted
+    q[upper] = tri
+    q.T[upper] = tri
+    np.fill_diagonal(q, np.where(np.isnan(np.diag(p)), np.nan, 0.0))
+    return q
+
+
+def bootstrap_ci(frame, columns=None, method='pearson', n_boot=1000, alpha=0.05, workers=None, seed=0):
+    """Percentile bootstrap confidence intervals of the correlation matrix.
+
+    Rows are resampled with replacement; replicates are split into one batch per
+    worker process. Returns ``(low, high)`` DataFrames.
+    """
+    columns = list(frame.select_dtypes(include='number').columns if columns is None else columns)
+    values = frame[columns].to_numpy(dtype='float64', na_value=np.nan)
+    workers = workers or os.cpu_count()
+    batches = [len(b) for b in np.array_split(np.arange(n_boot), workers) if len(b)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+
+    with ProcessPoolExecutor(max_workers=len(batches)) as pool:
+        parts = list(pool.map(_bootstrap_batch, [values] * len(batches), [method] * len(batches), batches, seeds))
+    replicates = np.concatenate(parts)
+
+    upper = np.triu_indices(len(columns), k=1)
+    with warnings.catch_warnings():
+        # Pairs with an all-missing column have all-NaN replicates
+        warnings.simplefilter('ignore', RuntimeWarning)
+        low_tri, high_tri = np.nanpercentile(replicates, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
+    low, high = np.eye(len(columns)), np.eye(len(columns))
+    for matrix, tri in ((low, low_tri), (high, high_tri)):
+        matrix[upper] = tri
+        matrix.T[upper] = tri
+    return (pd.DataFrame(low, index=columns, columns=columns),
+            pd.DataFrame(high, index=columns, columns=columns))
+
+
+def _bootstrap_batch(values, method, size, seed):
+    # Only the upper triangle is kept, in float32, to bound memory for wide tables
+    rng = np.random.default_rng(seed)
+    upper = np.triu_indices(values.shape[1], k=1)
+    out = np.empty((size, len(upper[0])), dtype='float32')
+    for i in range(size):
+        sample = values[rng.integers(0, len(values), len(values))]
+        out[i] = pairwise_correlation(sample, method=method)[0][0][upper]
+    return out
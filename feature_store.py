@@ -0,0 +1,158 @@
+"""Cached, incremental build of the FIPS-keyed county feature table.
+
+The correlation and inspection scripts all start from the same table: outage
+rollups, data center rollups, ERS demographics and temperature merged on
+``fips_code``. This module builds that table once and caches it on disk. Every
+source is turned into its own column block, keyed by the content hash of its input
+file and the code that loads it, so when one input changes (a new temperature
+month, say) only that block is rebuilt before the blocks are joined again. The joined
+table is keyed by its blocks and by the join code, and editing a loader, a rollup or
+the join rebuilds what it affects. Bump FEATURE_VERSION for changes the hashed files
+do not cover. Loading an up-to-date table is a single Parquet read.
+
+    from feature_store import load_features
+    merged_df = load_features()
+"""
+import hashlib
+import inspect
+import json
+import os
+
+import pandas as pd
+
+from DS.data_center_table import load_data_center_rollup
+from fips_join import align_on_fips
+from Outage.event_table import load_outage_rollup
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(ROOT, '.feature_store')
+FEATURE_VERSION = 1
+
+# Code behind every block besides its loader's module, and behind the joined table
+BLOCK_CODE = ['rollups.py']
+JOIN_CODE = ['fips_join.py', 'feature_store.py']
+
+# Rollup columns that are 0 (not missing) for counties without outages / data centers
+OUTAGE_FLAT_COLUMNS = ['avg_durations_hrs', 'sum_duration_hrs', 'sums_sum']
+DATA_CENTER_FLAT_COLUMNS = ['avg_power_usage', 'avg_carbon_emission']
+
+
+def _load_demographics(path):
+    demographics_df = pd.read_csv(path)
+    # Convert demographic fields to numeric where applicable (excluding the fips_code)
+    demographics_cols = demographics_df.columns.difference(['fips_code'])
+    demographics_df[demographics_cols] = demographics_df[demographics_cols].apply(pd.to_numeric, errors='coerce')
+    return demographics_df
+
+
+def _load_temperature(path):
+    temp_df = pd.read_csv(path)
+    # Rename the FIPS column so that it matches the key in the other datasets
+    temp_df = temp_df.rename(columns={'FIPS': 'fips_code'})
+    for column in ['Value', 'Anomaly (1901-2000 base period)', 'Rank', '1901-2000 Mean']:
+        temp_df[column] = pd.to_numeric(temp_df[column], errors='coerce')
+    return temp_df
+
+
+# Sources in merge order: name -> (input path relative to the repository, loader)
+SOURCES = {
+    'outage': ('Outage/Outage_Events.parquet', load_outage_rollup),
+    'data_centers': ('DS/Data_Centers.parquet', load_data_center_rollup),
+    'demographics': ('Population/DemographicsData.csv', _load_demographics),
+    'temperature': ('Temperature/Temperature Data with FIPS.csv', _load_temperature),
+}
+
+
+def file_digest(path, block_size=1 << 20):
+    """SHA-256 of a file's content, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_digest(paths):
+    """SHA-256 of FEATURE_VERSION and the source files that produce a cached result."""
+    digest = hashlib.sha256(str(FEATURE_VERSION).encode())
+    for path in sorted(set(paths)):
+        digest.update(file_digest(os.path.join(ROOT, path)).encode())
+    return digest.hexdigest()
+
+
+def build_features(cache_dir=CACHE_DIR, sources=None, force=False):
+    """Bring the cached feature table up to date and return it.
+
+    Only sources whose input content or loading code changed are reloaded. File
+    size and mtime are checked first, so unchanged inputs are not even re-hashed.
+    ``force`` rebuilds every block and the joined table from scratch.
+    """
+    sources = SOURCES if sources is None else sources
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest_path = os.path.join(cache_dir, 'manifest.json')
+    manifest = {'sources': {}, 'table': None}
+    if os.path.exists(manifest_path) and not force:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    for name, (relative_path, loader) in sources.items():
+        path = os.path.join(ROOT, relative_path)
+        stat = os.stat(path)
+        entry = manifest['sources'].get(name, {})
+        if entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+            digest = entry['sha256']
+        else:
+            digest = file_digest(path)
+        code = code_digest(BLOCK_CODE + [os.path.relpath(inspect.getsourcefile(loader), ROOT)])
+        block_key = hashlib.sha256((digest + code).encode()).hexdigest()
+        block = os.path.join(cache_dir, f'{name}-{block_key[:16]}.parquet')
+        if entry.get('sha256') != digest or entry.get('code') != code or not os.path.exists(block):
+            print(f'feature store: rebuilding {name} from {relative_path}')
+            old_block = entry.get('block')
+            loader(path).to_parquet(block, index=False)
+            if old_block and old_block != os.path.basename(block) and os.path.exists(os.path.join(cache_dir, old_block)):
+                os.remove(os.path.join(cache_dir, old_block))
+        manifest['sources'][name] = {'path': relative_path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                                     'sha256': digest, 'code': code, 'block': os.path.basename(block)}
+
+    # The joined table is keyed by all blocks that went into it and by the join code
+    table_key = hashlib.sha256(
+        (''.join(manifest['sources'][name]['block'] for name in sources) + code_digest(JOIN_CODE)).encode()
+    ).hexdigest()[:16]
+    table_path = os.path.join(cache_dir, f'features-{table_key}.parquet')
+    if os.path.exists(table_path) and not force:
+        merged_df = pd.read_parquet(table_path, memory_map=True)
+    else:
+        blocks = {name: pd.read_parquet(os.path.join(cache_dir, manifest['sources'][name]['block']))
+                  for name in sources}
+        merged_df = _join_blocks(blocks)
+        merged_df.to_parquet(table_path, index=False)
+        if manifest.get('table') and manifest['table'] != os.path.basename(table_path) \
+                and os.path.exists(os.path.join(cache_dir, manifest['table'])):
+            os.remove(os.path.join(cache_dir, manifest['table']))
+    manifest['table'] = os.path.basename(table_path)
+
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return merged_df
+
+
+def load_features(cache_dir=CACHE_DIR):
+    """Load the merged county table, rebuilding stale blocks first if any input changed."""
+    return build_features(cache_dir)
+
+
+def _join_blocks(blocks):
+    merged_df, report = align_on_fips(blocks)
+    print('feature store: join report')
+    print(report.drop(columns='unmatched_keys').to_string())
+
+    # Counties without outages or data centers get 0 for the rollups, not NaN
+    no_outages = merged_df['counts_of_outage'].isna()
+    no_centers = merged_df['number_of_data_centers'].isna()
+    merged_df.loc[no_outages, OUTAGE_FLAT_COLUMNS] = 0
+    merged_df.loc[no_centers, DATA_CENTER_FLAT_COLUMNS] = 0
+
+    # Keep the rollup columns last, where the ML input expects them
+    flat_columns = OUTAGE_FLAT_COLUMNS + DATA_CENTER_FLAT_COLUMNS
+    return merged_df[[c for c in merged_df.columns if c not in flat_columns] + flat_columns]
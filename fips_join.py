@@ -0,0 +1,88 @@
+"""Single-pass multi-way join of county tables on a canonical FIPS key.
+
+The sources disagree on the key: Int64 in the data center table, zero-padded strings
+in the ERS files, plain int in temperature, floats after a CSV round trip with gaps.
+``normalize_fips`` turns all of them into one integer key, and ``align_on_fips``
+places every source onto one precomputed, sorted county index in a single pass: each
+column is gathered straight into its final position, instead of copying the growing
+frame once per ``pd.merge``. The report lists, per source, the keys that could not be
+parsed, did not match the index, or are missing from the source.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+
+KEY = 'fips_code'
+
+
+def normalize_fips(values):
+    """Canonical FIPS codes as nullable Int32; anything that is not a whole number becomes <NA>."""
+    values = pd.Series(values)
+    if values.dtype == object or pd.api.types.is_string_dtype(values):
+        values = values.astype(object).where(values.notna(), None).map(
+            lambda v: v.strip() if isinstance(v, str) else v)
+    numbers = pd.to_numeric(values, errors='coerce').astype('float64')
+    whole = numbers.notna() & (numbers == np.floor(numbers)) & (numbers >= 0)
+    return numbers.where(whole).astype('Int32')
+
+
+def build_county_index(sources, key=KEY):
+    """Sorted union of the normalized keys of all sources."""
+    keys = [normalize_fips(frame[key]).dropna().to_numpy(dtype='int32') for frame in sources.values()]
+    return np.unique(np.concatenate(keys)) if keys else np.array([], dtype='int32')
+
+
+def align_on_fips(sources, index=None, key=KEY, suffixes=('_x', '_y')):
+    """Join named frames on the FIPS key in one pass.
+
+    ``sources`` maps a name to a frame with a ``key`` column; columns keep the order of
+    the sources. ``index`` is the county index to align on (default: the union of all
+    keys, which is an outer join). Every source must have at most one row per county.
+
+    Returns ``(table, report)``; the report has one row per source with the counts of
+    invalid, matched, unmatched (not in the index) and not covered (index keys the
+    source lacks) keys, and the unmatched keys themselves.
+
+    A column name that an earlier source already provided is suffixed the way a chain
+    of ``pd.merge`` calls would do it; pass ``suffixes=None`` to raise instead.
+    """
+    index = build_county_index(sources, key) if index is None else np.asarray(index, dtype='int32')
+    county_index = pd.Index(index)
+    if not county_index.is_unique:
+        raise ValueError('County index has duplicated FIPS codes')
+
+    columns = {key: index}
+    report = []
+    for name, frame in sources.items():
+        keys = normalize_fips(frame[key])
+        valid = keys.notna().to_numpy()
+        codes = keys[valid].to_numpy(dtype='int32')
+        duplicated = pd.Index(codes).duplicated()
+        if duplicated.any():
+            raise ValueError(f'{name}: duplicated FIPS codes {sorted(set(codes[duplicated]))[:10]}')
+
+        # Row of the source for every county in the index, -1 where it has none
+        positions = county_index.get_indexer(codes)
+        matched = positions >= 0
+        rows = np.full(len(index), -1, dtype='int64')
+        rows[positions[matched]] = np.flatnonzero(valid)[matched]
+
+        for column in frame.columns:
+            if column == key:
+                continue
+            target = column
+            if column in columns:
+                if suffixes is None:
+                    raise ValueError(f'{name}: column {column!r} is already provided by another source')
+                columns = {(c + suffixes[0] if c == column else c): v for c, v in columns.items()}
+                target = column + suffixes[1]
+            values = frame[column]
+            values = values.array if pd.api.types.is_extension_array_dtype(values.dtype) else values.to_numpy()
+            columns[target] = take(values, rows, allow_fill=True)
+
+        report.append({'source': name, 'rows': len(frame), 'invalid': int((~valid).sum()),
+                       'matched': int(matched.sum()), 'unmatched': int((~matched).sum()),
+                       'not_covered': int((rows < 0).sum()), 'unmatched_keys': codes[~matched].tolist()})
+
+    table = pd.DataFrame(columns, copy=False)
+    return table, pd.DataFrame(report).set_index('source')
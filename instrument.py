@@ -0,0 +1,146 @@
+"""Per-stage timing, memory and throughput records for the pipeline scripts.
+
+    from instrument import stage
+
+    with stage('aggregate_outages'):
+        with stage('read') as step:
+            outages = pd.read_csv(path)
+            step.rows_out = len(outages)
+        with stage('filter', rows_in=len(outages)) as step:
+            outages = outages[outages['sum'] >= 10]
+            step.rows_out = len(outages)
+
+Each stage appends one JSON line to the run log when it exits. The line holds the
+nested name ("aggregate_outages/filter"), wall and CPU seconds, rows in and out,
+rows per second (rows_in, or rows_out when nothing was read), resident memory at
+the end, and the process's peak RSS so far. Peak RSS is the operating system's
+high-water mark, so a step's value includes everything that ran before it.
+
+Environment variables:
+
+    INSTRUMENT_LOG      run log path (default: .run_log.jsonl in the repository)
+    INSTRUMENT_PROFILE  'cprofile' or 'pyinstrument' profiles each outermost stage into
+                        INSTRUMENT_PROFILE_DIR (default: .profiles in the repository)
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+LOG_PATH = os.environ.get('INSTRUMENT_LOG', os.path.join(ROOT, '.run_log.jsonl'))
+PROFILE_DIR = os.environ.get('INSTRUMENT_PROFILE_DIR', os.path.join(ROOT, '.profiles'))
+RUN_ID = f'{time.strftime("%Y%m%dT%H%M%S")}-{os.getpid()}'
+
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+def _memory_mb():
+    """(current RSS, peak RSS) in MB; None when neither psutil nor resource can tell."""
+    rss = peak = None
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        rss, peak = info.rss, getattr(info, 'peak_wset', None)  # Windows keeps the high-water mark here
+    if peak is None:
+        try:
+            import resource
+        except ImportError:
+            resource = None
+        if resource is not None:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            peak = peak if sys.platform == 'darwin' else peak * 1024  # bytes on macOS, KB on Linux
+    if rss is not None and peak is not None:
+        peak = max(peak, rss)  # ru_maxrss is sampled more coarsely than the current RSS
+    return tuple(None if value is None else value / 2 ** 20 for value in (rss, peak))
+
+
+class Stage:
+    """A running stage; set ``rows_in`` / ``rows_out`` (or add ``extra`` fields) before it exits."""
+
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.extra = {}
+
+    def record(self, wall, cpu):
+        rss, peak = _memory_mb()
+        rows = self.rows_in if self.rows_in is not None else self.rows_out
+        return {
+            'run_id': RUN_ID, 'script': os.path.basename(sys.argv[0]), 'stage': self.name,
+            'wall_s': round(wall, 6), 'cpu_s': round(cpu, 6),
+            'rows_in': self.rows_in, 'rows_out': self.rows_out,
+            'rows_per_s': round(rows / wall, 1) if rows is not None and wall > 0 else None,
+            'rss_mb': None if rss is None else round(rss, 1),
+            'peak_rss_mb': None if peak is None else round(peak, 1),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'), **self.extra,
+        }
+
+
+def _write(record, path):
+    with _write_lock, open(path, 'a') as f:
+        f.write(json.dumps(record, default=str) + '\n')
+
+
+@contextmanager
+def _profiled(name):
+    kind = os.environ.get('INSTRUMENT_PROFILE', '').lower()
+    if kind not in ('cprofile', 'pyinstrument'):
+        yield
+        return
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, f'{RUN_ID}-{name.replace("/", "_")}')
+    if kind == 'pyinstrument':
+        from pyinstrument import Profiler
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(base + '.html', 'w') as f:
+                f.write(profiler.output_html())
+    else:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(base + '.prof')
+
+
+@contextmanager
+def stage(name, rows_in=None, log_path=None):
+    """Time a stage or sub-step; nested stages are named parent/child. The record is logged on exit."""
+    stack = _local.__dict__.setdefault('stack', [])
+    current = Stage(f'{stack[-1].name}/{name}' if stack else name, rows_in)
+    stack.append(current)
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    try:
+        with _profiled(current.name) if len(stack) == 1 else nullcontext():
+            yield current
+    except BaseException as error:
+        current.extra['error'] = type(error).__name__
+        raise
+    finally:
+        stack.pop()
+        _write(current.record(time.perf_counter() - start_wall, time.process_time() - start_cpu),
+               log_path or LOG_PATH)
+
+
+def read_log(path=LOG_PATH, run_id=None):
+    """The run log as a DataFrame, optionally for one run ('last' for the most recent)."""
+    import pandas as pd
+    log = pd.read_json(path, lines=True)
+    if run_id == 'last':
+        run_id = log['run_id'].iloc[-1]
+    return log if run_id is None else log[log['run_id'] == run_id].reset_index(drop=True)
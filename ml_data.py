@@ -0,0 +1,94 @@
+"""Compact loader for the merged county table used by the ML scripts.
+
+"Merged for ML.csv" has over a hundred float64 columns, and many are mostly-empty
+historical demographics. Loading it with pandas and then running a ColumnTransformer
+keeps several float64 copies of everything. This loader reads the CSV twice, in
+chunks, so it scales to the tract-level table:
+
+1. Schema pass: per column, count non-null values and track the dominant value's
+   share. Columns that are not numeric, all null or near-constant are dropped.
+2. Load pass: read only the kept columns as float32, straight into one preallocated
+   C-contiguous matrix that sklearn can use without another copy.
+
+The dominant share is merged from each chunk's 32 most frequent values. It can only
+be underestimated, so a column is never dropped by mistake.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Merged for ML.csv')
+TARGET = 'sum_duration_hrs'
+ID_COLUMNS = ['fips_code']
+CHUNKSIZE = 20_000
+NEAR_CONSTANT = 0.99
+TOP_VALUES = 32
+
+
+def infer_schema(path=DATA_PATH, target=TARGET, id_columns=ID_COLUMNS, chunksize=CHUNKSIZE,
+                 near_constant=NEAR_CONSTANT):
+    """One row per CSV column: non_null, dominant_share, keep and the reason a column is dropped.
+
+    ``attrs['rows']`` holds the number of rows with a target value and every id.
+    """
+    non_null, numeric, top_counts = {}, {}, {}
+    rows = 0
+    for chunk in pd.read_csv(path, chunksize=chunksize, low_memory=False):
+        rows += int(_usable_rows(chunk, target, id_columns).sum())
+        for column in chunk.columns:
+            values = chunk[column]
+            non_null[column] = non_null.get(column, 0) + int(values.notna().sum())
+            numeric[column] = numeric.get(column, True) and pd.api.types.is_numeric_dtype(values)
+            counts = top_counts.setdefault(column, {})
+            for value, count in values.value_counts().head(TOP_VALUES).items():
+                counts[value] = counts.get(value, 0) + int(count)
+
+    schema = pd.DataFrame({'non_null': pd.Series(non_null), 'numeric': pd.Series(numeric)})
+    schema['dominant_share'] = [max(top_counts[c].values(), default=0) / n if n else np.nan
+                                for c, n in schema['non_null'].items()]
+    schema['reason'] = ''
+    schema.loc[schema['dominant_share'] >= near_constant, 'reason'] = 'near_constant'
+    schema.loc[schema['non_null'] == 0, 'reason'] = 'all_null'
+    schema.loc[~schema['numeric'], 'reason'] = 'not_numeric'
+    schema.loc[schema.index.isin([target] + list(id_columns)), 'reason'] = 'not_feature'
+    schema['keep'] = schema['reason'] == ''
+    schema.attrs['rows'] = rows
+    return schema
+
+
+def load_ml_matrix(path=DATA_PATH, target=TARGET, id_columns=ID_COLUMNS, chunksize=CHUNKSIZE,
+                   near_constant=NEAR_CONSTANT, schema=None):
+    """Load the kept features as one C-contiguous float32 matrix.
+
+    Returns ``(X, y, ids, features, schema)``. ``ids`` maps each id column that is
+    present to an int64 array, ``features`` lists the column names of ``X``, and rows
+    without a target or with a missing id (the merged table is an outer join) are
+    skipped.
+    """
+    if schema is None:
+        schema = infer_schema(path, target, id_columns, chunksize, near_constant)
+    features = list(schema.index[schema['keep']])
+    ids = [c for c in id_columns if c in schema.index]
+    n_rows = schema.attrs['rows']
+
+    X = np.empty((n_rows, len(features)), dtype=np.float32)
+    y = np.empty(n_rows, dtype=np.float64)
+    id_values = {c: np.empty(n_rows, dtype=np.int64) for c in ids}
+    dtypes = dict.fromkeys(features, np.float32)
+    start = 0
+    for chunk in pd.read_csv(path, usecols=features + ids + [target], dtype=dtypes, chunksize=chunksize):
+        chunk = chunk[_usable_rows(chunk, target, ids)]
+        stop = start + len(chunk)
+        X[start:stop] = chunk[features].to_numpy(dtype=np.float32)
+        y[start:stop] = chunk[target].to_numpy(dtype=np.float64)
+        for column in ids:
+            id_values[column][start:stop] = chunk[column].to_numpy(dtype=np.int64)
+        start = stop
+    return X, y, id_values, features, schema
+
+
+def _usable_rows(chunk, target, id_columns):
+    # Rows the model can use: a target value, and every id column that is present
+    ids = [c for c in id_columns if c in chunk.columns]
+    return (chunk[target].notna() & chunk[ids].notna().all(axis=1)).to_numpy()
@@ -0,0 +1,204 @@
+"""Cross-validated model search for county outage duration.
+
+Run from the repository root:
+
+    python ml_train.py
+    python ml_train.py "Merged for ML.csv" --folds 5 --jobs 8 --output cv_results.csv
+
+Folds are grouped by state (fips_code // 1000), so a model is always scored on
+states it has not seen: neighbouring counties share weather and utilities, and a
+random split leaks that into the test score. For each outer fold the imputer and
+scaler are fitted and applied once, in the parent process, and every model and
+hyperparameter setting of that fold gets the transformed arrays. The (fold, model)
+tasks run in parallel with joblib.
+
+LassoCV and ElasticNetCV solve their whole regularization path with warm starts
+(each alpha starts from the previous solution) and choose alpha with an inner
+state-grouped CV. HistGradientBoostingRegressor is the non-linear baseline; it takes
+the raw features because it handles missing values itself.
+
+The final Lasso refit on all counties reports one coefficient per feature, both for
+standardized features and in original units.
+
+scikit-learn and joblib are imported inside the functions that use them, so
+``--help`` and imports of this module stay fast.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from instrument import stage
+from ml_data import DATA_PATH, load_ml_matrix
+
+N_FOLDS = 5
+
+
+def _lasso(cv):
+    from sklearn.linear_model import LassoCV
+    return LassoCV(cv=cv, max_iter=20000, random_state=1)
+
+
+def _elastic_net(cv):
+    from sklearn.linear_model import ElasticNetCV
+    return ElasticNetCV(l1_ratio=[0.1, 0.5, 0.9], cv=cv, max_iter=20000, random_state=1)
+
+
+def _hist_gbm(cv):
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    return HistGradientBoostingRegressor(random_state=1)
+
+
+# name -> (estimator factory, parameter grid); linear models see imputed, scaled features
+MODELS = {
+    'lasso': (_lasso, [{}]),
+    'elastic_net': (_elastic_net, [{}]),
+    'hist_gbm': (_hist_gbm, [{'learning_rate': lr, 'max_leaf_nodes': leaves}
+                             for lr in (0.05, 0.1) for leaves in (15, 31)]),
+}
+RAW_FEATURE_MODELS = {'hist_gbm'}
+
+
+def load_training_table(path=DATA_PATH):
+    """Float32 features, target, state groups (None without fips_code) and feature names."""
+    X, y, ids, features, schema = load_ml_matrix(path)
+    dropped = schema[~schema['keep'] & (schema['reason'] != 'not_feature')]
+    if len(dropped):
+        print(f'Dropped {len(dropped)} columns:', dropped['reason'].value_counts().to_dict())
+    groups = ids['fips_code'] // 1000 if 'fips_code' in ids else None
+    return X, y, groups, features
+
+
+def make_splits(y, groups, n_folds=N_FOLDS):
+    """State-grouped folds, or shuffled KFold when the table has no fips_code."""
+    from sklearn.model_selection import GroupKFold, KFold
+    if groups is None:
+        print('No fips_code column; falling back to ungrouped KFold')
+        return list(KFold(n_folds, shuffle=True, random_state=42).split(y))
+    n_folds = min(n_folds, len(np.unique(groups)))
+    return list(GroupKFold(n_folds).split(y, y, groups))
+
+
+def make_preprocessor():
+    from sklearn.impute import SimpleImputer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+    return Pipeline([
+        ('imputer', SimpleImputer(strategy='constant', fill_value=0)),
+        ('scaler', StandardScaler(copy=False)),  # scales the imputer's output in place
+    ])
+
+
+def _inner_cv(groups, train, n_folds):
+    from sklearn.model_selection import GroupKFold
+    # Inner splits for the *CV estimators, grouped by state like the outer ones
+    if groups is None:
+        return n_folds
+    inner_groups = groups[train]
+    n_folds = min(n_folds, len(np.unique(inner_groups)))
+    return list(GroupKFold(n_folds).split(train, train, inner_groups))
+
+
+def _prepare_fold(X, train, test):
+    # Imputer and scaler fitted on the training rows only, then applied to both sides
+    preprocessor = make_preprocessor()
+    X_train = preprocessor.fit_transform(X[train])
+    return X_train, preprocessor.transform(X[test])
+
+
+def _run_task(X_train, X_test, y, groups, fold, train, test, name, params, inner_folds):
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+    factory, _ = MODELS[name]
+    model = factory(_inner_cv(groups, train, inner_folds)).set_params(**params)
+
+    start = time.perf_counter()
+    model.fit(X_train, y[train])
+    fit_seconds = time.perf_counter() - start
+    pred = model.predict(X_test)
+    row = {'model': name, 'params': repr(params), 'fold': fold,
+           'mae': mean_absolute_error(y[test], pred),
+           'rmse': float(np.sqrt(mean_squared_error(y[test], pred))),
+           'r2': r2_score(y[test], pred), 'fit_seconds': fit_seconds}
+    if hasattr(model, 'alpha_'):
+        row['alpha'] = model.alpha_
+    if hasattr(model, 'l1_ratio_'):
+        row['l1_ratio'] = model.l1_ratio_
+    return row
+
+
+def cross_validate_models(X, y, groups, models=tuple(MODELS), n_folds=N_FOLDS, inner_folds=3, n_jobs=-1):
+    """Score every model and parameter setting on every outer fold; one row per (model, params, fold)."""
+    from joblib import Parallel, delayed
+    X = np.ascontiguousarray(X)
+    splits = make_splits(y, groups, n_folds)
+    # One preprocessing per fold, shared by every scaled model and setting of that fold
+    scaled = [_prepare_fold(X, train, test) if set(models) - RAW_FEATURE_MODELS else None
+              for train, test in splits]
+    tasks = [(fold, train, test, name, params)
+             for fold, (train, test) in enumerate(splits)
+             for name in models for params in MODELS[name][1]]
+    rows = Parallel(n_jobs=n_jobs)(
+        delayed(_run_task)(*((X[train], X[test]) if name in RAW_FEATURE_MODELS else scaled[fold]),
+                           y, groups, fold, train, test, name, params, inner_folds)
+        for fold, train, test, name, params in tasks)
+    return pd.DataFrame(rows)
+
+
+def summarize(results):
+    """Mean and spread of the fold scores per model and parameter setting, best RMSE first."""
+    summary = results.groupby(['model', 'params'], sort=False).agg(
+        mae=('mae', 'mean'), rmse=('rmse', 'mean'), rmse_std=('rmse', 'std'),
+        r2=('r2', 'mean'), fit_seconds=('fit_seconds', 'sum'))
+    return summary.sort_values('rmse').reset_index()
+
+
+def lasso_coefficients(X, y, groups, features, n_folds=N_FOLDS):
+    """Refit LassoCV on all rows and return one coefficient per feature, largest |coef| first."""
+    preprocessor = make_preprocessor()
+    X = preprocessor.fit_transform(X)
+    cv = _inner_cv(groups, np.arange(len(y)), n_folds)
+    model = _lasso(cv).fit(X, y)
+    scale = preprocessor.named_steps['scaler'].scale_
+    coefficients = pd.DataFrame({
+        'feature': features,
+        'coefficient': model.coef_,  # per standardized feature
+        'coefficient_original_units': model.coef_ / scale,
+    })
+    coefficients['abs_coef'] = coefficients['coefficient'].abs()
+    print(f'Lasso alpha: {model.alpha_:.4g}, {int((model.coef_ != 0).sum())} of {len(model.coef_)} features kept')
+    return coefficients.sort_values('abs_coef', ascending=False, ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Cross-validated model search for outage duration.')
+    parser.add_argument('input', nargs='?', default=DATA_PATH, help='merged county table')
+    parser.add_argument('--folds', type=int, default=N_FOLDS, help='outer CV folds (grouped by state)')
+    parser.add_argument('--inner-folds', type=int, default=3, help='inner folds for alpha selection')
+    parser.add_argument('--models', nargs='+', choices=list(MODELS), default=list(MODELS))
+    parser.add_argument('--jobs', type=int, default=-1, help='parallel joblib workers')
+    parser.add_argument('--output', default='cv_results.csv', help='per-fold scores')
+    parser.add_argument('--coefficients', default='lasso_coefficients.csv', help='per-feature Lasso coefficients')
+    args = parser.parse_args(argv)
+
+    with stage('ml_train') as run:
+        with stage('load') as step:
+            X, y, groups, features = load_training_table(args.input)
+            step.rows_out = run.rows_in = len(y)
+        print(f'{len(y)} counties, {len(features)} features')
+        with stage('cross_validate', rows_in=len(y)) as step:
+            results = cross_validate_models(X, y, groups, models=args.models,
+                                            n_folds=args.folds, inner_folds=args.inner_folds, n_jobs=args.jobs)
+            step.rows_out = len(results)
+        results.to_csv(args.output, index=False)
+        print(summarize(results).to_string(index=False))
+
+        with stage('lasso_refit', rows_in=len(y)) as step:
+            coefficients = lasso_coefficients(X, y, groups, features, args.inner_folds)
+            step.rows_out = run.rows_out = len(coefficients)
+        coefficients.to_csv(args.coefficients, index=False)
+        print(coefficients.head(20).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
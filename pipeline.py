@@ -0,0 +1,273 @@
+"""Run the project's scripts as a dependency graph.
+
+Run from anywhere:
+
+    python pipeline.py                  # bring every output up to date
+    python pipeline.py --dry-run        # show what would run and why
+    python pipeline.py correlation      # only this stage and what it depends on
+    python pipeline.py --force temperature
+
+Each stage is one of the existing scripts, run in its own directory with the
+declared inputs and outputs below. A stage depends on the stages that produce its
+inputs. It is skipped when its script, the local modules it imports, its inputs
+and its outputs still have the content hashes recorded after its last successful
+run. Hashes are memoized by size and mtime in .pipeline_state.json, so unchanged
+files are not read again. A rerun upstream stage that writes identical outputs does
+not trigger its dependents.
+
+Independent branches (DS, Population, Temperature, Outage) run concurrently, so
+a full refresh takes about as long as the critical path. Stages are subprocesses,
+so a thread pool is enough to keep several of them running at once. A stage whose
+raw inputs are not in the tree (the EAGLE-I feed, the county shapefile) keeps its
+existing outputs and is reported as unavailable.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from feature_store import file_digest
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = os.path.join(ROOT, '.pipeline_state.json')
+
+# name -> script, inputs and outputs (paths relative to the repository); optional
+# 'code' (local modules the script imports), 'args' and 'env'. The script runs with
+# its own directory as working directory.
+STAGES = {
+    'ds_fips': {
+        'script': 'DS/Data center to fip.py',
+        'code': ['DS/geocode.py'],
+        'inputs': ['DS/Merge_BA_Carbon.csv', 'DS/tl_2024_us_county.shp'],
+        'outputs': ['DS/Merge_BA_Carbon_with_FIPS.csv'],
+    },
+    'ds_group': {
+        'script': 'DS/Group data centers by fip codes.py',
+        'code': ['DS/data_center_table.py', 'DS/rollup_cube.py'],
+        'inputs': ['DS/Merge_BA_Carbon_with_FIPS.csv'],
+        'outputs': ['DS/Grouped_By_FIPS_List.csv', 'DS/Data_Centers.parquet', 'DS/Data_Center_Cube.parquet'],
+    },
+    'demographics': {
+        'script': 'Population/ers_ingest.py',
+        'code': ['fips_join.py'],
+        'inputs': ['Population/Education2023.csv', 'Population/Poverty2023.csv',
+                   'Population/Unemployment2023.csv', 'Population/PopulationEstimates.csv'],
+        'outputs': ['Population/DemographicsData.csv'],
+    },
+    'temperature': {
+        'script': 'Temperature/Assign FIPS to counties.py',
+        'code': ['Temperature/gazetteer.py'],
+        'inputs': ['Temperature/Temperature Data.csv', 'Temperature/county_adjacency2024.txt'],
+        'outputs': ['Temperature/Temperature Data with FIPS.csv'],
+    },
+    'outage': {
+        'script': 'Outage/aggregate outages.py',
+        'code': ['Outage/events.py', 'Outage/stream.py', 'Outage/event_table.py', 'Outage/panel.py'],
+        'inputs': ['Outage/eaglei_outages_2023.csv'],
+        'outputs': ['Outage/Aggregated_Outage_Events.csv', 'Outage/Outage_Events.parquet',
+                    'Outage/Outage_Panel/panel.json'],
+    },
+    'correlation': {
+        'script': 'Correlation analysis for a lot of new variables.py',
+        'code': ['correlation.py', 'feature_store.py', 'fips_join.py', 'rollups.py', 'report.py',
+                 'Temperature/adjacency.py', 'Outage/event_table.py', 'DS/data_center_table.py'],
+        'inputs': ['Outage/Outage_Events.parquet', 'DS/Data_Centers.parquet', 'Population/DemographicsData.csv',
+                   'Temperature/Temperature Data with FIPS.csv', 'Temperature/county_adjacency2024.txt'],
+        'outputs': ['Merged for ML.csv', 'Correlation_Matrix_Only_Counties_With_Data_Centers.csv',
+                    'Correlation_Matrix_All_Counties.csv', 'reports/correlations.parquet'],
+        'env': {'CORRELATION_REPORT_DIR': 'reports'},
+    },
+    'ml': {
+        'script': 'ml_train.py',
+        'code': ['ml_data.py'],
+        'inputs': ['Merged for ML.csv'],
+        'outputs': ['cv_results.csv', 'lasso_coefficients.csv'],
+    },
+}
+
+
+def dependencies(stages=STAGES):
+    """Map each stage to the stages that produce one of its inputs."""
+    producer = {output: name for name, stage in stages.items() for output in stage['outputs']}
+    return {name: sorted({producer[path] for path in stage['inputs'] if path in producer} - {name})
+            for name, stage in stages.items()}
+
+
+def topological_order(stages=STAGES):
+    """Stage names with every stage after its dependencies; raises ValueError on a cycle."""
+    deps = dependencies(stages)
+    order, done = [], set()
+    while len(order) < len(stages):
+        ready = [name for name in stages if name not in done and all(d in done for d in deps[name])]
+        if not ready:
+            raise ValueError(f'dependency cycle among {sorted(set(stages) - done)}')
+        order.extend(ready)
+        done.update(ready)
+    return order
+
+
+def select(targets, stages=STAGES):
+    """The target stages and everything upstream of them."""
+    deps = dependencies(stages)
+    selected, pending = set(), list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in stages:
+            raise KeyError(f'unknown stage {name!r}; stages: {", ".join(stages)}')
+        if name not in selected:
+            selected.add(name)
+            pending.extend(deps[name])
+    return selected
+
+
+class Hasher:
+    """Content hashes memoized by (size, mtime_ns) across runs."""
+
+    def __init__(self, memo=None):
+        self.memo = {} if memo is None else memo
+
+    def __call__(self, relpath):
+        path = os.path.join(ROOT, relpath)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        cached = self.memo.get(relpath)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = file_digest(path)
+        self.memo[relpath] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+
+def load_state(path=STATE_PATH):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {'stages': {}, 'files': {}}
+
+
+def save_state(state, path=STATE_PATH):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def fingerprint(stage, hasher):
+    """Content hashes of a stage's code, inputs and outputs (None for a missing file)."""
+    paths = [stage['script']] + stage.get('code', []) + stage['inputs'] + stage['outputs']
+    return {path: hasher(path) for path in paths}
+
+
+def stage_status(name, stage, state, hasher, produced):
+    """('skip' | 'run' | 'unavailable' | 'missing', reason) for a stage whose dependencies are done."""
+    missing = [p for p in stage['inputs'] if p not in produced and hasher(p) is None]
+    if missing:
+        if all(hasher(p) is not None for p in stage['outputs']):
+            return 'unavailable', f'missing {", ".join(missing)}; keeping existing outputs'
+        return 'missing', f'missing {", ".join(missing)}'
+    recorded = state['stages'].get(name)
+    if recorded is None:
+        return 'run', 'never run'
+    current = fingerprint(stage, hasher)
+    changed = [path for path, digest in current.items() if digest is None or digest != recorded.get(path)]
+    if changed:
+        return 'run', 'changed: ' + ', '.join(changed)
+    return 'skip', 'up to date'
+
+
+def _run_script(name, stage):
+    script = os.path.join(ROOT, stage['script'])
+    env = dict(os.environ, MPLBACKEND='Agg', **stage.get('env', {}))
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, script] + stage.get('args', []), cwd=os.path.dirname(script),
+                               env=env, capture_output=True, text=True)
+    return completed, time.perf_counter() - start
+
+
+def run_pipeline(targets=None, stages=STAGES, workers=4, force=(), dry_run=False, state_path=STATE_PATH,
+                 log_dir=None):
+    """Run the out-of-date stages, independent ones concurrently; returns {stage: (status, seconds)}."""
+    selected = select(targets or list(stages), stages)
+    deps = dependencies(stages)
+    order = [name for name in topological_order(stages) if name in selected]
+    state = load_state(state_path)
+    hasher = Hasher(state['files'])
+    log_dir = log_dir or os.path.join(ROOT, '.pipeline_logs')
+    results, ran = {}, set()
+
+    def ready(name):
+        return name not in results and all(d in results for d in deps[name] if d in selected)
+
+    def decide(name):
+        stage = stages[name]
+        if any(results[d][0] in ('failed', 'missing', 'blocked') for d in deps[name] if d in selected):
+            return 'blocked', 'an upstream stage did not finish'
+        # Outputs of stages that will run in this session count as present in a dry run
+        produced = {p for d in deps[name] if d in ran for p in stages[d]['outputs']}
+        if name in force:
+            return 'run', 'forced'
+        if dry_run and any(d in ran for d in deps[name]):
+            return 'run', 'upstream stage runs'
+        return stage_status(name, stage, state, hasher, produced)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running = {}
+        while len(results) < len(order):
+            for name in order:
+                if name in running.values() or not ready(name):
+                    continue
+                status, reason = decide(name)
+                print(f'[{name}] {status}: {reason}', flush=True)
+                if status == 'run' and dry_run:
+                    ran.add(name)
+                    results[name] = ('would run', 0.0)
+                    continue
+                if status != 'run':
+                    results[name] = (status, 0.0)
+                    continue
+                running[pool.submit(_run_script, name, stages[name])] = name
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                completed, seconds = future.result()
+                os.makedirs(log_dir, exist_ok=True)
+                with open(os.path.join(log_dir, f'{name}.log'), 'w') as f:
+                    f.write(completed.stdout + completed.stderr)
+                if completed.returncode == 0:
+                    ran.add(name)
+                    state['stages'][name] = fingerprint(stages[name], hasher)
+                    save_state(state, state_path)
+                    results[name] = ('done', seconds)
+                    print(f'[{name}] done in {seconds:.1f}s', flush=True)
+                else:
+                    results[name] = ('failed', seconds)
+                    print(f'[{name}] failed (exit {completed.returncode}); last output:\n'
+                          + '\n'.join((completed.stdout + completed.stderr).splitlines()[-10:]), flush=True)
+    if not dry_run:
+        total = sum(seconds for _, seconds in results.values())
+        print(f'wall {time.perf_counter() - start:.1f}s for {total:.1f}s of stage time')
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the project scripts as a dependency graph.')
+    parser.add_argument('targets', nargs='*', help=f'stages to bring up to date (default: all); {", ".join(STAGES)}')
+    parser.add_argument('--workers', type=int, default=4, help='stages run at the same time')
+    parser.add_argument('--force', nargs='+', default=[], metavar='STAGE', help='run these stages even if up to date')
+    parser.add_argument('--dry-run', action='store_true', help='print the plan without running anything')
+    args = parser.parse_args(argv)
+
+    results = run_pipeline(args.targets, workers=args.workers, force=set(args.force), dry_run=args.dry_run)
+    if any(status in ('failed', 'missing', 'blocked') for status, _ in results.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
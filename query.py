@@ -0,0 +1,156 @@
+"""Ad-hoc SQL over the pipeline outputs with DuckDB.
+
+Every output that exists is a view named in TABLES, so a query reads only the
+columns it names. Parquet files (the event, data center and cube tables) also skip
+row groups whose min/max statistics rule out a WHERE clause. CSV outputs have no
+statistics, so ``materialize`` copies them once into Parquet sorted by FIPS code,
+under .query_cache/. A view uses the copy as long as it is newer than the CSV, and
+then a FIPS-range filter reads only a few row groups. Write a state as a range
+(fips_code BETWEEN 48000 AND 48999), since filters on expressions are not pushed down.
+
+    python query.py "SELECT count(*) FROM outage_events WHERE start_time >= '2023-07-01'"
+    python query.py --explain "SELECT FIPS, Value FROM temperature WHERE FIPS BETWEEN 48000 AND 48999"
+    python query.py --materialize
+    python query.py --tables
+
+    from query import query
+    hot = query('''
+        WITH hours AS (SELECT fips_code, sum(duration_hrs) AS outage_hours FROM outage_events GROUP BY fips_code),
+             centers AS (SELECT fips_code, count(*) AS data_centers FROM data_centers
+                         WHERE fips_code BETWEEN 48000 AND 48999 GROUP BY fips_code)
+        SELECT * FROM centers JOIN hours USING (fips_code)
+        WHERE data_centers > 3 AND outage_hours > (SELECT quantile_cont(outage_hours, 0.9) FROM hours)
+    ''')
+"""
+import argparse
+import os
+
+import duckdb
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(ROOT, '.query_cache')
+ROW_GROUP_SIZE = 16_384
+
+# view name -> (path relative to the repository, FIPS key column or None)
+TABLES = {
+    'merged_ml': ('Merged for ML.csv', 'fips_code'),
+    'demographics': ('Population/DemographicsData.csv', 'fips_code'),
+    'temperature': ('Temperature/Temperature Data with FIPS.csv', 'FIPS'),
+    'outage_events': ('Outage/Outage_Events.parquet', 'fips_code'),
+    'outage_rollup': ('Outage/Outage_Rollup.csv', 'fips_code'),
+    'data_centers': ('DS/Data_Centers.parquet', 'fips_code'),
+    'data_center_cube': ('DS/Data_Center_Cube.parquet', None),
+    'correlations': ('reports/correlations.parquet', None),
+    'cv_results': ('cv_results.csv', None),
+    'lasso_coefficients': ('lasso_coefficients.csv', None),
+}
+
+
+def _quote(path):
+    return "'" + path.replace("'", "''") + "'"
+
+
+def _cache_path(name, cache_dir):
+    return os.path.join(cache_dir, f'{name}.parquet')
+
+
+def source_of(name, root=ROOT, cache_dir=CACHE_DIR):
+    """The file a view reads: the output itself, or its Parquet copy when that is up to date."""
+    path = os.path.join(root, TABLES[name][0])
+    cached = _cache_path(name, cache_dir)
+    if path.endswith('.csv') and os.path.exists(cached) and os.path.exists(path) \
+            and os.path.getmtime(cached) >= os.path.getmtime(path):
+        return cached
+    return path
+
+
+def _reader(path):
+    if path.endswith('.parquet'):
+        return f'read_parquet({_quote(path)})'
+    return f'read_csv({_quote(path)}, header=true)'
+
+
+def connect(root=ROOT, cache_dir=CACHE_DIR, database=':memory:'):
+    """A DuckDB connection with one view per existing output; returns ``(connection, missing names)``."""
+    connection = duckdb.connect(database)
+    missing = []
+    for name in TABLES:
+        path = source_of(name, root, cache_dir)
+        if not os.path.exists(path):
+            missing.append(name)
+            continue
+        connection.execute(f'CREATE VIEW "{name}" AS SELECT * FROM {_reader(path)}')
+    return connection, missing
+
+
+def query(sql, params=None, connection=None):
+    """Run SQL against the output views and return a DataFrame."""
+    connection = connection or connect()[0]
+    return connection.execute(sql, params).df()
+
+
+def explain(sql, connection=None):
+    """DuckDB's physical plan of a query; scans list the projected columns and pushed-down filters."""
+    connection = connection or connect()[0]
+    return '\n'.join(row[1] for row in connection.execute('EXPLAIN ' + sql).fetchall())
+
+
+def materialize(names=None, root=ROOT, cache_dir=CACHE_DIR, row_group_size=ROW_GROUP_SIZE):
+    """Copy CSV outputs into Parquet sorted by their FIPS key; returns {name: rows} of the copies written."""
+    os.makedirs(cache_dir, exist_ok=True)
+    connection = duckdb.connect()
+    written = {}
+    for name in names or TABLES:
+        path, key = TABLES[name]
+        path = os.path.join(root, path)
+        if not path.endswith('.csv') or not os.path.exists(path):
+            continue
+        columns = [row[0] for row in connection.execute(f'DESCRIBE SELECT * FROM {_reader(path)}').fetchall()]
+        order = f' ORDER BY "{key}"' if key in columns else ''
+        target = _cache_path(name, cache_dir)
+        connection.execute(f'COPY (SELECT * FROM {_reader(path)}{order}) TO {_quote(target + ".tmp")} '
+                           f'(FORMAT parquet, ROW_GROUP_SIZE {row_group_size})')
+        os.replace(target + '.tmp', target)
+        written[name] = connection.execute(f'SELECT count(*) FROM {_reader(target)}').fetchone()[0]
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run SQL over the pipeline outputs.')
+    parser.add_argument('sql', nargs='?', help='query; the views are listed by --tables')
+    parser.add_argument('--explain', action='store_true', help='print the query plan instead of the result')
+    parser.add_argument('--output', help='write the result to a .csv or .parquet file')
+    parser.add_argument('--max-rows', type=int, default=60, help='rows to print (default: %(default)s)')
+    parser.add_argument('--tables', action='store_true', help='list the views and the files behind them')
+    parser.add_argument('--materialize', nargs='*', metavar='TABLE', default=None,
+                        help='copy CSV outputs (default: all) into FIPS-sorted Parquet first')
+    args = parser.parse_args(argv)
+
+    if args.materialize is not None:
+        for name, rows in materialize(args.materialize).items():
+            print(f'{name}: {rows} rows -> {os.path.relpath(_cache_path(name, CACHE_DIR), ROOT)}')
+    connection, missing = connect()
+    if args.tables:
+        for name in TABLES:
+            status = 'missing' if name in missing else os.path.relpath(source_of(name), ROOT)
+            print(f'{name:20} {status}')
+    if not args.sql:
+        if args.materialize is None and not args.tables:
+            parser.error('give a query, --tables or --materialize')
+        return
+    if args.explain:
+        print(explain(args.sql, connection))
+        return
+    if args.output:
+        fmt = 'parquet' if args.output.endswith('.parquet') else 'csv, HEADER'
+        connection.execute(f'COPY ({args.sql}) TO {_quote(args.output)} (FORMAT {fmt})')
+        print(f'Wrote {args.output}')
+        return
+    result = query(args.sql, connection=connection)
+    print(result.to_string(index=False, max_rows=args.max_rows))
+    if len(result) > args.max_rows:
+        print(f'({len(result)} rows)')
+
+
+if __name__ == '__main__':
+    main()
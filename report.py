@@ -0,0 +1,112 @@
+"""Headless correlation reports for batch jobs.
+
+Annotated seaborn heatmaps of ~200 columns take minutes, need a display for
+``plt.show()`` and cannot be read anyway. This module draws on a bare Agg
+``Figure`` (no pyplot, no display), orders the columns by hierarchical clustering so
+related variables sit together, annotates cells only for small matrices, lists the
+top-K strongest pairs, and writes the full matrices to Parquet for later queries.
+
+    CORRELATION_REPORT_DIR=reports python "Correlation analysis for a lot of new variables.py"
+"""
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from scipy.cluster.hierarchy import leaves_list, linkage
+from scipy.spatial.distance import squareform
+
+ANNOTATE_MAX = 25
+TOP_K = 50
+
+
+def cluster_order(corr):
+    """Column order from average-linkage clustering on 1 - |r| (missing r counts as 0)."""
+    if len(corr) < 3:
+        return list(corr.columns)
+    distance = 1.0 - np.abs(np.nan_to_num(corr.to_numpy(dtype='float64'), nan=0.0))
+    distance = (distance + distance.T) / 2
+    np.fill_diagonal(distance, 0.0)
+    order = leaves_list(linkage(squareform(np.clip(distance, 0, None), checks=False), method='average'))
+    return list(corr.columns[order])
+
+
+def top_pairs(result, k=TOP_K):
+    """The k column pairs with the largest |r|; ``result`` is a dict of r/n/p/q matrices or just r."""
+    result = {'r': result} if isinstance(result, pd.DataFrame) else result
+    corr = result['r']
+    upper = np.triu_indices(len(corr), k=1)
+    r = corr.to_numpy()[upper]
+    keep = np.flatnonzero(~np.isnan(r))
+    keep = keep[np.argsort(-np.abs(r[keep]), kind='stable')[:k]]
+    pairs = pd.DataFrame({'column_a': corr.index[upper[0][keep]], 'column_b': corr.columns[upper[1][keep]]})
+    for kind in ('r', 'n', 'p', 'q'):
+        if kind in result:
+            pairs[kind] = result[kind].to_numpy()[upper][keep]
+    return pairs
+
+
+def render_heatmap(corr, title, path, annotate_max=ANNOTATE_MAX, cluster=True, label_colors=None):
+    """Draw a correlation heatmap to ``path`` on the Agg backend; cells are annotated only for small matrices."""
+    if cluster:
+        order = cluster_order(corr)
+        corr = corr.loc[order, order]
+    size = len(corr)
+    font = max(3.0, min(10.0, 600.0 / max(size, 1)))
+    # Fixed margins sized for the longest label: tight_layout would draw every tick label an extra time
+    label_inches = max((len(str(c)) for c in corr.columns), default=1) * font / 72 * 0.6 + 0.3
+    inches = min(max(5.0, 0.12 * size + 3), 40.0)
+    fig = Figure(figsize=(inches + label_inches + 1.5, inches + label_inches + 0.5))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    image = ax.imshow(corr.to_numpy(dtype='float64'), cmap='coolwarm', vmin=-1, vmax=1, interpolation='nearest')
+    fig.colorbar(image, ax=ax, shrink=0.8)
+    ax.set_title(title)
+
+    ax.set_xticks(range(size), corr.columns, rotation=90, fontsize=font)
+    ax.set_yticks(range(size), corr.index, fontsize=font)
+    if label_colors:
+        for label in ax.get_xticklabels() + ax.get_yticklabels():
+            label.set_color(label_colors.get(label.get_text(), 'black'))
+
+    if size <= annotate_max:
+        values = corr.to_numpy()
+        for i in range(size):
+            for j in range(size):
+                if not np.isnan(values[i, j]):
+                    ax.text(j, i, f'{values[i, j]:.2f}', ha='center', va='center', fontsize=font)
+    fig.subplots_adjust(left=label_inches / fig.get_figwidth(), bottom=label_inches / fig.get_figheight(),
+                        right=0.98, top=1 - 0.5 / fig.get_figheight())
+    fig.savefig(path, dpi=100)
+
+
+def write_report(results, out_dir, titles=None, top_k=TOP_K, annotate_max=ANNOTATE_MAX):
+    """Write heatmaps, top-K pair tables and the full matrices for ``correlation_table`` results.
+
+    ``results`` maps a group name to a dict of square r/n/p/q DataFrames (a bare r
+    DataFrame also works). Writes ``<group>_heatmap.png`` and ``<group>_top_pairs.csv``
+    per group and one long ``correlations.parquet`` with every pair of every group.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    titles = titles or {}
+    long_tables = []
+    for group, result in results.items():
+        result = {'r': result} if isinstance(result, pd.DataFrame) else result
+        slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', group)
+        render_heatmap(result['r'], titles.get(group, group), os.path.join(out_dir, f'{slug}_heatmap.png'),
+                       annotate_max=annotate_max)
+        top_pairs(result, top_k).to_csv(os.path.join(out_dir, f'{slug}_top_pairs.csv'), index=False)
+
+        columns = result['r'].columns
+        long_table = pd.DataFrame({'group': group,
+                                   'column_a': np.repeat(columns, len(columns)),
+                                   'column_b': np.tile(columns, len(columns))})
+        for kind, matrix in result.items():
+            long_table[kind] = matrix.to_numpy().ravel()
+        long_tables.append(long_table)
+
+    pd.concat(long_tables, ignore_index=True).astype(
+        {'group': 'category', 'column_a': 'category', 'column_b': 'category'}).to_parquet(
+        os.path.join(out_dir, 'correlations.parquet'), index=False)
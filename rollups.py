@@ -0,0 +1,103 @@
+"""Grouped NumPy reductions over exploded list columns.
+
+The per-county lists (event durations, event sizes, power and carbon per facility)
+are stored one value per row. ``grouped_rollup`` computes any set of statistics for
+every group in one sort per value column: counts and sums come from ``bincount`` and
+order statistics (min, max, median, p95, ...) are read straight out of the sorted
+segments, so adding a statistic does not add another Python-level pass.
+
+    grouped_rollup(events, 'fips_code', ['duration_hrs'], ['count', 'mean', 'p95'])
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_STATS = ('count', 'sum', 'mean', 'max')
+STATS = ('size', 'count', 'sum', 'mean', 'min', 'max', 'std')
+
+
+def grouped_rollup(frame, by, columns, stats=DEFAULT_STATS, skipna=True):
+    """Statistics of ``columns`` per group of ``by``, as a flat float64 frame.
+
+    Output columns are named ``<column>_<stat>``; the index holds the group keys in
+    sorted order. ``size`` counts rows, ``count`` counts non-missing values.
+    Besides the names in STATS, ``pNN`` (e.g. ``p50``, ``p95``, ``p99.9``) gives a
+    percentile with linear interpolation, like ``np.percentile``.
+    With ``skipna=False`` a group with any missing value gets NaN for every
+    statistic except ``size`` and ``count``.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    for stat in stats:
+        if stat not in STATS and not re.fullmatch(r'p\d+(\.\d+)?', stat):
+            raise ValueError(f'Unknown statistic {stat!r}')
+        if stat not in STATS and float(stat[1:]) > 100:
+            raise ValueError(f'Percentile {stat!r} is outside p0 to p100')
+
+    group_ids = frame.groupby(by, sort=True, observed=True).ngroup().to_numpy()
+    valid_rows = group_ids >= 0
+    group_ids = group_ids[valid_rows]
+    n_groups = group_ids.max() + 1 if len(group_ids) else 0
+    first_rows = np.unique(group_ids, return_index=True)[1]
+    index = frame.loc[valid_rows, by].iloc[first_rows]
+    index = pd.MultiIndex.from_frame(index) if len(by) > 1 else pd.Index(index[by[0]])
+
+    result = {}
+    for column in columns:
+        values = frame[column].to_numpy(dtype='float64', na_value=np.nan)[valid_rows]
+        result.update(_column_stats(column, group_ids, values, n_groups, stats, skipna))
+    return pd.DataFrame(result, index=index)
+
+
+def _column_stats(name, group_ids, values, n_groups, stats, skipna):
+    missing = np.isnan(values)
+    n_valid = np.bincount(group_ids[~missing], minlength=n_groups).astype('float64')
+    filled = np.where(missing, 0.0, values)
+    totals = np.bincount(group_ids, weights=filled, minlength=n_groups)
+
+    # One sort per column: by group, then by value, NaNs last within each group
+    order = np.lexsort((values, group_ids))
+    ordered = values[order]
+    starts = np.searchsorted(group_ids[order], np.arange(n_groups))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = totals / n_valid
+        out = {}
+        for stat in stats:
+            if stat == 'size':
+                out[stat] = np.bincount(group_ids, minlength=n_groups).astype('float64')
+            elif stat == 'count':
+                out[stat] = n_valid
+            elif stat == 'sum':
+                out[stat] = np.where(n_valid > 0, totals, 0.0)
+            elif stat == 'mean':
+                out[stat] = means
+            elif stat == 'std':
+                # Second pass over deviations from the group means; the sum of squares
+                # cancels catastrophically when the mean is large next to the spread
+                deviations = np.where(missing, 0.0, filled - means[group_ids])
+                squares = np.bincount(group_ids, weights=deviations * deviations, minlength=n_groups)
+                out[stat] = np.where(n_valid > 1, np.sqrt(squares / (n_valid - 1)), np.nan)
+            else:
+                q = 0.0 if stat == 'min' else 100.0 if stat == 'max' else float(stat[1:])
+                out[stat] = _segment_percentile(ordered, starts, n_valid, q)
+
+    if not skipna:
+        has_missing = np.bincount(group_ids[missing], minlength=n_groups) > 0
+        for stat in out:
+            if stat not in ('size', 'count'):
+                out[stat] = np.where(has_missing, np.nan, out[stat])
+    return {f'{name}_{stat}': out[stat] for stat in stats}
+
+
+def _segment_percentile(ordered, starts, n_valid, q):
+    # Linear interpolation between the two closest ranks of each sorted segment
+    empty = n_valid == 0
+    rank = np.where(empty, 0, n_valid - 1) * (q / 100.0)
+    low = np.floor(rank).astype('int64')
+    high = np.ceil(rank).astype('int64')
+    if len(ordered) == 0:
+        return np.full(len(starts), np.nan)
+    lower = ordered[np.minimum(starts + low, len(ordered) - 1)]
+    upper = ordered[np.minimum(starts + high, len(ordered) - 1)]
+    return np.where(empty, np.nan, lower + (upper - lower) * (rank - low))
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+from correlation import correlation_table
+
+
+def skewed_frame(seed=0, n=400):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=n)
+    return pd.DataFrame({'x': x, 'y': np.exp(x) + rng.normal(0, 0.5, n), 'z': rng.normal(size=n)})
+
+
+def test_spearman_of_a_subgroup_ranks_within_the_subgroup():
+    frame = skewed_frame()
+    subgroup = (frame['x'] > 0.5).to_numpy()
+    table = correlation_table(frame, groups={'all': None, 'subgroup': subgroup}, method='spearman')
+
+    np.testing.assert_allclose(table['all']['r'].to_numpy(), frame.corr(method='spearman').to_numpy())
+    np.testing.assert_allclose(table['subgroup']['r'].to_numpy(),
+                               frame[subgroup].corr(method='spearman').to_numpy())
+
+
+def test_pearson_of_a_subgroup_matches_pandas():
+    frame = skewed_frame(1)
+    subgroup = (frame['z'] < 0).to_numpy()
+    table = correlation_table(frame, groups={'subgroup': subgroup})
+    np.testing.assert_allclose(table['subgroup']['r'].to_numpy(), frame[subgroup].corr().to_numpy())
@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from Outage.events import aggregate_events, detect_events
+
+
+def reference_aggregate_outages(group):
+    """The original row-by-row loop of ``aggregate outages.py``, kept as the reference."""
+    start_times, end_times, durations, sums = [], [], [], []
+    current_start, current_end, current_sums = None, None, []
+
+    for _, row in group.iterrows():
+        start_time = row['run_start_time']
+        end_time = start_time + timedelta(minutes=15)
+        outage_sum = row['sum']
+
+        if current_start is None:
+            current_start, current_end = start_time, end_time
+            current_sums = [outage_sum]
+        elif start_time - current_end <= timedelta(hours=2):
+            current_end = max(current_end, end_time)
+            current_sums.append(outage_sum)
+        else:
+            start_times.append(current_start)
+            end_times.append(current_end)
+            durations.append((current_end - current_start).total_seconds() / 3600)
+            sums.append(sum(current_sums))
+            current_start, current_end = start_time, end_time
+            current_sums = [outage_sum]
+
+    if current_start is not None:
+        start_times.append(current_start)
+        end_times.append(current_end)
+        durations.append((current_end - current_start).total_seconds() / 3600)
+        sums.append(sum(current_sums))
+
+    return {'start_times': start_times, 'end_times': end_times, 'durations_hrs': durations, 'sums': sums}
+
+
+def reference(outages):
+    outages = outages[outages['sum'] >= 10]
+    outages = outages.sort_values(by=['fips_code', 'run_start_time']).reset_index(drop=True)
+    return {key: reference_aggregate_outages(group)
+            for key, group in outages.groupby(['fips_code', 'county', 'state'])}
+
+
+def synthetic_feed(seed=0):
+    rng = np.random.default_rng(seed)
+    t0 = pd.Timestamp('2023-01-01')
+    rows = []
+    # Hand-made edge cases: a gap of exactly 2 hours merges, 2 hours 15 minutes splits,
+    # the same timestamps in the next county must not join its events
+    for fips, county in ((1001, 'Autauga'), (1003, 'Baldwin')):
+        for minutes in (0, 15, 30, 165, 315, 330):
+            rows.append((fips, county, 'Alabama', t0 + pd.Timedelta(minutes=minutes), 20))
+    # Random runs on the 15-minute grid, with sizes around the 10-customer filter
+    for fips in range(2001, 2021):
+        slots = np.sort(rng.choice(3000, 300, replace=False))
+        for slot, size in zip(slots, rng.integers(0, 40, len(slots))):
+            rows.append((fips, f'County {fips}', 'Alaska', t0 + pd.Timedelta(minutes=15 * int(slot)), int(size)))
+    feed = pd.DataFrame(rows, columns=['fips_code', 'county', 'state', 'run_start_time', 'sum'])
+    return feed.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def test_events_match_the_row_by_row_loop():
+    feed = synthetic_feed()
+    expected = reference(feed)
+    aggregated = aggregate_events(feed[feed['sum'] >= 10])
+
+    assert len(aggregated) == len(expected)
+    for row in aggregated.itertuples(index=False):
+        loop = expected[(row.fips_code, row.county, row.state)]
+        assert list(row.start_times) == loop['start_times']
+        assert list(row.end_times) == loop['end_times']
+        np.testing.assert_allclose(row.durations_hrs, loop['durations_hrs'])
+        assert list(row.sums) == loop['sums']
+
+
+def test_two_hour_gap_merges_and_county_boundary_splits():
+    feed = synthetic_feed()
+    events = detect_events(feed[feed['fips_code'].isin([1001, 1003])])
+    # Per county: 0:00-0:45 and 2:45-3:00 merge across exactly 2 hours; 5:15-5:45 is 2h15m later
+    assert events.groupby('fips_code').size().tolist() == [2, 2]
+    assert events['duration_hrs'].tolist() == [3.0, 0.5, 3.0, 0.5]
+    assert events['sum'].tolist() == [80, 40, 80, 40]
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rollups import grouped_rollup
+
+
+def test_std_with_large_offset_matches_pandas():
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({'group': np.repeat(np.arange(5), 200),
+                          'value': 1e8 + rng.normal(0, 1, 1000)})
+    frame.loc[rng.choice(1000, 50, replace=False), 'value'] = np.nan
+
+    got = grouped_rollup(frame, 'group', ['value'], ['std'])['value_std']
+    expected = frame.groupby('group')['value'].std()
+    np.testing.assert_allclose(got.to_numpy(), expected.to_numpy(), rtol=1e-6)
+
+
+def test_std_of_single_value_and_all_missing_groups_is_nan():
+    frame = pd.DataFrame({'group': [1, 2, 2, 3, 3], 'value': [5.0, np.nan, np.nan, 1.0, 3.0]})
+    got = grouped_rollup(frame, 'group', ['value'], ['std'])['value_std']
+    expected = frame.groupby('group')['value'].std()
+    np.testing.assert_allclose(got.to_numpy(), expected.to_numpy(), equal_nan=True)
+
+
+def test_percentiles_above_100_are_rejected():
+    frame = pd.DataFrame({'group': [1, 1, 2, 2], 'value': [1.0, 2.0, 100.0, 200.0]})
+    with pytest.raises(ValueError, match='p150'):
+        grouped_rollup(frame, 'group', ['value'], ['p150'])
+    got = grouped_rollup(frame, 'group', ['value'], ['p0', 'p100'])
+    assert got['value_p0'].tolist() == [1.0, 100.0]
+    assert got['value_p100'].tolist() == [2.0, 200.0]